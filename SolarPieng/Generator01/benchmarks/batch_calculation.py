@@ -0,0 +1,108 @@
+"""
+Benchmark de /api/calculate-proposal/batch (NDJSON em streaming).
+
+Compara, para N clientes:
+- single: N requisições a /api/calculate-proposal (fluxo atual do CRM);
+- batch: uma requisição NDJSON com N registros.
+
+Para o lote, o corpo é lido de arquivo e a resposta é consumida bloco a bloco,
+e o pico de memória alocada (tracemalloc) mostra que ele não cresce com N.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.batch_calculation --clients 100 1000 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import make_client, make_parameters, make_systems
+from src.main import create_app
+
+KITS_PER_CLIENT = 6
+
+
+def _records(clients: int):
+    params = make_parameters()
+    for i in range(clients):
+        yield {
+            'id': f'deal-{i}',
+            'client_data': make_client(),
+            'systems_data': make_systems(KITS_PER_CLIENT, seed=i),
+            'parameters': params
+        }
+
+
+def run_single(client, clients: int) -> float:
+    t0 = time.perf_counter()
+    for record in _records(clients):
+        response = client.post('/api/calculate-proposal', json=record)
+        assert response.status_code == 200
+    return time.perf_counter() - t0
+
+
+def _post_batch(client, path: str) -> dict:
+    t0 = time.perf_counter()
+    with open(path, 'rb') as body:
+        response = client.post('/api/calculate-proposal/batch', input_stream=body,
+                               content_length=os.path.getsize(path),
+                               content_type='application/x-ndjson', buffered=False)
+        received = chunks = 0
+        last = b''
+        for chunk in response.response:
+            received += len(chunk)
+            chunks += 1
+            last = chunk
+        response.close()
+    elapsed = time.perf_counter() - t0
+
+    summary = json.loads(last.splitlines()[-1])['summary']
+    assert summary['failed'] == 0
+    return {'seconds': elapsed, 'bytes': received, 'chunks': chunks, 'records': summary['records']}
+
+
+def run_batch(client, clients: int) -> dict:
+    with tempfile.NamedTemporaryFile('wb', suffix='.ndjson', delete=False) as f:
+        for record in _records(clients):
+            f.write(json.dumps(record).encode('utf-8') + b'\n')
+        path = f.name
+
+    try:
+        result = _post_batch(client, path)
+        assert result.pop('records') == clients
+        # Memória numa segunda passada: o tracemalloc deixa o Python bem mais lento
+        tracemalloc.start()
+        _post_batch(client, path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.unlink(path)
+
+    result['peak_alloc_mb'] = peak / 2 ** 20
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--skip-single', action='store_true', help='não medir as requisições individuais')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db')})
+        client = app.test_client()
+        results = []
+        for clients in args.clients:
+            result = {'clients': clients, 'batch': run_batch(client, clients)}
+            result['batch']['clients_per_second'] = clients / result['batch']['seconds']
+            if not args.skip_single:
+                seconds = run_single(client, clients)
+                result['single'] = {'seconds': seconds, 'clients_per_second': clients / seconds}
+            results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
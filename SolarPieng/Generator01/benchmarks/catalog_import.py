@@ -0,0 +1,113 @@
+"""
+Benchmark da importação de listas de preço CSV (flask import-components).
+
+Gera uma lista com --rows itens (metade módulos, metade inversores, no formato de
+planilha brasileira: ";" e "1.234,56") e importa num SQLite temporário:
+- initial: catálogo vazio, todas as linhas são inserções;
+- diff: a mesma lista com 10% dos preços alterados, 1% dos itens removidos e 1% novos
+  (só essas linhas são gravadas);
+- unchanged: a mesma lista de novo (nenhuma escrita).
+
+Para cada importação: tempo e linhas por segundo, e o pico de memória alocada pelo Python
+(tracemalloc), que não deve crescer com o tamanho do arquivo. O tracemalloc deixa o
+Python várias vezes mais lento: a memória é medida numa passada dry-run à parte (mesma
+leitura e mesmo diff, sem gravar) e o tempo na importação de fato, sem rastreamento.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.catalog_import --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+HEADER = 'Código;Descrição;Marca;Categoria;Potência;Preço;Eficiência;Garantia\n'
+BRANDS = ['Canadian', 'DMEGC', 'Jinko', 'Longi', 'Trina', 'Growatt', 'SAJ', 'Solis', 'Fronius', 'Deye']
+
+
+def _money(value: float) -> str:
+    return f'R$ {value:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def write_price_list(path: str, rows: int, seed: int, changed: float = 0.0, removed: float = 0.0,
+                     added: float = 0.0):
+    """Lista sintética; com changed/removed/added, a variação de uma lista anterior de mesma semente."""
+    rng = random.Random(seed)
+    change_rng = random.Random(seed + 1)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER)
+        for i in range(rows + int(rows * added)):
+            is_module = i % 2 == 0
+            brand = rng.choice(BRANDS)
+            power = rng.randrange(330, 720, 5) if is_module else rng.randrange(1, 150)
+            price = rng.uniform(250, 900) if is_module else rng.uniform(700, 40000)
+            efficiency = rng.uniform(19, 23) if is_module else rng.uniform(95, 99)
+            if i < rows and change_rng.random() < removed:
+                continue
+            if change_rng.random() < changed:
+                price *= 1.05
+            f.write(';'.join([
+                f'{"mod" if is_module else "inv"}_{i:07d}',
+                f'{"Módulo" if is_module else "Inversor"} {brand} {power}{"Wp" if is_module else "kW"}',
+                brand,
+                'Módulo' if is_module else 'Inversor',
+                f'{power} Wp' if is_module else f'{power} kW',
+                _money(price),
+                f'{efficiency:.1f}%'.replace('.', ','),
+                '12'
+            ]) + '\n')
+
+
+def _import(path: str) -> dict:
+    from src.utils.catalog_import import catalog_importer
+
+    tracemalloc.start()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        catalog_importer.run(f, delete_missing='all', dry_run=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        report = catalog_importer.run(f, delete_missing='all')
+    elapsed = time.perf_counter() - t0
+    report.pop('errors')
+    return dict(report, seconds=elapsed, rows_per_second=report['rows'] / elapsed, peak_mb=peak / 1024 / 1024)
+
+
+def run(rows: int, seed: int = 42) -> dict:
+    from src.main import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'catalog.db')}",
+            'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db'),
+            'TRACE_FILE': '',
+            'LOG_LEVEL': 'warning'
+        })
+        initial = os.path.join(tmp, 'initial.csv')
+        updated = os.path.join(tmp, 'updated.csv')
+        write_price_list(initial, rows, seed)
+        write_price_list(updated, rows, seed, changed=0.10, removed=0.01, added=0.01)
+        with app.app_context():
+            return {
+                'rows': rows,
+                'file_mb': os.path.getsize(initial) / 1024 / 1024,
+                'initial': _import(initial),
+                'diff': _import(updated),
+                'unchanged': _import(updated)
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows), indent=2))
+
+
+if __name__ == '__main__':
+    main()
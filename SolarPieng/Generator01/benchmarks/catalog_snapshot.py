@@ -0,0 +1,140 @@
+"""
+Benchmark do snapshot compartilhado do catálogo (arrays do NumPy mapeados por todos os workers).
+
+Popula um SQLite temporário com --items módulos e --items inversores e mede:
+- compilação do snapshot (consulta, arrays, gravação e os.replace), tamanho do arquivo e
+  o tempo para um worker mapeá-lo;
+- orçamento rápido sobre o snapshot;
+- memória por worker: --workers processos (fork) vivos ao mesmo tempo, cada um com o
+  catálogo inteiro em dicts (uma cópia por worker, como antes) ou com o snapshot mapeado
+  e todas as páginas lidas. Privada = Private_Clean + Private_Dirty e PSS de
+  /proc/self/smaps_rollup, como diferença antes/depois de carregar (só Linux).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.catalog_snapshot --items 50000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.history import _median_ms
+
+MB = 1024 * 1024
+
+
+def _memory() -> dict:
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {'private': values['Private_Clean'] + values['Private_Dirty'], 'pss': values['Pss']}
+
+
+def _load_dicts():
+    from sqlalchemy import select
+
+    from src.models.user import db
+    from src.utils.component_catalog import KINDS
+
+    db.engine.dispose(close=False)
+    return {kind: [dict(row) for row in db.session.execute(select(*columns)).mappings()]
+            for kind, (_model, _power, columns) in KINDS.items()}
+
+
+def _load_snapshot(path: str):
+    from src.utils.catalog_snapshot import CatalogSnapshot
+    from src.utils.component_catalog import QuickQuoteTables
+
+    snapshot = CatalogSnapshot.open(path)
+    # Lê todas as páginas (no pior caso, cada worker percorre o catálogo inteiro)
+    for array in snapshot.sections.values():
+        for field in (array.dtype.names or (None,)):
+            (array[field] if field else array).sum()
+    return snapshot, QuickQuoteTables(snapshot)
+
+
+def _worker(mode: str, path: str, barrier, results):
+    before = _memory()
+    catalog = _load_dicts() if mode == 'dicts' else _load_snapshot(path)
+    # Todos carregados ao mesmo tempo: páginas mapeadas por vários processos contam como compartilhadas
+    barrier.wait()
+    after = _memory()
+    barrier.wait()
+    results.put({key: after[key] - before[key] for key in after})
+    del catalog
+
+
+def _per_worker(mode: str, path: str, workers: int) -> dict:
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(mode, path, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {key: round(max(item[key] for item in measured) / MB, 1) for key in measured[0]}
+
+
+def run(items: int, workers: int, repeat: int, seed: int = 42) -> dict:
+    from benchmarks.components import _populate
+    from src.main import create_app
+    from src.models.user import db
+    from src.utils.calculator import QuickQuoteGenerator
+    from src.utils.catalog_snapshot import CatalogSnapshot
+    from src.utils.component_catalog import component_catalog
+    from src.utils.config_service import config_service
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'catalog.db')}",
+            'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db'),
+            'TRACE_FILE': '',
+            'LOG_LEVEL': 'warning'
+        })
+        with app.app_context():
+            _populate(db, items, seed)
+            started = time.perf_counter()
+            snapshot = component_catalog.refresh()
+            compile_ms = (time.perf_counter() - started) * 1000
+            path = component_catalog.snapshot_path
+
+            quick = QuickQuoteGenerator(components_db=config_service.get('components_db'))
+            quick.generate_quick_quote(monthly_consumption_kwh=2000)
+            result = {
+                'items_per_kind': items,
+                'snapshot': {
+                    'file_mb': round(os.path.getsize(path) / MB, 2),
+                    'bytes_per_item': round(os.path.getsize(path) / (2 * items), 1),
+                    'compile_ms': round(compile_ms, 1),
+                    'map_ms': round(_median_ms(lambda: CatalogSnapshot.open(path), repeat), 3),
+                    'quick_quote_ms': round(_median_ms(
+                        lambda: quick.generate_quick_quote(monthly_consumption_kwh=2000), repeat), 3),
+                    'version': snapshot.version
+                }
+            }
+            db.session.remove()
+            result[f'per_worker_mb[{workers} workers]'] = {
+                'dicts': _per_worker('dicts', path, workers),
+                'snapshot': _per_worker('snapshot', path, workers)
+            }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=50000, help='módulos e inversores (cada)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.workers, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark do formato compacto de /api/calculate-proposal.
+
+Compara, para N kits, o tamanho do payload (bruto e gzip) e o tempo de parse
+no cliente (json.loads, como aproximação do JSON.parse do navegador) entre:
+- default: formato aninhado atual (parameters_used repetido por kit);
+- compact: parâmetros uma vez, kits por índice, colunas numéricas;
+- compact+fields: apenas os campos que o frontend renderiza.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.compact_format --kits 1000
+"""
+import argparse
+import gzip
+import json
+import time
+
+from benchmarks.fixtures import make_client, make_parameters, make_systems
+from src.utils.calculator import SolarCalculator
+from src.utils.proposal_format import to_compact
+
+# Campos usados pelos cards da proposta no frontend
+FRONTEND_FIELDS = [
+    'kit_info.name', 'kit_info.power', 'kit_info.modules_desc', 'kit_info.inverter_desc',
+    'pricing.crossed_price', 'pricing.final_price', 'pricing.cash_price',
+    'pricing.installment_12x', 'pricing.financing_installment', 'pricing.discount_cash_percent',
+    'calculations.monthly_generation', 'calculations.monthly_savings',
+    'calculations.final_payback_months', 'calculations.final_margin_percent',
+    'is_recommended'
+]
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(kits: int, repeat: int = 5) -> dict:
+    systems = make_systems(kits)
+    params = make_parameters()
+    client = make_client()
+    proposals = SolarCalculator().compare_systems(systems, params)
+
+    payloads = {
+        'default': {'success': True, 'client_data': client, 'proposals': proposals, 'parameters_used': params},
+        'compact': dict(to_compact(proposals, systems, params), success=True, client_data=client),
+        'compact+fields': dict(to_compact(proposals, systems, params, FRONTEND_FIELDS),
+                               success=True, client_data=client)
+    }
+
+    result = {'kits': kits}
+    for name, payload in payloads.items():
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        result[name] = {
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body, 6)),
+            'client_parse_ms': _best_of(lambda: json.loads(body), repeat) * 1000
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kits', type=int, nargs='+', default=[1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps([run(k, args.repeat) for k in args.kits], indent=2))
+
+
+if __name__ == '__main__':
+    main()
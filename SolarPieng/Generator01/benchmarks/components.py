@@ -0,0 +1,125 @@
+"""
+Benchmark do catálogo de componentes (tabelas catalog_modules e catalog_inverters).
+
+Popula um SQLite temporário com --items módulos e --items inversores e mede, pelo
+cliente de teste do Flask:
+- /api/components: primeira página, página profunda por cursor, filtros por marca,
+  tipo, potência e preço, e a revalidação com If-None-Match (304);
+- o dump do catálogo inteiro (o que /api/components devolvia antes), para comparação;
+- o orçamento rápido: compilação do snapshot de uma versão do catálogo (mais as
+  tabelas sobre ele) e um orçamento.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.components --items 20000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from sqlalchemy import insert, select, text
+
+from benchmarks.history import _median_ms
+
+BRANDS = ['Canadian', 'DMEGC', 'Jinko', 'Longi', 'Trina', 'Growatt', 'SAJ', 'Solis', 'Fronius', 'Deye']
+INVERTER_TYPES = ['string', 'micro', 'hibrido']
+
+
+def _populate(db, items: int, seed: int):
+    from src.models.component import CatalogState, Inverter, Module
+
+    rng = random.Random(seed)
+    db.session.execute(insert(Module), [{
+        'sku': f'mod_{i:06d}',
+        'name': f'Módulo {i}',
+        'brand': rng.choice(BRANDS),
+        'power_wp': float(rng.randrange(330, 720, 5)),
+        'price': round(rng.uniform(250, 900), 2),
+        'efficiency': round(rng.uniform(0.19, 0.23), 3),
+        'warranty_years': rng.choice([10, 12, 15])
+    } for i in range(items)])
+    db.session.execute(insert(Inverter), [{
+        'sku': f'inv_{i:06d}',
+        'name': f'Inversor {i}',
+        'brand': rng.choice(BRANDS),
+        'type': rng.choice(INVERTER_TYPES),
+        'power_kw': float(rng.randrange(1, 150)),
+        'price': round(rng.uniform(700, 40000), 2),
+        'efficiency': round(rng.uniform(0.95, 0.99), 3)
+    } for i in range(items)])
+    db.session.get(CatalogState, 1).version += 1
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+
+def run(items: int, repeat: int, seed: int = 42) -> dict:
+    from src.main import create_app
+    from src.models.component import Inverter, Module
+    from src.models.user import db
+    from src.utils.calculator import QuickQuoteGenerator
+    from src.utils.component_catalog import component_catalog
+    from src.utils.config_service import config_service
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'catalog.db')}",
+            'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db'),
+            'TRACE_FILE': '',
+            'LOG_LEVEL': 'warning'
+        })
+        client = app.test_client()
+        with app.app_context():
+            _populate(db, items, seed)
+            first = client.get('/api/components?kind=inverters&limit=50').get_json()
+            cursor = first['next_cursor']
+            for _ in range(items // 100):
+                cursor = client.get(f'/api/components?kind=inverters&limit=50&cursor={cursor}').get_json()['next_cursor']
+            etag = client.get('/api/components?kind=modules&brand=Jinko').headers['ETag']
+
+            routes = {
+                'first_page': '/api/components?kind=modules',
+                'deep_page_cursor': f'/api/components?kind=inverters&limit=50&cursor={cursor}',
+                'brand_by_price': '/api/components?kind=modules&brand=Jinko&sort=price',
+                'type_and_power': '/api/components?kind=inverters&type=micro&min_power=5&max_power=10',
+                'price_range': '/api/components?kind=inverters&min_price=10000&max_price=10500&sort=price'
+            }
+            timings = {name: _median_ms(lambda url=url: client.get(url), repeat) for name, url in routes.items()}
+            timings['not_modified_304'] = _median_ms(
+                lambda: client.get('/api/components?kind=modules&brand=Jinko', headers={'If-None-Match': etag}),
+                repeat)
+
+            def full_dump():
+                # O /api/components anterior: todos os itens serializados a cada chamada
+                modules = db.session.execute(select(Module)).scalars().all()
+                inverters = db.session.execute(select(Inverter)).scalars().all()
+                return json.dumps({'modules': [m.to_dict() for m in modules],
+                                   'inverters': [i.to_dict() for i in inverters]})
+
+            timings['full_dump'] = _median_ms(full_dump, min(repeat, 3))
+            db.session.expunge_all()
+
+            quick = QuickQuoteGenerator(components_db=config_service.get('components_db'))
+
+            def build_tables():
+                component_catalog.rebuild()
+                component_catalog.quick_quote_tables()
+
+            timings['quick_quote_tables_build'] = _median_ms(build_tables, min(repeat, 3))
+            quick.generate_quick_quote(monthly_consumption_kwh=2000)
+            timings['quick_quote'] = _median_ms(lambda: quick.generate_quick_quote(monthly_consumption_kwh=2000),
+                                                repeat)
+            db.session.remove()
+    return {'items_per_kind': items, 'ms': timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='módulos e inversores (cada)')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
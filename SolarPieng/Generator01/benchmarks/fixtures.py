@@ -0,0 +1,99 @@
+"""Dados sintéticos, mas realistas, usados pelos benchmarks."""
+import io
+import random
+from typing import Dict, List
+
+SUPPLIERS = ['Fortlev', 'Belenergy', 'Soollar', 'Aldo Solar', 'WEG', 'Renovigi']
+MODULES = [(550, 'Painel Solar 550Wp Monocristalino'), (600, 'Painel Solar 600Wp Bifacial'),
+           (610, 'Painel Solar 610Wp DMEGC Bifacial')]
+INVERTERS = [('string', 'Inversor String {kw}kW Trifásico'), ('micro', 'Microinversor {kw}kW')]
+
+
+def make_systems(count: int, seed: int = 42) -> List[Dict]:
+    """Kits no mesmo formato de systems_data enviado pelo frontend/OCR."""
+    rng = random.Random(seed)
+    systems = []
+    for i in range(count):
+        wp, module_name = rng.choice(MODULES)
+        modules_count = rng.randint(8, 200)
+        power = round(modules_count * wp / 1000, 2)
+        inverter_type, inverter_name = rng.choice(INVERTERS)
+        freight_included = rng.random() < 0.7
+        systems.append({
+            'name': f"{rng.choice(SUPPLIERS)} Kit {i + 1}",
+            'vcusto_raw': round(power * rng.uniform(900, 1300), 2),
+            'power': power,
+            'modules_count': modules_count,
+            'modules_desc': f"{modules_count}x {module_name}",
+            'inverter_desc': inverter_name.format(kw=max(2, round(power))),
+            'inverter_type': inverter_type,
+            'freight_included': freight_included,
+            'freight_value': 0 if freight_included else round(rng.uniform(300, 2500), 2)
+        })
+    return systems
+
+
+def make_parameters() -> Dict:
+    """Parâmetros completos de simulação (como os defaults do SolarCalculator)."""
+    from src.utils.calculator import SolarCalculator
+    return dict(SolarCalculator().default_params)
+
+
+def make_client() -> Dict:
+    return {
+        'name': 'Cliente Benchmark',
+        'email': 'cliente@example.com',
+        'phone': '(62) 90000-0000',
+        'address': 'Rua Exemplo, 123 - Anápolis/GO'
+    }
+
+
+def make_quote_pdf(pages: List[List[str]]) -> bytes:
+    """PDF de texto mínimo (Helvetica), uma lista de linhas por página, sem dependências externas."""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for lines in pages:
+        text = b' '.join(b'(' + line.encode('latin-1') + b') Tj T*' for line in lines)
+        content = b'BT /F1 12 Tf 50 750 Td 14 TL ' + text + b' ET'
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 3 0 R >> >> >>' % len(objects))
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % k for k in kids), len(kids))
+
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, obj)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return out
+
+
+def make_supplier_pdf(seed: int = 0) -> bytes:
+    """Orçamento de fornecedor (layout Fortlev) em duas páginas."""
+    rng = random.Random(seed)
+    modules = rng.randint(8, 60)
+    power = f"{modules * 0.585:.2f}".replace('.', ',')
+    price = f"{modules * rng.uniform(800, 1100):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    return make_quote_pdf([
+        ['Orcamento FORTLEV', f'Gerador FV {power} kWp', f'Quantidade: {modules}', 'PAINEL DAH SOLAR 585W'],
+        [f'R$ {price}', 'Frete CIF']
+    ])
+
+
+def make_quote_image(width: int = 4000, height: int = 3000, fmt: str = 'JPEG') -> bytes:
+    """Foto/print de orçamento (texto sobre fundo claro), no tamanho de uma foto de celular."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(['Gerador FV 10,53 kWp', '18x Painel DAH 585Wp', 'R$ 21.450,00']):
+        draw.text((width // 10, height // 10 + i * 60), line, fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
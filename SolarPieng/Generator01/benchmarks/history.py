@@ -0,0 +1,243 @@
+"""
+Benchmark do histórico persistente de propostas (tabelas clients, kits e proposals).
+
+- write: grava uma comparação de N kits com proposal_history.record (uma transação,
+  INSERTs em lote) e, para referência, com um commit por proposta via ORM;
+- read: popula um SQLite temporário com --rows propostas e mede as consultas do
+  histórico (primeira página, páginas profundas por cursor, filtros, ordenações,
+  propostas de um cliente e busca de clientes por prefixo), com o plano de execução
+  de cada uma (nenhuma deve fazer SCAN da tabela inteira nem usar TEMP B-TREE);
+- analytics: rebuild dos resumos de /api/analytics sobre esse histórico (backfill) e
+  a leitura do painel pelos resumos, contra agregar as propostas a cada requisição.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.history --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from benchmarks.fixtures import SUPPLIERS, make_client, make_parameters, make_systems
+
+CHUNK = 20000
+SELLERS = ['ana', 'bruno', 'carla', 'diego', 'elisa', 'fabio', 'gabriela', 'hugo']
+
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def _make_app(db_path: str):
+    from src.main import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'PROPOSAL_SETS_DB': os.path.join(os.path.dirname(db_path), 'proposal_sets.db'),
+        'TRACE_FILE': '',
+        'LOG_LEVEL': 'warning'
+    })
+
+
+def run_write(kits: int, repeat: int) -> dict:
+    from src.models.proposal import Client, Kit, Proposal
+    from src.models.user import db
+    from src.utils.calculator import SolarCalculator
+    from src.utils.proposal_history import proposal_history
+    from src.utils.proposal_store import ProposalSet
+
+    systems = make_systems(kits)
+    proposals = SolarCalculator().compare_systems(systems, make_parameters())
+    proposal_set = ProposalSet('benchmark', make_client(), systems, make_parameters(), proposals,
+                               time.time(), time.time())
+
+    def per_row():
+        # Fluxo ingênuo: cada proposta (e seu kit) em uma transação própria
+        client = Client(name='Cliente Benchmark')
+        db.session.add(client)
+        db.session.commit()
+        for proposal in proposals:
+            kit = Kit(name=proposal['kit_info']['name'], power_kwp=proposal['kit_info']['power'],
+                      cost=proposal['kit_info']['vcusto_raw'])
+            db.session.add(Proposal(client_id=client.id, kit=kit, power_kwp=kit.power_kwp,
+                                    final_price=proposal['pricing']['final_price'], data={}))
+            db.session.commit()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _make_app(os.path.join(tmp, 'history.db'))
+        with app.app_context():
+            batched_ms = _median_ms(lambda: proposal_history.record(proposal_set), repeat)
+            per_row_ms = _median_ms(per_row, repeat)
+    return {
+        'kits': kits,
+        'batched_ms': batched_ms,
+        'per_row_commit_ms': per_row_ms,
+        'speedup': per_row_ms / batched_ms
+    }
+
+
+def _populate(db, rows: int, seed: int):
+    """Propostas sintéticas espalhadas por um ano, ~20 por cliente, inseridas em lote."""
+    from src.models.proposal import Client, Kit, Proposal
+    from src.utils.data_extractor import DataExtractor
+
+    rng = random.Random(seed)
+    clients = max(1, rows // 20)
+    start = datetime.now() - timedelta(days=365)
+    first_names = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Hugo', 'Iara', 'João']
+
+    for offset in range(0, clients, CHUNK):
+        db.session.execute(insert(Client), [{
+            'name': f'{rng.choice(first_names)} {i:07d}',
+            'email': f'cliente{i}@example.com',
+            'created_at': start
+        } for i in range(offset, min(offset + CHUNK, clients))])
+
+    step = timedelta(days=365) / rows
+    for offset in range(0, rows, CHUNK):
+        count = min(CHUNK, rows - offset)
+        powers = [round(rng.uniform(2, 120), 2) for _ in range(count)]
+        names = [f'{rng.choice(SUPPLIERS)} Kit {offset + i + 1}' for i in range(count)]
+        db.session.execute(insert(Kit), [{
+            'name': names[i],
+            'supplier': DataExtractor.detect_supplier_from_text(names[i]),
+            'power_kwp': power,
+            'cost': round(power * rng.uniform(900, 1300), 2)
+        } for i, power in enumerate(powers)])
+        db.session.execute(insert(Proposal), [{
+            'proposal_set_id': f'set{(offset + i) // 10}',
+            'seller': SELLERS[(offset + i) // 10 % len(SELLERS)],
+            'client_id': rng.randint(1, clients),
+            'kit_id': offset + i + 1,
+            'created_at': start + step * (offset + i),
+            'power_kwp': power,
+            'final_price': round(power * rng.uniform(1800, 3200), 2),
+            'margin_percent': round(rng.uniform(15, 45), 2),
+            'payback_months': round(rng.uniform(24, 96), 1),
+            'ranking': (offset + i) % 10 + 1,
+            'is_recommended': (offset + i) % 10 == 0,
+            'data': {}
+        } for i, power in enumerate(powers)])
+        db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    return clients
+
+
+def _deep_cursor(list_proposals, pages: int, **filters) -> str:
+    cursor = None
+    for _ in range(pages):
+        _, cursor = list_proposals(cursor=cursor, **filters)
+    return cursor
+
+
+def _plan(db, query) -> str:
+    compiled = query.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+    return '; '.join(row[-1] for row in rows)
+
+
+def run_read(rows: int, repeat: int, seed: int = 42) -> dict:
+    from src.models.proposal import Client, Proposal
+    from src.models.user import db
+    from src.utils.proposal_history import LIST_COLUMNS, proposal_history
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _make_app(os.path.join(tmp, 'history.db'))
+        with app.app_context():
+            t0 = time.perf_counter()
+            clients = _populate(db, rows, seed)
+            populate_s = time.perf_counter() - t0
+            list_proposals = proposal_history.list_proposals
+            middle = datetime.now() - timedelta(days=180)
+
+            queries = {
+                'first_page': lambda: list_proposals(),
+                'page_100_by_cursor': (lambda cursor: lambda: list_proposals(cursor=cursor))(
+                    _deep_cursor(list_proposals, 100)),
+                'date_range': lambda: list_proposals(since=middle, until=middle + timedelta(days=7)),
+                'power_range_by_power': lambda: list_proposals(min_power=30, max_power=35, sort='power'),
+                'cheapest_first': lambda: list_proposals(sort='final_price', order='asc'),
+                'price_range_page_50': (lambda cursor: lambda: list_proposals(
+                    min_price=50000, max_price=80000, sort='final_price', cursor=cursor))(
+                    _deep_cursor(list_proposals, 50, min_price=50000, max_price=80000, sort='final_price')),
+                'client_proposals': lambda: list_proposals(client_id=clients // 2),
+                'proposal_detail': lambda: proposal_history.get_proposal(rows // 2),
+                'clients_by_prefix': lambda: proposal_history.list_clients(name_prefix='Gab')
+            }
+            timings = {name: _median_ms(query, repeat) for name, query in queries.items()}
+
+            base = select(*LIST_COLUMNS).join(Proposal.client).join(Proposal.kit).limit(51)
+            plans = {
+                'first_page': _plan(db, base.order_by(Proposal.created_at.desc(), Proposal.id.desc())),
+                'cheapest_first': _plan(db, base.order_by(Proposal.final_price, Proposal.id)),
+                'client_proposals': _plan(db, base.where(Proposal.client_id == clients // 2)
+                                          .order_by(Proposal.created_at.desc(), Proposal.id.desc())),
+                'clients_by_prefix': _plan(db, select(Client).where(Client.name >= 'Gab', Client.name < 'Gab\uffff')
+                                           .order_by(Client.name, Client.id).limit(51))
+            }
+            stored = db.session.execute(select(func.count()).select_from(Proposal)).scalar_one()
+            analytics = _run_analytics(db, repeat)
+
+    return {
+        'rows': stored,
+        'clients': clients,
+        'populate_s': populate_s,
+        'query_ms': timings,
+        'plans': plans,
+        'analytics': analytics
+    }
+
+
+def _run_analytics(db, repeat: int) -> dict:
+    """Backfill dos resumos (rebuild) e /api/analytics lendo resumos contra agregar o histórico."""
+    from src.models.proposal import Kit, Proposal
+    from src.utils.analytics import sales_analytics
+
+    rebuild = sales_analytics.rebuild()
+    today = datetime.now().date()
+    year_ago = datetime.now() - timedelta(days=365)
+
+    def scan():
+        # O que o painel faria sem resumos: agregar as propostas do período a cada requisição
+        db.session.execute(
+            select(func.date(Proposal.created_at), Proposal.seller, func.count(), func.sum(Proposal.final_price))
+            .where(Proposal.created_at >= year_ago)
+            .group_by(func.date(Proposal.created_at), Proposal.seller)).all()
+        db.session.execute(
+            select(Kit.supplier, func.sum(Proposal.final_price), func.sum(Proposal.power_kwp))
+            .join(Kit, Kit.id == Proposal.kit_id)
+            .where(Proposal.created_at >= year_ago).group_by(Kit.supplier)).all()
+
+    return {
+        'rebuild_s': rebuild['seconds'],
+        'summary_rows': rebuild['rows'],
+        'summary_30d_ms': _median_ms(lambda: sales_analytics.summary(today - timedelta(days=29), today), repeat),
+        'summary_365d_ms': _median_ms(lambda: sales_analytics.summary(today - timedelta(days=364), today), repeat),
+        'scan_365d_ms': _median_ms(scan, min(repeat, 3))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='propostas no histórico (leitura)')
+    parser.add_argument('--kits', type=int, default=200, help='kits por comparação (escrita)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({
+        'write': run_write(args.kits, args.repeat),
+        'read': run_read(args.rows, args.repeat)
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark do recálculo incremental (PATCH /api/proposal-sets/<id>).
+
+Para N kits e para cada ajuste típico de vendedor (um parâmetro por vez),
+compara:
+- full: compare_systems com todos os parâmetros (fluxo anterior);
+- incremental: recalculate_proposals, que só recalcula os campos afetados
+  e só reordena se a ordem por payback mudou.
+
+Também confere que os dois caminhos produzem exatamente as mesmas propostas.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.incremental_recalc --kits 200 1000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.fixtures import make_parameters, make_systems
+from src.utils.calculator import SolarCalculator
+
+# Ajustes feitos pelos vendedores, um por vez
+TWEAKS = {
+    'discount_cash': 12,
+    'financing_rate': 18.9,
+    'markup_crossed_price': 20,
+    'tariff': 0.95,
+    'margin_target': 35,
+    'payback_max': 24
+}
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(kits: int, repeat: int = 5) -> dict:
+    calculator = SolarCalculator()
+    systems = make_systems(kits)
+    params = make_parameters()
+    proposals = calculator.compare_systems(systems, params)
+
+    result = {'kits': kits}
+    for name, value in TWEAKS.items():
+        new_params = dict(params, **{name: value})
+        full = calculator.compare_systems(systems, new_params)
+        incremental, summary = calculator.recalculate_proposals(proposals, new_params, params, systems)
+        if incremental != full:
+            raise AssertionError(f'recálculo incremental diverge do completo ({name})')
+
+        full_s = _best_of(lambda: calculator.compare_systems(systems, new_params), repeat)
+        incremental_s = _best_of(
+            lambda: calculator.recalculate_proposals(proposals, new_params, params, systems), repeat
+        )
+        result[name] = {
+            'full_ms': full_s * 1000,
+            'incremental_ms': incremental_s * 1000,
+            'speedup': full_s / incremental_s,
+            'fields_recalculated': summary['recalculated_fields'],
+            'reranked': summary['reranked']
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kits', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps([run(k, args.repeat) for k in args.kits], indent=2))
+
+
+if __name__ == '__main__':
+    main()
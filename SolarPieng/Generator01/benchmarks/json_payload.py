@@ -0,0 +1,79 @@
+"""
+Benchmark de serialização e bytes trafegados de /api/calculate-proposal.
+
+Compara o provider JSON padrão do Flask (stdlib) com o OrJSONProvider e mede o
+tamanho da resposta sem compressão, com gzip e com brotli (se instalado).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.json_payload --kits 20 200 1000
+"""
+import argparse
+import gzip
+import json
+import time
+
+from benchmarks.fixtures import make_client, make_parameters, make_systems
+from src.utils.calculator import SolarCalculator
+from src.utils.compression import brotli
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def build_payload(kits: int) -> dict:
+    params = make_parameters()
+    proposals = SolarCalculator().compare_systems(make_systems(kits), params)
+    return {
+        'success': True,
+        'client_data': make_client(),
+        'proposals': proposals,
+        'parameters_used': params
+    }
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(kits: int, repeat: int = 5) -> dict:
+    payload = build_payload(kits)
+    serializers = {
+        # Mesmas opções do DefaultJSONProvider do Flask em produção
+        'stdlib': lambda: json.dumps(payload, ensure_ascii=True, sort_keys=True,
+                                     separators=(',', ':')).encode('utf-8')
+    }
+    if orjson is not None:
+        serializers['orjson'] = lambda: orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+    result = {'kits': kits}
+    for name, fn in serializers.items():
+        body = fn()
+        result[name] = {
+            'serialize_ms': _best_of(fn, repeat) * 1000,
+            'bytes': len(body),
+            'gzip6_bytes': len(gzip.compress(body, 6)),
+            'gzip6_ms': _best_of(lambda: gzip.compress(body, 6), repeat) * 1000
+        }
+        if brotli is not None:
+            result[name]['br4_bytes'] = len(brotli.compress(body, quality=4))
+            result[name]['br4_ms'] = _best_of(lambda: brotli.compress(body, quality=4), repeat) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kits', type=int, nargs='+', default=[20, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps([run(k, args.repeat) for k in args.kits], indent=2))
+
+
+if __name__ == '__main__':
+    main()
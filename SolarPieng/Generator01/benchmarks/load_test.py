@@ -0,0 +1,420 @@
+"""
+Teste de carga local do fluxo da API, para dimensionar workers/threads dos dynos.
+
+Cada usuário virtual (uma thread com conexão keep-alive) repete sessões sorteadas
+pelo `--mix`, como no uso real:
+
+    ocr:   upload-ocr → calculate-proposal (kits extraídos) → generate-html → download
+    calc:  calculate-proposal (kits digitados) → generate-html → download
+    quick: quick-quote
+
+Para cada configuração do servidor (`--workers` × `--threads` × `--variant`) e cada
+nível de `--concurrency`, o app sobe sob gunicorn (gunicorn.conf.py), roda por
+`--duration` segundos após `--warmup` e o relatório traz, por rota: requisições/s,
+p50/p95/p99, erros e rejeições do limitador de concorrência (429/503, contadas à
+parte: indicam fila cheia, não falha). Com `--url` o teste usa um servidor já no ar.
+
+Os arquivos de upload são gerados na hora (PDFs de fornecedor e uma foto JPEG,
+benchmarks/fixtures.py); `--samples DIR` usa arquivos reais (.pdf/.jpg/.png).
+Uploads e propostas gerados pelo teste são apagados ao final quando o servidor é local,
+que grava o histórico num banco temporário (benchmarks/server.py), não em src/database.
+O gerador de carga roda na mesma máquina e disputa CPU com o servidor: compare
+configurações entre si, não com números de produção.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 4 16
+    python -m benchmarks.load_test --threads 4 8 --variant CONCURRENCY_OCR=1:2:10 --variant CONCURRENCY_OCR=4:8:20
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --concurrency 8 --json resultado.json
+"""
+import argparse
+import contextlib
+import glob
+import gzip
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import make_parameters, make_quote_image, make_supplier_pdf, make_systems
+from benchmarks.server import PROJECT_ROOT, GunicornServer, rss_mb
+
+ROUTES = ('upload-ocr', 'calculate-proposal', 'quick-quote', 'generate-html', 'download')
+SCENARIOS = ('ocr', 'calc', 'quick')
+DEFAULT_MIX = 'ocr=1,calc=3,quick=4'
+SAMPLE_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png')
+
+# Status devolvidos pelo limitador de concorrência (fila cheia / espera esgotada)
+REJECTED_STATUSES = (429, 503)
+
+# Fração de propostas renderizadas no formato analítico (com gráficos)
+ANALYTICAL_SHARE = 0.3
+
+
+class RequestFailed(Exception):
+    """Interrompe a sessão: os passos seguintes dependem da resposta."""
+
+
+class Recorder:
+    """Latências e status por rota, só das requisições dentro da janela de medição."""
+
+    def __init__(self):
+        self.window: Tuple[float, float] = (math.inf, math.inf)
+        self.latencies: Dict[str, List[float]] = {route: [] for route in ROUTES}
+        self.errors: Dict[str, int] = dict.fromkeys(ROUTES, 0)
+        self.rejected: Dict[str, int] = dict.fromkeys(ROUTES, 0)
+        self.error_kinds: Dict[str, int] = {}
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def record(self, route: str, started: float, elapsed: float, status: Optional[int], detail: str = ''):
+        start, end = self.window
+        if not (start <= started and started + elapsed <= end):
+            return
+        with self._lock:
+            if status is not None and status < 400:
+                self.latencies[route].append(elapsed)
+            elif status in REJECTED_STATUSES:
+                self.rejected[route] += 1
+            else:
+                self.errors[route] += 1
+                kind = f'{route}: {status or ""} {detail}'.strip()
+                self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+
+    def session_done(self, finished: float):
+        start, end = self.window
+        if start <= finished <= end:
+            with self._lock:
+                self.sessions += 1
+
+
+class VirtualUser:
+    """Uma thread, uma conexão keep-alive, sessões em sequência até o fim da janela."""
+
+    def __init__(self, index: int, base_url: str, recorder: Recorder, samples: List[Tuple[str, bytes]],
+                 mix: List[Tuple[str, int]], parameters: Dict, think: float, seed: int):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.samples = samples
+        self.scenarios = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.parameters = parameters
+        self.think = think
+        self.rng = random.Random(seed + index)
+        self.client_data = {'name': f'Carga VU{index}', 'email': f'vu{index}@example.com'}
+        self.created: Dict[str, List[str]] = {'uploads': [], 'output': []}
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def run(self, stop_at: float):
+        while time.perf_counter() < stop_at:
+            scenario = self.rng.choices(self.scenarios, self.weights)[0]
+            try:
+                getattr(self, f'_session_{scenario}')()
+                self.recorder.session_done(time.perf_counter())
+            except RequestFailed:
+                pass
+            if self.think:
+                time.sleep(self.rng.expovariate(1 / self.think))
+        if self.conn is not None:
+            self.conn.close()
+
+    def _session_ocr(self):
+        name, body = self.rng.choice(self.samples)
+        boundary = uuid.uuid4().hex
+        payload = b''.join((
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode(),
+            body,
+            f'\r\n--{boundary}--\r\n'.encode()
+        ))
+        data = self._request('upload-ocr', 'POST', '/api/upload-ocr', payload,
+                             f'multipart/form-data; boundary={boundary}')
+        self.created['uploads'].append(data['filename'])
+        self._render(self._calculate(data['systems_data']))
+
+    def _session_calc(self):
+        systems = make_systems(self.rng.randint(1, 5), seed=self.rng.randrange(1 << 30))
+        self._render(self._calculate(systems))
+
+    def _session_quick(self):
+        self._post_json('quick-quote', '/api/quick-quote', {
+            'monthly_consumption_kwh': self.rng.choice((150, 300, 500, 800, 1200, 2000)),
+            'client_data': self.client_data
+        })
+
+    def _calculate(self, systems: List[Dict]) -> str:
+        data = self._post_json('calculate-proposal', '/api/calculate-proposal',
+                               {'client_data': self.client_data, 'systems_data': systems,
+                                'parameters': self.parameters})
+        return data['proposal_set_id']
+
+    def _render(self, proposal_set_id: str):
+        format_type = 'analytical' if self.rng.random() < ANALYTICAL_SHARE else 'standard'
+        data = self._post_json('generate-html', '/api/generate-html',
+                               {'proposal_set_id': proposal_set_id, 'format': format_type})
+        self.created['output'].append(data['filename'])
+        self._request('download', 'GET', data['download_url'], parse=False)
+
+    def _post_json(self, route: str, path: str, payload: Dict) -> Dict:
+        return self._request(route, 'POST', path, json.dumps(payload).encode(), 'application/json')
+
+    def _request(self, route: str, method: str, path: str, body: bytes = None, content_type: str = None,
+                 parse: bool = True):
+        headers = {'Accept-Encoding': 'gzip'}
+        if content_type:
+            headers['Content-Type'] = content_type
+        for attempt in range(2):
+            reused = self.conn is not None
+            started = time.perf_counter()
+            try:
+                if self.conn is None:
+                    self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                raw = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.conn.close()
+                self.conn = None
+                # Como os navegadores: conexão keep-alive fechada pelo servidor (timeout de
+                # keepalive, worker reciclado) é refeita uma vez antes de contar como erro
+                if reused and attempt == 0 and isinstance(e, (http.client.RemoteDisconnected,
+                                                              ConnectionResetError, BrokenPipeError)):
+                    continue
+                self.recorder.record(route, started, time.perf_counter() - started, None, type(e).__name__)
+                raise RequestFailed() from e
+        elapsed = time.perf_counter() - started
+        if response.getheader('Content-Encoding') == 'gzip' and (parse or response.status >= 400):
+            raw = gzip.decompress(raw)
+
+        if response.status >= 400:
+            try:
+                detail = str(json.loads(raw).get('error', ''))[:120]
+            except ValueError:
+                detail = ''
+            self.recorder.record(route, started, elapsed, response.status, detail)
+            raise RequestFailed()
+        self.recorder.record(route, started, elapsed, response.status)
+        return json.loads(raw) if parse else None
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Percentil pelo posto mais próximo (sem interpolação)."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict:
+    routes = {}
+    for route in ROUTES:
+        latencies = sorted(recorder.latencies[route])
+        ok, errors, rejected = len(latencies), recorder.errors[route], recorder.rejected[route]
+        total = ok + errors + rejected
+        if not total:
+            continue
+        routes[route] = {
+            'requests': total,
+            'ok': ok,
+            'errors': errors,
+            'rejected': rejected,
+            'error_rate': (errors + rejected) / total,
+            'throughput_rps': ok / duration,
+            **{f'p{p}_ms': None if not latencies else percentile(latencies, p) * 1000 for p in (50, 95, 99)},
+            'max_ms': latencies[-1] * 1000 if latencies else None
+        }
+    total = sum(route['requests'] for route in routes.values())
+    failed = sum(route['errors'] + route['rejected'] for route in routes.values())
+    return {
+        'duration_seconds': duration,
+        'sessions': recorder.sessions,
+        'sessions_per_second': recorder.sessions / duration,
+        'requests': total,
+        'throughput_rps': (total - failed) / duration,
+        'error_rate': failed / total if total else 0.0,
+        'routes': routes,
+        'error_kinds': dict(sorted(recorder.error_kinds.items(), key=lambda item: -item[1]))
+    }
+
+
+def run_level(base_url: str, concurrency: int, duration: float, warmup: float, samples: List[Tuple[str, bytes]],
+              mix: List[Tuple[str, int]], think: float, seed: int) -> Tuple[Dict, Dict[str, List[str]]]:
+    recorder = Recorder()
+    # Parâmetros completos, como o frontend envia em todo cálculo
+    parameters = make_parameters()
+    users = [VirtualUser(i, base_url, recorder, samples, mix, parameters, think, seed) for i in range(concurrency)]
+    start = time.perf_counter() + warmup
+    recorder.window = (start, start + duration)
+    threads = [threading.Thread(target=user.run, args=(start + duration,), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    created = {'uploads': [], 'output': []}
+    for user in users:
+        for kind, names in user.created.items():
+            created[kind] += names
+    return summarize(recorder, duration), created
+
+
+def load_samples(directory: Optional[str]) -> List[Tuple[str, bytes]]:
+    if directory is None:
+        samples = [(f'orcamento_{seed}.pdf', make_supplier_pdf(seed)) for seed in range(4)]
+        samples.append(('foto_orcamento.jpg', make_quote_image(1600, 1200)))
+        return samples
+    samples = []
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        if path.lower().endswith(SAMPLE_EXTENSIONS):
+            with open(path, 'rb') as f:
+                samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        sys.exit(f'Nenhum arquivo {"/".join(SAMPLE_EXTENSIONS)} em {directory}')
+    return samples
+
+
+def parse_mix(text: str) -> List[Tuple[str, int]]:
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in SCENARIOS or not weight.strip().isdigit():
+            raise argparse.ArgumentTypeError(f'mix inválido: {item!r} (esperado {"|".join(SCENARIOS)}=peso)')
+        if int(weight):
+            mix.append((name.strip(), int(weight)))
+    if not mix:
+        raise argparse.ArgumentTypeError('mix sem nenhum cenário com peso > 0')
+    return mix
+
+
+def parse_env(text: str) -> Dict[str, str]:
+    """'CHAVE=valor,OUTRA=valor' → dict (variáveis de ambiente do servidor)."""
+    env = {}
+    for item in filter(None, text.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep or not key:
+            raise argparse.ArgumentTypeError(f'variável inválida: {item!r} (esperado CHAVE=valor)')
+        env[key.strip()] = value.strip()
+    return env
+
+
+def cleanup(created: Dict[str, List[str]]):
+    """Apaga os uploads e as propostas (com .gz/.br) gerados pelo teste no servidor local."""
+    paths = [os.path.join(PROJECT_ROOT, 'uploads', name) for name in created['uploads']]
+    for name in set(created['output']):
+        paths += glob.glob(os.path.join(PROJECT_ROOT, 'output', glob.escape(name) + '*'))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def format_ms(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value:.0f}'
+
+
+def print_level(label: str, concurrency: int, result: Dict):
+    print(f"\n== {label} | {concurrency} usuários | {result['throughput_rps']:.1f} req/s | "
+          f"{result['sessions_per_second']:.2f} sessões/s | erros {result['error_rate']:.1%}"
+          + (f" | RSS workers {', '.join(f'{mb:.0f}' for mb in result['worker_rss_mb'])} MB"
+             if result.get('worker_rss_mb') else '')
+          + (f" | {result['worker_restarts']} worker(s) reciclado(s)" if result.get('worker_restarts') else ''))
+    print(f"{'rota':<20} {'req':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6} {'429/503':>8}")
+    for route, stats in result['routes'].items():
+        print(f"{route:<20} {stats['requests']:>6} {stats['throughput_rps']:>7.2f} {format_ms(stats['p50_ms']):>8} "
+              f"{format_ms(stats['p95_ms']):>8} {format_ms(stats['p99_ms']):>8} {stats['errors']:>6} "
+              f"{stats['rejected']:>8}")
+    for kind, count in list(result['error_kinds'].items())[:5]:
+        print(f'  {count}x {kind}')
+
+
+def print_comparison(runs: List[Dict]):
+    """Uma linha por configuração × concorrência: vazão, erros e p95 de cada rota."""
+    print('\n== comparação (p95 em ms)')
+    print(f"{'configuração':<36} {'usuários':>8} {'req/s':>7} {'erros':>7} "
+          + ' '.join(f'{route:>18}' for route in ROUTES))
+    for run in runs:
+        for level in run['levels']:
+            p95 = [format_ms(level['routes'].get(route, {}).get('p95_ms')) for route in ROUTES]
+            print(f"{run['label']:<36} {level['concurrency']:>8} {level['throughput_rps']:>7.1f} "
+                  f"{level['error_rate']:>7.1%} " + ' '.join(f'{value:>18}' for value in p95))
+
+
+def run_configuration(configuration: Dict, server: Optional[GunicornServer], args, samples) -> Dict:
+    run = {**configuration, 'levels': []}
+    for concurrency in args.concurrency:
+        pids_before = set(server.worker_pids()) if server else set()
+        result, created = run_level(server.url if server else args.url, concurrency, args.duration,
+                                    args.warmup, samples, args.mix, args.think, args.seed)
+        result['concurrency'] = concurrency
+        if server:
+            pids = server.worker_pids()
+            result['worker_rss_mb'] = [round(rss_mb(pid), 1) for pid in pids]
+            # Workers reciclados no nível (max_requests, MEMORY_RECYCLE_MB) explicam quedas de vazão
+            result['worker_restarts'] = len(set(pids) - pids_before)
+            if not args.keep_files:
+                cleanup(created)
+        run['levels'].append(result)
+        print_level(run['label'], concurrency, result)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='servidor já no ar (não sobe o gunicorn; ignora --workers/--threads/--variant)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2])
+    parser.add_argument('--threads', type=int, nargs='+', default=[16], help='GUNICORN_THREADS')
+    parser.add_argument('--variant', type=parse_env, action='append',
+                        help='variáveis do servidor a comparar, ex.: CONCURRENCY_OCR=1:2:10,JSON_PROVIDER=json')
+    parser.add_argument('--env', type=parse_env, default={}, help='variáveis aplicadas a todas as configurações')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16], help='usuários virtuais')
+    parser.add_argument('--duration', type=float, default=30, help='segundos medidos por nível')
+    parser.add_argument('--warmup', type=float, default=5, help='segundos iniciais descartados por nível')
+    parser.add_argument('--think', type=float, default=0, help='pausa média entre sessões (s); 0 = carga máxima')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'pesos dos cenários (padrão {DEFAULT_MIX})')
+    parser.add_argument('--samples', help='diretório com orçamentos reais para o upload-ocr')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep-files', action='store_true', help='não apaga uploads/propostas gerados')
+    parser.add_argument('--json', dest='json_path', help='grava o resultado completo em JSON')
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    if args.url:
+        configurations = [{'label': args.url, 'url': args.url}]
+    else:
+        configurations = [
+            {'label': ' '.join([f'w={workers} t={threads}', *(f'{k}={v}' for k, v in variant.items())]),
+             'workers': workers, 'env': {**args.env, 'GUNICORN_THREADS': str(threads), **variant}}
+            for workers, threads, variant in itertools.product(args.workers, args.threads, args.variant or [{}])
+        ]
+
+    runs = []
+    for configuration in configurations:
+        if args.url:
+            server = contextlib.nullcontext()
+        else:
+            # Traces e logs INFO do teste não interessam; o resto vem de gunicorn.conf.py
+            server = GunicornServer(configuration['workers'],
+                                    {'TRACE_FILE': '', 'LOG_LEVEL': 'warning', **configuration['env']})
+        with server:
+            runs.append(run_configuration(configuration, None if args.url else server, args, samples))
+
+    print_comparison(runs)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'mix': dict(args.mix), 'duration_seconds': args.duration, 'warmup_seconds': args.warmup,
+                       'think_seconds': args.think, 'runs': runs}, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
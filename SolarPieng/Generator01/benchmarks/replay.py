@@ -0,0 +1,238 @@
+"""
+Replay de requisições gravadas em produção contra duas builds, com diff de saída e tempo.
+
+Grave com RECORD_SAMPLE_RATE (ver src/utils/recording.py) e reproduza o arquivo
+contra a build de referência (ex.: um `git worktree` da main) e a build candidata
+(por padrão, este diretório). Cada build roda num processo próprio
+(benchmarks/replay_runner.py, com bancos temporários), `--passes` vezes em ordem
+alternada, e por requisição o relatório compara status, saída (JSON normalizado, e o
+HTML gerado pelo generate-html) e o menor tempo entre todas as execuções.
+
+Campos que mudam a cada execução (ids, nomes de arquivo, datas) são mascarados
+antes do diff, e números com diferença só no 10º dígito significativo são iguais.
+Sai com código 1 se alguma saída mudar (ou, com `--fail-slower`, se alguma
+requisição ficar mais de `--threshold` mais lenta).
+
+Uso (a partir da raiz do projeto):
+    git worktree add /tmp/main main
+    python -m benchmarks.replay logs/recordings --baseline /tmp/main/SolarPieng/Generator01
+    python -m benchmarks.replay logs/recordings --baseline /tmp/main/SolarPieng/Generator01 -k quick-quote --json diff.json
+"""
+import argparse
+import difflib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+from benchmarks.server import PROJECT_ROOT
+
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay_runner.py')
+
+VOLATILE_KEYS = frozenset({'proposal_set_id', 'filename', 'file_path', 'download_url', 'trace_id', 'timing',
+                           'created_at', 'expires_at', 'revision'})
+
+# Datas e timestamps em texto (HTML das propostas, mensagens)
+VOLATILE_PATTERNS = (
+    re.compile(r'\b\d{2}/\d{2}/\d{4}\b'),
+    re.compile(r'\d{8}_\d{6}'),
+    re.compile(r'\b\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?\b'),
+)
+
+DIFF_LINES = 40
+
+
+def mask(value):
+    if isinstance(value, dict):
+        return {key: '<volátil>' if key in VOLATILE_KEYS else mask(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [mask(item) for item in value]
+    if isinstance(value, float):
+        return float(f'{value:.10g}')
+    if isinstance(value, str):
+        return mask_text(value)
+    return value
+
+
+def mask_text(text: str) -> str:
+    for pattern in VOLATILE_PATTERNS:
+        text = pattern.sub('<volátil>', text)
+    return text
+
+
+def normalize(text: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Texto comparável: JSON/NDJSON mascarado e com chaves ordenadas; o resto, só mascarado."""
+    if text is None:
+        return None
+    try:
+        if content_type and content_type.startswith('application/x-ndjson'):
+            lines = [json.loads(line) for line in text.splitlines() if line.strip()]
+            return '\n'.join(json.dumps(mask(line), sort_keys=True, ensure_ascii=False) for line in lines)
+        if content_type and content_type.startswith('application/json'):
+            return json.dumps(mask(json.loads(text)), sort_keys=True, ensure_ascii=False, indent=1)
+    except ValueError:
+        pass
+    return mask_text(text)
+
+
+def load_entries(archive: str, keyword: Optional[str], limit: Optional[int]) -> List[Dict]:
+    index = os.path.join(archive, 'index.jsonl')
+    if not os.path.exists(index):
+        sys.exit(f'Nenhuma gravação em {archive} (esperado {index})')
+    entries = []
+    with open(index, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if keyword and keyword not in entry['path']:
+                continue
+            entries.append(entry)
+            if limit and len(entries) >= limit:
+                break
+    return entries
+
+
+def run_build(build: str, entries_path: str, archive: str, rounds: int) -> List[Dict]:
+    if not os.path.exists(os.path.join(build, 'src', 'main.py')):
+        sys.exit(f'{build} não parece a raiz de uma build (falta src/main.py)')
+    with tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False) as out:
+        output_path = out.name
+    try:
+        subprocess.run([sys.executable, RUNNER_PATH, entries_path, archive, output_path, str(rounds)],
+                       cwd=build, check=True)
+        with open(output_path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+    finally:
+        os.remove(output_path)
+
+
+def merge_timings(results: Dict[str, List[Dict]], name: str, replayed: List[Dict]):
+    """A saída vem da primeira passada; os tempos de todas se acumulam (vale o menor)."""
+    if name not in results:
+        results[name] = replayed
+        return
+    for result, extra in zip(results[name], replayed):
+        result['timings_ms'] += extra['timings_ms']
+
+
+def diff(before: Optional[str], after: Optional[str], label: str) -> List[str]:
+    lines = list(difflib.unified_diff((before or '').splitlines(), (after or '').splitlines(),
+                                      f'baseline/{label}', f'candidate/{label}', lineterm='', n=2))
+    return lines[:DIFF_LINES] + ([f'... ({len(lines) - DIFF_LINES} linhas omitidas)'] if len(lines) > DIFF_LINES else [])
+
+
+def compare(entries: List[Dict], baseline: List[Dict], candidate: List[Dict], threshold: float) -> List[Dict]:
+    rows = []
+    for i, (entry, before, after) in enumerate(zip(entries, baseline, candidate)):
+        output_before = normalize(before['output'], before['content_type'])
+        output_after = normalize(after['output'], after['content_type'])
+        artifact_before = normalize(before['artifact'], 'text/html')
+        artifact_after = normalize(after['artifact'], 'text/html')
+        ms_before = min(before['timings_ms']) if before['timings_ms'] else None
+        ms_after = min(after['timings_ms']) if after['timings_ms'] else None
+        ratio = ms_after / ms_before if ms_before and ms_after else None
+
+        changes = []
+        if before['status'] != after['status']:
+            changes.append(f"status {before['status']} → {after['status']}")
+        if output_before != output_after:
+            changes += diff(output_before, output_after, 'resposta')
+        if artifact_before != artifact_after:
+            changes += diff(artifact_before, artifact_after, 'html')
+        rows.append({
+            'index': i,
+            'recorded_at': entry['recorded_at'],
+            'request': f"{entry['method']} {entry['path']}" + (f"?{entry['query_string']}" if entry['query_string'] else ''),
+            'status': [before['status'], after['status']],
+            'baseline_ms': ms_before,
+            'candidate_ms': ms_after,
+            'recorded_ms': entry.get('duration_ms'),
+            'change': None if ratio is None else ratio - 1,
+            'slower': ratio is not None and ratio > 1 + threshold,
+            'same_output': not changes,
+            'diff': changes
+        })
+    return rows
+
+
+def format_ms(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value:.1f}'
+
+
+def print_report(rows: List[Dict], show_diffs: int):
+    print(f"{'#':>4} {'requisição':<48} {'status':>9} {'baseline':>10} {'candidata':>10} {'variação':>9}  saída")
+    for row in rows:
+        change = '' if row['change'] is None else f"{row['change'] * 100:+.0f}%"
+        status = '/'.join(str(s) for s in row['status'])
+        flag = 'igual' if row['same_output'] else 'DIFERENTE'
+        if row['slower']:
+            flag += ' (mais lenta)'
+        print(f"{row['index']:>4} {row['request'][:48]:<48} {status:>9} {format_ms(row['baseline_ms']):>10} "
+              f"{format_ms(row['candidate_ms']):>10} {change:>9}  {flag}")
+
+    changed = [row for row in rows if not row['same_output']]
+    for row in changed[:show_diffs]:
+        print(f"\n--- #{row['index']} {row['request']}")
+        print('\n'.join(row['diff']))
+
+    timed = [row for row in rows if row['baseline_ms'] and row['candidate_ms']]
+    total_before = sum(row['baseline_ms'] for row in timed)
+    total_after = sum(row['candidate_ms'] for row in timed)
+    print(f"\n{len(rows)} requisições: {len(changed)} com saída diferente, "
+          f"{sum(row['slower'] for row in rows)} mais lentas; tempo total "
+          f"{total_before:.0f} ms → {total_after:.0f} ms"
+          + (f' ({(total_after / total_before - 1) * 100:+.1f}%)' if total_before else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archive', help='diretório das gravações (RECORD_DIR)')
+    parser.add_argument('--baseline', required=True, help='raiz da build de referência (contém src/main.py)')
+    parser.add_argument('--candidate', default=PROJECT_ROOT, help='raiz da build candidata (padrão: esta)')
+    parser.add_argument('--rounds', type=int, default=3, help='execuções por requisição (vale o menor tempo)')
+    parser.add_argument('--passes', type=int, default=2, help='execuções de cada build, em ordem alternada')
+    parser.add_argument('-k', dest='keyword', help='só requisições cuja rota contém o texto')
+    parser.add_argument('--limit', type=int, help='só as N primeiras requisições')
+    parser.add_argument('--threshold', type=float, default=0.25, help='variação de tempo tolerada (0.25 = 25%%)')
+    parser.add_argument('--fail-slower', action='store_true', help='sai com código 1 também se houver lentidão')
+    parser.add_argument('--show-diffs', type=int, default=5, help='diffs exibidos no relatório')
+    parser.add_argument('--json', dest='json_path', help='grava o relatório completo em JSON')
+    args = parser.parse_args()
+
+    archive = os.path.abspath(args.archive)
+    entries = load_entries(archive, args.keyword, args.limit)
+    if not entries:
+        sys.exit('Nenhuma requisição para reproduzir')
+
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False) as f:
+        entries_path = f.name
+        f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+    builds = {'baseline': os.path.abspath(args.baseline), 'candidate': os.path.abspath(args.candidate)}
+    results: Dict[str, List[Dict]] = {}
+    try:
+        for n in range(args.passes):
+            # Ordem alternada entre passadas: a build que roda depois não leva vantagem
+            # (ou desvantagem) sistemática de cache de disco/CPU
+            for name in (('baseline', 'candidate') if n % 2 == 0 else ('candidate', 'baseline')):
+                merge_timings(results, name, run_build(builds[name], entries_path, archive, args.rounds))
+    finally:
+        os.remove(entries_path)
+    baseline, candidate = results['baseline'], results['candidate']
+
+    rows = compare(entries, baseline, candidate, args.threshold)
+    print_report(rows, args.show_diffs)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'archive': archive, 'baseline': os.path.abspath(args.baseline),
+                       'candidate': os.path.abspath(args.candidate), 'rounds': args.rounds, 'results': rows},
+                      f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+    if any(not row['same_output'] for row in rows) or (args.fail_slower and any(row['slower'] for row in rows)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Reproduz requisições gravadas (src/utils/recording.py) contra o app do diretório atual.
+
+Chamado por benchmarks/replay.py uma vez por build, com a raiz da build como cwd.
+Usa só a biblioteca padrão e o pacote `src` da build, que pode ser de outro commit:
+
+    python benchmarks/replay_runner.py ENTRADAS ARQUIVO SAIDA RODADAS
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+GENERATED_FOLDERS = ('uploads', 'output')
+
+
+def load_body(archive: str, entry: dict) -> bytes:
+    if not entry.get('body'):
+        return b''
+    with open(os.path.join(archive, 'bodies', entry['body']), 'rb') as f:
+        return f.read()
+
+
+def replay_entry(client, archive: str, entry: dict, ids: dict, rounds: int) -> dict:
+    body = load_body(archive, entry)
+    path = entry['path']
+    is_json = entry['headers'].get('Content-Type', '').startswith(('application/json', 'application/x-ndjson'))
+    # Conjuntos de propostas criados na gravação têm outro id nesta build
+    for recorded, replayed in ids.items():
+        path = path.replace(recorded, replayed)
+        if is_json:
+            body = body.replace(recorded.encode(), replayed.encode())
+
+    timings = []
+    first = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = client.open(path, method=entry['method'], query_string=entry['query_string'],
+                               data=body, headers=entry['headers'])
+        data = response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        if first is None:
+            first = (response, data)
+        response.close()
+
+    response, data = first
+    result = {
+        'status': response.status_code,
+        'timings_ms': timings,
+        'content_type': response.content_type,
+        'output': data.decode('utf-8', 'replace'),
+        'artifact': None
+    }
+    if response.is_json:
+        payload = json.loads(data)
+        if isinstance(payload, dict):
+            if entry.get('proposal_set_id') and payload.get('proposal_set_id'):
+                ids[entry['proposal_set_id']] = payload['proposal_set_id']
+            # Propostas HTML: compara também o arquivo gerado
+            artifact_path = payload.get('file_path')
+            if artifact_path and os.path.isfile(artifact_path):
+                with open(artifact_path, 'r', encoding='utf-8', errors='replace') as f:
+                    result['artifact'] = f.read()
+    return result
+
+
+def main():
+    entries_path, archive, output_path, rounds = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+    sys.path.insert(0, os.getcwd())
+    from src.main import create_app
+
+    tmp = tempfile.mkdtemp(prefix='replay-')
+    existing = {folder: set(os.listdir(folder)) if os.path.isdir(folder) else set()
+                for folder in GENERATED_FOLDERS}
+    try:
+        # Bancos temporários: o replay não toca nos dados da build
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'app.db')}",
+            'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db'),
+            'TRACE_FILE': '',
+            'LOG_LEVEL': 'warning',
+            'RECORD_SAMPLE_RATE': 0,
+            'PROFILE_SAMPLE_RATE': 0,
+            # Histórico gravado na própria requisição: leituras seguintes não dependem da fila
+            'WRITE_BEHIND_ENABLED': False
+        })
+        client = app.test_client()
+        ids = {}
+        with open(entries_path, 'r', encoding='utf-8') as source, open(output_path, 'w', encoding='utf-8') as out:
+            for index, line in enumerate(source):
+                entry = json.loads(line)
+                # Mesma semente nas duas builds (ex.: kits simulados do fallback do OCR)
+                random.seed(index)
+                try:
+                    result = replay_entry(client, archive, entry, ids, rounds)
+                except Exception as e:  # a build com defeito não interrompe o replay
+                    result = {'status': None, 'timings_ms': [], 'content_type': None,
+                              'output': f'{type(e).__name__}: {e}', 'artifact': None}
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        for folder, names in existing.items():
+            if os.path.isdir(folder):
+                for name in set(os.listdir(folder)) - names:
+                    os.remove(os.path.join(folder, name))
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Sobe o app sob gunicorn (gunicorn.conf.py) para os benchmarks que precisam de HTTP real."""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    """RSS de um processo em MB (Linux, via /proc)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return 0.0
+
+
+class GunicornServer:
+    """
+    Context manager: sobe o gunicorn numa porta livre e espera o /health responder.
+
+        with GunicornServer(workers=2, env={'GUNICORN_THREADS': '8'}) as server:
+            urllib.request.urlopen(server.url + '/health')
+
+    O banco principal e o de conjuntos de propostas ficam num diretório temporário
+    (DATABASE_URL e PROPOSAL_SETS_DB), apagado ao sair: o histórico gravado pela carga
+    sintética não vai para src/database. Passe as variáveis em `env` para usar outro banco.
+    """
+
+    def __init__(self, workers: int, env: Optional[Dict[str, str]] = None, ready_timeout: float = 30):
+        self.workers = workers
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.env = dict(os.environ, PORT=str(self.port), WEB_CONCURRENCY=str(workers), **(env or {}))
+        self.ready_timeout = ready_timeout
+        self.ready_seconds = None
+        self.proc: Optional[subprocess.Popen] = None
+        self._database_dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def __enter__(self) -> 'GunicornServer':
+        self._database_dir = tempfile.TemporaryDirectory(prefix='pieng-bench-')
+        self.env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(self._database_dir.name, 'app.db')}")
+        self.env.setdefault('PROPOSAL_SETS_DB', os.path.join(self._database_dir.name, 'proposal_sets.db'))
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning',
+             '--access-logfile', '/dev/null'],
+            cwd=PROJECT_ROOT, env=self.env)
+        t0 = time.perf_counter()
+        while True:
+            try:
+                urllib.request.urlopen(f'{self.url}/health', timeout=1).read()
+                # Um worker já responde; espera os demais subirem (pids estáveis para quem mede)
+                if len(self.worker_pids()) >= self.workers:
+                    break
+            except OSError:
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f'gunicorn saiu com código {self.proc.returncode}')
+            if time.perf_counter() - t0 > self.ready_timeout:
+                self.stop()
+                raise RuntimeError(f'gunicorn não respondeu em {self.ready_timeout:.0f}s')
+            time.sleep(0.05)
+        self.ready_seconds = time.perf_counter() - t0
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def worker_pids(self) -> List[int]:
+        out = subprocess.run(['pgrep', '-P', str(self.proc.pid)], capture_output=True, text=True).stdout
+        return [int(pid) for pid in out.split()]
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            self.proc.wait(timeout=30)
+        if self._database_dir is not None:
+            self._database_dir.cleanup()
+            self._database_dir = None
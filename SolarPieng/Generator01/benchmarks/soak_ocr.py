@@ -0,0 +1,93 @@
+"""
+Soak test do /api/upload-ocr: verifica que a memória do worker fica estável.
+
+Envia N uploads (PDFs de fornecedor e fotos JPEG de 12 MP, alternados) ao app em
+processo e amostra a RSS a cada `--sample-every` requisições. Depois do aquecimento
+(imports, caches do pdfminer/Pillow), a RSS deve ficar plana: o teste falha (exit 1)
+se ela crescer mais que `--max-growth-mb` entre o primeiro e o último quarto das amostras.
+
+Sem o binário do Tesseract as imagens são decodificadas e caem no fallback, o que
+ainda exercita a abertura/decodificação/fechamento das imagens.
+
+Uso (a partir da raiz do projeto, Linux):
+    python -m benchmarks.soak_ocr --uploads 1000
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import make_quote_image, make_supplier_pdf
+from src.main import create_app
+from src.routes.api import UPLOAD_FOLDER
+from src.utils.memory import MB, current_rss
+
+
+def run(uploads: int, warmup: int, sample_every: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'PROPOSAL_SETS_DB': os.path.join(tmp, 'proposal_sets.db'), 'TRACE_FILE': ''})
+        client = app.test_client()
+        image = make_quote_image()
+        pdfs = [make_supplier_pdf(seed) for seed in range(20)]
+
+        samples = []
+        outcomes = {}
+        t0 = time.perf_counter()
+        for i in range(warmup + uploads):
+            if i % 2:
+                body, name = image, f'foto_{i}.jpg'
+            else:
+                body, name = pdfs[i % len(pdfs)], f'orcamento_{i}.pdf'
+            response = client.post('/api/upload-ocr', data={'file': (io.BytesIO(body), name)})
+            assert response.status_code == 200, response.data
+            data = response.get_json()
+            os.remove(os.path.join(UPLOAD_FOLDER, data['filename']))
+
+            if i >= warmup:
+                kind = 'pdf' if name.endswith('.pdf') else 'image'
+                fallback = 'Genérico' in data['systems_data'][0]['name']
+                key = f"{kind}_{'fallback' if fallback else 'parsed'}"
+                outcomes[key] = outcomes.get(key, 0) + 1
+                if (i - warmup) % sample_every == 0:
+                    samples.append(current_rss())
+        samples.append(current_rss())
+        elapsed = time.perf_counter() - t0
+
+    quarter = max(len(samples) // 4, 1)
+    first = statistics.median(samples[:quarter])
+    last = statistics.median(samples[-quarter:])
+    return {
+        'uploads': uploads,
+        'seconds': elapsed,
+        'outcomes': outcomes,
+        'rss_mb_samples': [round(s / MB, 1) for s in samples],
+        'rss_mb_first_quarter': first / MB,
+        'rss_mb_last_quarter': last / MB,
+        'growth_mb': (last - first) / MB
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--sample-every', type=int, default=50)
+    parser.add_argument('--max-growth-mb', type=float, default=15.0)
+    args = parser.parse_args()
+
+    if current_rss() is None:
+        sys.exit('RSS indisponível: o soak test precisa de /proc (Linux)')
+
+    result = run(args.uploads, args.warmup, args.sample_every)
+    result['max_growth_mb'] = args.max_growth_mb
+    result['flat'] = result['growth_mb'] <= args.max_growth_mb
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['flat'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Contenção no SQLite com vários processos gravando ao mesmo tempo.
+
+Simula N workers do gunicorn: cada processo cria o app sobre o mesmo banco
+temporário e, por --duration segundos, grava comparações de --kits kits no
+histórico (proposal_history.record: cliente, kits, propostas e resumos de
+analytics numa transação), enquanto --readers processos leem a primeira página
+de /api/proposals e os resumos de /api/analytics.
+
+Configurações comparadas:
+- default: o SQLite sem ajustes (journal DELETE, synchronous FULL, cache de 2 MB, sem mmap)
+- wal: os PRAGMAs de src/utils/storage.py (WAL, synchronous NORMAL, cache e mmap)
+- tuned: os PRAGMAs e o write_lock() entre processos (o padrão do app)
+
+Para cada número de escritores: gravações/s, latência de gravação e de leitura
+(p50/p99/máx) e falhas (lock não obtido dentro do busy_timeout).
+
+Uso (a partir da raiz do projeto, Linux):
+    python -m benchmarks.sqlite_contention --writers 1 4 8 --readers 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.fixtures import make_client, make_parameters, make_systems
+from benchmarks.load_test import percentile
+
+VARIANTS = {
+    'default': {'SQLITE_JOURNAL_MODE': 'delete', 'SQLITE_SYNCHRONOUS': 'full', 'SQLITE_CACHE_MB': 2,
+                'SQLITE_MMAP_MB': 0, 'SQLITE_WRITE_LOCK': False},
+    'wal': {'SQLITE_WRITE_LOCK': False},
+    'tuned': {}
+}
+
+
+def _app_config(db_dir: str, variant: str) -> dict:
+    return dict(VARIANTS[variant], **{
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(db_dir, 'app.db')}",
+        'PROPOSAL_SETS_DB': os.path.join(db_dir, 'proposal_sets.db'),
+        'TRACE_FILE': '',
+        'LOG_LEVEL': 'critical',
+        'WRITE_BEHIND_ENABLED': False
+    })
+
+
+def _setup(db_dir: str, variant: str):
+    # Esquema criado uma vez, antes dos processos concorrentes (create_all não é atômico)
+    from src.main import create_app
+    create_app(_app_config(db_dir, variant))
+
+
+def _process(role: str, index: int, db_dir: str, variant: str, kits: int, duration: float,
+             start, results):
+    from sqlalchemy.exc import OperationalError
+
+    from src.main import create_app
+    from src.utils.analytics import sales_analytics
+    from src.utils.calculator import SolarCalculator
+    from src.utils.proposal_history import proposal_history
+    from src.utils.proposal_store import ProposalSet
+
+    app = create_app(_app_config(db_dir, variant))
+    systems = make_systems(kits, seed=index)
+    proposals = SolarCalculator().compare_systems(systems, make_parameters())
+    proposal_set = ProposalSet(f'{role}{index}', make_client(), systems, make_parameters(), proposals,
+                               time.time(), time.time())
+    today = date.today()
+
+    latencies = []
+    failures = 0
+    with app.app_context():
+        results.put(('ready', index))
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            if role == 'writer':
+                # record() registra a falha no log e devolve None (a rota não falha)
+                ok = proposal_history.record(proposal_set, seller=f'vendedor{index}') is not None
+            else:
+                try:
+                    proposal_history.list_proposals()
+                    sales_analytics.summary(today - timedelta(days=29), today)
+                    ok = True
+                except OperationalError:
+                    ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                failures += 1
+    results.put(('done', {'role': role, 'latencies': latencies, 'failures': failures}))
+
+
+def _stats(latencies, duration: float, failures: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        'per_second': len(latencies) / duration,
+        'p50_ms': (percentile(latencies, 50) or 0) * 1000,
+        'p99_ms': (percentile(latencies, 99) or 0) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0) * 1000,
+        'failures': failures
+    }
+
+
+def run(variant: str, writers: int, readers: int, kits: int, duration: float) -> dict:
+    context = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory() as db_dir:
+        setup = context.Process(target=_setup, args=(db_dir, variant))
+        setup.start()
+        setup.join()
+
+        start = context.Event()
+        results = context.Queue()
+        roles = ['writer'] * writers + ['reader'] * readers
+        processes = [context.Process(target=_process, args=(role, i, db_dir, variant, kits, duration,
+                                                            start, results))
+                     for i, role in enumerate(roles)]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            results.get(timeout=60)
+        start.set()
+
+        collected = []
+        while len(collected) < len(processes):
+            try:
+                kind, payload = results.get(timeout=duration + 60)
+            except queue.Empty:
+                break
+            if kind == 'done':
+                collected.append(payload)
+        for process in processes:
+            process.join()
+
+    result = {'variant': variant, 'writers': writers, 'readers': readers, 'kits': kits}
+    for role in ('writer', 'reader'):
+        latencies = [value for item in collected if item['role'] == role for value in item['latencies']]
+        failures = sum(item['failures'] for item in collected if item['role'] == role)
+        if role == 'writer' or readers:
+            result[f'{role}s'] = _stats(latencies, duration, failures)
+    result['proposals_per_second'] = result['writers']['per_second'] * kits
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 8], help='processos escritores')
+    parser.add_argument('--readers', type=int, default=2, help='processos leitores')
+    parser.add_argument('--kits', type=int, default=20, help='kits por gravação')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=list(VARIANTS))
+    args = parser.parse_args()
+
+    results = [run(variant, writers, args.readers, args.kits, args.duration)
+               for writers in args.writers for variant in args.variants]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Mede o tempo de inicialização (cold start) e a memória dos workers.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.startup                 # cold start de create_app()
+    python -m benchmarks.startup --gunicorn 2    # RSS por worker sob gunicorn
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import urllib.request
+
+from benchmarks.server import PROJECT_ROOT, GunicornServer, rss_mb
+
+HEAVY_MODULES = ('pdfplumber', 'pdfminer', 'PIL', 'pytesseract', 'numpy')
+
+COLD_START_SNIPPET = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+from src.main import create_app
+app = create_app()
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    'seconds': elapsed,
+    'maxrss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_loaded': [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_cold_start(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', COLD_START_SNIPPET], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    seconds = [s['seconds'] for s in samples]
+    return {
+        'runs': runs,
+        'cold_start_ms_median': statistics.median(seconds) * 1000,
+        'cold_start_ms_min': min(seconds) * 1000,
+        'maxrss_mb': statistics.median(s['maxrss_mb'] for s in samples),
+        'heavy_loaded': samples[-1]['heavy_loaded']
+    }
+
+
+def measure_gunicorn(workers: int, requests: int = 20) -> dict:
+    """Sobe o gunicorn com gunicorn.conf.py e mede a RSS de cada worker (Linux)."""
+    with GunicornServer(workers) as server:
+        for _ in range(requests):
+            req = urllib.request.Request(f'{server.url}/api/test-calculation', data=b'{}', method='POST',
+                                         headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(req, timeout=5).read()
+
+        return {
+            'workers': workers,
+            'ready_ms': server.ready_seconds * 1000,
+            'master_rss_mb': rss_mb(server.proc.pid),
+            'worker_rss_mb': [rss_mb(pid) for pid in server.worker_pids()]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--gunicorn', type=int, metavar='WORKERS', default=0,
+                        help='mede também a RSS por worker sob gunicorn')
+    args = parser.parse_args()
+
+    result = {'cold_start': measure_cold_start(args.runs)}
+    if args.gunicorn:
+        result['gunicorn'] = measure_gunicorn(args.gunicorn)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
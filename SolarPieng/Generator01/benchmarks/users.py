@@ -0,0 +1,101 @@
+"""
+Benchmark das rotas /api/user/users (listagem por cursor e gravação em lote).
+
+- write: grava --batch usuários com POST /users/bulk (uma transação) e, para
+  referência, com um POST /users por usuário (um commit cada);
+- read: popula um SQLite temporário com --rows usuários e mede a primeira página,
+  uma página profunda por cursor contra a mesma página por OFFSET (o que a listagem
+  sem cursor obrigaria), os filtros por prefixo de username/e-mail e a projeção de
+  uma coluna, mais a listagem antiga (a tabela inteira por requisição).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.users --rows 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from benchmarks.history import _median_ms
+
+CHUNK = 10000
+
+
+def _make_app(db_path: str):
+    from src.main import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'PROPOSAL_SETS_DB': os.path.join(os.path.dirname(db_path), 'proposal_sets.db'),
+        'TRACE_FILE': '',
+        'LOG_LEVEL': 'warning'
+    })
+
+
+def _users(start: int, count: int):
+    return [{'username': f'vendedor{i:07d}', 'email': f'vendedor{i}@example.com'}
+            for i in range(start, start + count)]
+
+
+def run_write(batch: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _make_app(os.path.join(tmp, 'users.db')).test_client()
+        t0 = time.perf_counter()
+        response = client.post('/api/user/users/bulk', json={'users': _users(0, batch)})
+        bulk_ms = (time.perf_counter() - t0) * 1000
+        assert response.status_code == 201, response.get_json()
+
+        t0 = time.perf_counter()
+        for user in _users(batch, batch):
+            client.post('/api/user/users', json=user)
+        per_request_ms = (time.perf_counter() - t0) * 1000
+    return {'users': batch, 'bulk_ms': bulk_ms, 'per_request_ms': per_request_ms,
+            'speedup': per_request_ms / bulk_ms}
+
+
+def run_read(rows: int, repeat: int) -> dict:
+    from src.models.user import User, db
+    from src.utils import user_directory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _make_app(os.path.join(tmp, 'users.db'))
+        with app.app_context():
+            t0 = time.perf_counter()
+            for offset in range(0, rows, CHUNK):
+                user_directory.bulk_save(_users(offset, min(CHUNK, rows - offset)))
+            populate_s = time.perf_counter() - t0
+
+            middle = rows // 2
+            cursor = user_directory.encode_cursor(middle, middle)
+            results = {
+                'first_page': lambda: user_directory.list_users(),
+                'deep_page_cursor': lambda: user_directory.list_users(cursor=cursor),
+                'deep_page_offset': lambda: db.session.execute(
+                    select(User.id, User.username, User.email).order_by(User.id).offset(middle).limit(50)).all(),
+                'username_prefix': lambda: user_directory.list_users(username='vendedor00123', sort='username'),
+                'email_prefix': lambda: user_directory.list_users(email='vendedor4567', sort='email'),
+                'projection_username': lambda: user_directory.list_users(fields='username', cursor=cursor),
+                'full_table': lambda: [user.to_dict() for user in User.query.all()]
+            }
+            timings = {name: _median_ms(fn, 1 if name == 'full_table' else repeat)
+                       for name, fn in results.items()}
+            db.session.remove()
+    return {'rows': rows, 'populate_s': populate_s, 'ms': timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='usuários na tabela (leitura)')
+    parser.add_argument('--batch', type=int, default=5000, help='usuários por lote (escrita)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({
+        'write': run_write(args.batch),
+        'read': run_read(args.rows, args.repeat)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
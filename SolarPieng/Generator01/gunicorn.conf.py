@@ -0,0 +1,59 @@
+# Configuração do gunicorn para produção (Heroku/dynos).
+# Uso: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# Executar a partir da raiz do projeto (data/, uploads/, output/ são relativos)
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+wsgi_app = 'src.main:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Workers: 2 * CPU + 1, limitado para não estourar a memória do dyno.
+# WEB_CONCURRENCY (definido pelo Heroku) tem prioridade.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+
+# gthread: o OCR roda em subprocesso (tesseract) e a renderização é curta,
+# então algumas threads por worker aproveitam melhor a CPU sem multiplicar a RSS.
+# O trabalho caro é limitado pelos pools de concorrência (src/utils/concurrency.py):
+# com 16 threads, os pools padrão (13 requisições executando + na fila) cabem no
+# limite do worker (threads - 1) e as demais threads atendem rotas baratas.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Carrega a aplicação no master antes do fork: as páginas de código são
+# compartilhadas (copy-on-write) entre os workers.
+preload_app = True
+
+# Recicla workers periodicamente para conter vazamentos (Pillow/pdfplumber);
+# MEMORY_RECYCLE_MB recicla antes, pela RSS (ver src/utils/memory.py)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    # Em dynos dedicados a OCR vale importar os módulos pesados no master,
+    # para que sejam compartilhados pelos workers em vez de importados em cada um.
+    if os.environ.get('PRELOAD_OCR_MODULES') == '1':
+        from src.utils.data_extractor import preload_heavy_modules
+        preload_heavy_modules()
+
+
+def post_fork(server, worker):
+    # Conexões SQLite abertas no master (create_all) não podem ser herdadas
+    from src.models.user import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    # Permite ao watchdog de memória reciclar este worker (MEMORY_RECYCLE_MB)
+    from src.utils.memory import memory_watchdog
+    memory_watchdog.attach_worker(worker)
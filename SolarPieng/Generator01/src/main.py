@@ -1,164 +1,239 @@
-# ===== Procfile =====
-# Arquivo: Procfile (sem extensão)
-web: python src/main.py
-
-# ===== runtime.txt =====
-# Arquivo: runtime.txt
-python-3.11.0
-
-# ===== requirements.txt ATUALIZADO =====
-# Arquivo: requirements.txt
-blinker==1.9.0
-cffi==1.17.1
-charset-normalizer==3.4.2
-click==8.2.1
-cryptography==45.0.4
-Flask==3.1.1
-flask-cors==6.0.0
-Flask-SQLAlchemy==3.1.1
-greenlet==3.2.3
-itsdangerous==2.2.0
-Jinja2==3.1.6
-MarkupSafe==3.0.2
-packaging==25.0
-pdfminer.six==20250506
-pdfplumber==0.11.7
-pillow==11.2.1
-pycparser==2.22
-pypdfium2==4.30.1
-pytesseract==0.3.13
-SQLAlchemy==2.0.41
-typing_extensions==4.14.0
-Werkzeug==3.1.3
-gunicorn==21.2.0
-
-# ===== main.py MODIFICADO PARA HEROKU =====
-# Arquivo: src/main.py
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
+from werkzeug.security import safe_join
 from flask_cors import CORS
+from src.models import analytics, component, proposal  # noqa: F401 (registra as tabelas no create_all)
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.api import api_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'pieng_solar_generator_secret_key_2024'
-
-# Habilitar CORS para permitir requisições do frontend
-CORS(app)
-
-# Registrar blueprints
-app.register_blueprint(user_bp, url_prefix='/api/user')
-app.register_blueprint(api_bp, url_prefix='/api')
-
-# Configuração do banco de dados (opcional para este projeto)
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-# Configurações de upload
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-# Criar diretórios necessários se não existirem
-os.makedirs('uploads', exist_ok=True)
-os.makedirs('output', exist_ok=True)
-os.makedirs('logs', exist_ok=True)
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+from src.routes.analytics import analytics_bp
+from src.routes.api import api_bp, tenant_registry
+from src.routes.components import components_bp
+from src.routes.history import history_bp
+from src.utils.analytics import sales_analytics
+from src.utils.catalog_import import catalog_importer
+from src.utils.component_catalog import component_catalog
+from src.utils.compression import init_response_compression, precompress_directory, send_precompressed
+from src.utils.concurrency import DEFAULT_POOLS, concurrency_limiter
+from src.utils.config_service import config_service
+from src.utils.json_provider import init_json_provider
+from src.utils.logging_setup import init_logging
+from src.utils.memory import memory_watchdog
+from src.utils.metrics import metrics
+from src.utils.profiling import request_profiler
+from src.utils.proposal_history import proposal_history
+from src.utils.proposal_store import proposal_store
+from src.utils.recording import request_recorder
+from src.utils.storage import sqlite_storage, write_behind
+from src.utils.tracing import tracer
+
+
+def _pool_from_env(name: str, default: tuple) -> tuple:
+    value = os.environ.get(f'CONCURRENCY_{name.upper()}')
+    if not value:
+        return default
+    max_concurrent, max_queue, queue_timeout = value.split(':')
+    return int(max_concurrent), int(max_queue), float(queue_timeout)
+
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Cria e configura a aplicação Flask.
+
+    Usada tanto pelo servidor de desenvolvimento (python src/main.py) quanto
+    pelo gunicorn (ver gunicorn.conf.py: wsgi_app = "src.main:create_app()").
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'pieng_solar_generator_secret_key_2024')
+
+    # Habilitar CORS para permitir requisições do frontend
+    CORS(app)
+
+    # Registrar blueprints
+    app.register_blueprint(user_bp, url_prefix='/api/user')
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(history_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(components_bp, url_prefix='/api')
+
+    # Configuração do banco de dados (DATABASE_URL sobrescreve; ex.: benchmarks com banco temporário)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or (
+        f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Configurações de upload
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+
+    # Configuração/catálogo (data/*.json) carregados uma vez e revalidados por stat
+    app.config['DATA_FOLDER'] = 'data'
+    app.config['CONFIG_REVALIDATE_SECONDS'] = float(os.environ.get('CONFIG_REVALIDATE_SECONDS', 5))
+
+    # Serialização JSON (orjson quando disponível) e compressão das respostas
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER')
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+    # Conjuntos de propostas guardados no servidor (LRU em memória + SQLite)
+    app.config['PROPOSAL_SETS_DB'] = os.environ.get('PROPOSAL_SETS_DB') or (
+        os.path.join(os.path.dirname(__file__), 'database', 'proposal_sets.db'))
+    app.config['PROPOSAL_SETS_MAX_ENTRIES'] = int(os.environ.get('PROPOSAL_SETS_MAX_ENTRIES', 256))
+    app.config['PROPOSAL_SETS_TTL_SECONDS'] = int(os.environ.get('PROPOSAL_SETS_TTL_SECONDS', 3600))
+    # /api/generate-html com as propostas no corpo (valores do cliente, sem conferência): desligado
+    app.config['GENERATE_HTML_RAW_PROPOSALS'] = os.environ.get('GENERATE_HTML_RAW_PROPOSALS') == '1'
+
+    # Lote NDJSON (/api/calculate-proposal/batch): corpo lido e resposta enviada em streaming
+    app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 512 * 1024 * 1024))
+    app.config['BATCH_CHUNK_BYTES'] = int(os.environ.get('BATCH_CHUNK_BYTES', 64 * 1024))
+
+    # Limite de concorrência por tipo de rota (por worker). Cada pool: (simultâneas, fila, espera máx. em s),
+    # configurável por CONCURRENCY_<POOL>=simultâneas:fila:espera (ex.: CONCURRENCY_OCR=2:4:20)
+    app.config['CONCURRENCY_POOLS'] = {
+        name: _pool_from_env(name, default) for name, default in DEFAULT_POOLS.items()
+    }
+    # Total de requisições caras (executando + na fila) por worker: deixa ao menos
+    # uma thread do gthread livre para /health e rotas baratas
+    threads = int(os.environ.get('GUNICORN_THREADS', 16))
+    app.config['CONCURRENCY_MAX_INFLIGHT'] = int(os.environ.get('CONCURRENCY_MAX_INFLIGHT', max(threads - 1, 1)))
+
+    # SQLite compartilhado pelos workers: WAL, PRAGMAs e pool do engine por worker (uma conexão
+    # por thread do gthread e uma para a fila de write-behind)
+    app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_CACHE_MB'] = int(os.environ.get('SQLITE_CACHE_MB', 16))
+    app.config['SQLITE_MMAP_MB'] = int(os.environ.get('SQLITE_MMAP_MB', 64))
+    app.config['SQLITE_POOL_SIZE'] = threads + 1
+    # Transações de escrita em fila entre os workers (flock), em vez do busy handler do SQLite
+    app.config['SQLITE_WRITE_LOCK'] = os.environ.get('SQLITE_WRITE_LOCK', '1') == '1'
+
+    # Gravações não críticas (resumos de analytics, recalculáveis) numa fila por worker, fora
+    # da requisição; desligado, são feitas na própria requisição. O histórico é sempre síncrono
+    app.config['WRITE_BEHIND_ENABLED'] = os.environ.get('WRITE_BEHIND_ENABLED', '1') == '1'
+    app.config['WRITE_BEHIND_MAX_SIZE'] = int(os.environ.get('WRITE_BEHIND_MAX_SIZE', 10000))
+
+    # Importação de listas de preço (flask import-components ou POST /api/admin/components/import,
+    # com PROFILE_ADMIN_TOKEN): linhas comparadas e gravadas em lotes de CATALOG_IMPORT_BATCH_SIZE
+    app.config['CATALOG_IMPORT_BATCH_SIZE'] = int(os.environ.get('CATALOG_IMPORT_BATCH_SIZE', 5000))
+    app.config['CATALOG_IMPORT_MAX_CONTENT_LENGTH'] = int(os.environ.get('CATALOG_IMPORT_MAX_CONTENT_LENGTH',
+                                                                         256 * 1024 * 1024))
+    # Snapshot do catálogo (arrays do NumPy) mapeado por todos os workers; padrão: <banco>-catalog
+    app.config['CATALOG_SNAPSHOT_PATH'] = os.environ.get('CATALOG_SNAPSHOT_PATH')
+
+    # Logs estruturados dos módulos da aplicação: LOG_FORMAT=text|json
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'info')
+    app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'text')
+
+    # Profiling opcional (desligado por padrão): fração das rotas caras e/ou sob demanda
+    # com o cabeçalho X-Profile-Token; resultados em logs/profiles
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_ADMIN_TOKEN'] = os.environ.get('PROFILE_ADMIN_TOKEN')
+    app.config['PROFILE_MODE'] = os.environ.get('PROFILE_MODE', 'cprofile')
+    app.config['PROFILE_DIR'] = os.path.join('logs', 'profiles')
+
+    # Traces do pipeline de OCR (uma linha JSON por upload); TRACE_FILE vazio desliga a gravação
+    app.config['TRACE_FILE'] = os.environ.get('TRACE_FILE', os.path.join('logs', 'traces.jsonl'))
+
+    # Memória dos workers: crescimento de RSS por requisição e reciclagem acima de MEMORY_RECYCLE_MB
+    # (0 desliga); snapshots do tracemalloc sob demanda com o token de PROFILE_ADMIN_TOKEN
+    app.config['MEMORY_RECYCLE_MB'] = int(os.environ.get('MEMORY_RECYCLE_MB', 0))
+    app.config['MEMORY_WARN_DELTA_MB'] = int(os.environ.get('MEMORY_WARN_DELTA_MB', 64))
+    app.config['MEMORY_TRACEMALLOC'] = os.environ.get('MEMORY_TRACEMALLOC') == '1'
+    app.config['MEMORY_SNAPSHOT_DIR'] = os.path.join('logs', 'memory')
+
+    # Tenants white-label compilados em cache por worker (LRU): acima do número de tenants ativos
+    app.config['TENANT_CACHE_SIZE'] = int(os.environ.get('TENANT_CACHE_SIZE', 256))
+
+    # Gravação de requisições de /api para replay (benchmarks/replay.py): fração gravada
+    # (0 desliga), corpos JSON sanitizados; uploads gravados como vieram em RECORD_DIR
+    app.config['RECORD_SAMPLE_RATE'] = float(os.environ.get('RECORD_SAMPLE_RATE', 0))
+    app.config['RECORD_DIR'] = os.environ.get('RECORD_DIR', os.path.join('logs', 'recordings'))
+    app.config['RECORD_MAX_MB'] = int(os.environ.get('RECORD_MAX_MB', 500))
+    # Chave do HMAC que pseudonimiza os dados pessoais gravados (sem ela, aleatória a cada subida)
+    app.config['RECORD_SECRET'] = os.environ.get('RECORD_SECRET')
+
+    if config:
+        app.config.update(config)
+
+    init_logging(app)
+    tracer.init_app(app)
+    init_json_provider(app)
+    metrics.init_app(app)
+    metrics.register_collector(concurrency_limiter.collect_metrics)
+    concurrency_limiter.init_app(app)
+    memory_watchdog.init_app(app)
+    init_response_compression(app)
+
+    sqlite_storage.init_app(app)
+    db.init_app(app)
+    with app.app_context():
+        sqlite_storage.attach(db.engine)
+        db.create_all()
+    write_behind.init_app(app)
+
+    config_service.init_app(app)
+    tenant_registry.init_app(app)
+    proposal_store.init_app(app)
+    proposal_history.init_app(app)
+    sales_analytics.init_app(app)
+    component_catalog.init_app(app)
+    catalog_importer.init_app(app)
+
+    # Por último: envolvem app.wsgi_app (só quando habilitados); o profiler fica por fora
+    request_recorder.init_app(app)
+    request_profiler.init_app(app)
+
+    # Pré-comprimir assets estáticos (.gz/.br) uma vez na inicialização
+    precompress_directory(app.static_folder)
+
+    # Criar diretórios necessários se não existirem
+    os.makedirs('uploads', exist_ok=True)
+    os.makedirs('output', exist_ok=True)
+    os.makedirs('logs', exist_ok=True)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+                return "Static folder not configured", 404
+
+        file_path = safe_join(static_folder_path, path) if path != "" else None
+        if file_path and os.path.isfile(file_path):
+            return send_precompressed(file_path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_precompressed(index_path)
+            else:
+                return "index.html not found", 404
+
+    @app.errorhandler(413)
+    def too_large(e):
+        return "Arquivo muito grande. Tamanho máximo: 16MB", 413
 
-@app.errorhandler(413)
-def too_large(e):
-    return "Arquivo muito grande. Tamanho máximo: 16MB", 413
+    @app.errorhandler(404)
+    def not_found(e):
+        return "Endpoint não encontrado", 404
 
-@app.errorhandler(404)
-def not_found(e):
-    return "Endpoint não encontrado", 404
+    @app.errorhandler(500)
+    def internal_error(e):
+        return f"Erro interno do servidor: {str(e)}", 500
 
-@app.errorhandler(500)
-def internal_error(e):
-    return f"Erro interno do servidor: {str(e)}", 500
+    @app.route('/health')
+    def health_check():
+        """Health check para Heroku"""
+        return {"status": "OK", "version": "1.0"}
+
+    return app
 
-@app.route('/health')
-def health_check():
-    """Health check para Heroku"""
-    return {"status": "OK", "version": "1.0"}
 
 if __name__ == '__main__':
-    # Para desenvolvimento local
-    print("🚀 Iniciando PIENG Solar Generator...")
-    print("📱 Interface disponível em: http://localhost:5000")
-    print("🔧 API disponível em: http://localhost:5000/api")
-    app.run(host='0.0.0.0', port=5000, debug=True)
-else:
-    # Para produção no Heroku
+    # Para desenvolvimento local (em produção o gunicorn chama create_app())
+    app = create_app()
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
-
-# ===== .gitignore =====
-# Arquivo: .gitignore
-__pycache__/
-*.pyc
-*.pyo
-*.pyd
-.Python
-venv/
-env/
-uploads/*
-!uploads/.gitkeep
-output/*
-!output/.gitkeep
-logs/*
-!logs/.gitkeep
-*.db
-.env
-.DS_Store
-Thumbs.db
-
-# ===== app.json (para Heroku) =====
-# Arquivo: app.json
-{
-  "name": "PIENG Solar Generator",
-  "description": "Sistema para geração de propostas de energia solar",
-  "repository": "https://github.com/seu-usuario/pieng-solar",
-  "keywords": ["python", "flask", "solar", "energy"],
-  "env": {
-    "SECRET_KEY": {
-      "description": "Secret key for Flask sessions",
-      "value": "pieng_solar_generator_secret_key_2024"
-    }
-  },
-  "formation": {
-    "web": {
-      "quantity": 1,
-      "size": "basic"
-    }
-  },
-  "buildpacks": [
-    {
-      "url": "heroku/python"
-    },
-    {
-      "url": "https://github.com/heroku/heroku-buildpack-apt"
-    }
-  ]
-}
\ No newline at end of file
+    print("🚀 Iniciando PIENG Solar Generator...")
+    print(f"📱 Interface disponível em: http://localhost:{port}")
+    print(f"🔧 API disponível em: http://localhost:{port}/api")
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG', '1') == '1')
@@ -0,0 +1,42 @@
+from src.models.user import db
+
+
+class MarginBandSummary(db.Model):
+    """Margem somada por dia e faixa de potência (faixas de config_escalonamento.json)."""
+    __tablename__ = 'analytics_margin_bands'
+
+    day = db.Column(db.Date, primary_key=True)
+    band = db.Column(db.String(80), primary_key=True)
+    proposals = db.Column(db.Integer, nullable=False, default=0)
+    margin_sum = db.Column(db.Float, nullable=False, default=0)
+
+
+class PaybackSummary(db.Model):
+    """Propostas por dia e faixa de payback (início da faixa, em meses)."""
+    __tablename__ = 'analytics_payback'
+
+    day = db.Column(db.Date, primary_key=True)
+    bucket_months = db.Column(db.Integer, primary_key=True)
+    proposals = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SellerDailySummary(db.Model):
+    """Orçamentos (conjuntos), propostas e valor ofertado por vendedor e dia."""
+    __tablename__ = 'analytics_seller_daily'
+
+    day = db.Column(db.Date, primary_key=True)
+    seller = db.Column(db.String(80), primary_key=True)
+    quotes = db.Column(db.Integer, nullable=False, default=0)
+    proposals = db.Column(db.Integer, nullable=False, default=0)
+    value_sum = db.Column(db.Float, nullable=False, default=0)
+
+
+class SupplierPriceSummary(db.Model):
+    """Preço final e potência somados por dia e fornecedor do kit (preço médio por kWp)."""
+    __tablename__ = 'analytics_supplier_price'
+
+    day = db.Column(db.Date, primary_key=True)
+    supplier = db.Column(db.String(40), primary_key=True)
+    proposals = db.Column(db.Integer, nullable=False, default=0)
+    price_sum = db.Column(db.Float, nullable=False, default=0)
+    power_sum = db.Column(db.Float, nullable=False, default=0)
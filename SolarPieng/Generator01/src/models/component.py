@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from src.models.user import db
+
+
+class Module(db.Model):
+    """Módulo fotovoltaico do catálogo (sku = id do fornecedor/da planilha, ex.: mod_001)."""
+    __tablename__ = 'catalog_modules'
+    # (coluna, id): filtros por faixa e paginação por cursor na mesma ordem do índice
+    __table_args__ = (
+        db.Index('ix_catalog_modules_power_wp_id', 'power_wp', 'id'),
+        db.Index('ix_catalog_modules_price_id', 'price', 'id'),
+        db.Index('ix_catalog_modules_brand_id', 'brand', 'id'),
+        db.Index('ix_catalog_modules_type_id', 'type', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), unique=True, nullable=False)
+    name = db.Column(db.String(200), nullable=False)
+    brand = db.Column(db.String(80), nullable=False, default='Genérico')
+    type = db.Column(db.String(20))
+    power_wp = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    efficiency = db.Column(db.Float)
+    warranty_years = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        # Mesmas chaves do components_db.json (id = sku, price_per_unit)
+        return {
+            'id': self.sku,
+            'name': self.name,
+            'brand': self.brand,
+            'type': self.type,
+            'power_wp': self.power_wp,
+            'price_per_unit': self.price,
+            'efficiency': self.efficiency,
+            'warranty_years': self.warranty_years
+        }
+
+
+class Inverter(db.Model):
+    """Inversor do catálogo (type: string, micro, híbrido...)."""
+    __tablename__ = 'catalog_inverters'
+    __table_args__ = (
+        db.Index('ix_catalog_inverters_power_kw_id', 'power_kw', 'id'),
+        db.Index('ix_catalog_inverters_price_id', 'price', 'id'),
+        db.Index('ix_catalog_inverters_brand_id', 'brand', 'id'),
+        db.Index('ix_catalog_inverters_type_id', 'type', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), unique=True, nullable=False)
+    name = db.Column(db.String(200), nullable=False)
+    brand = db.Column(db.String(80), nullable=False, default='Genérico')
+    type = db.Column(db.String(20))
+    power_kw = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    efficiency = db.Column(db.Float)
+    warranty_years = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            'id': self.sku,
+            'name': self.name,
+            'brand': self.brand,
+            'type': self.type,
+            'power_kw': self.power_kw,
+            'price': self.price,
+            'efficiency': self.efficiency,
+            'warranty_years': self.warranty_years
+        }
+
+
+class CatalogState(db.Model):
+    """Versão do catálogo (uma linha), incrementada a cada alteração: ETag e caches por versão."""
+    __tablename__ = 'catalog_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
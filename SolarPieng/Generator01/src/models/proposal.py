@@ -0,0 +1,116 @@
+from datetime import datetime
+
+from src.models.user import db
+
+
+class Client(db.Model):
+    __tablename__ = 'clients'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False, index=True)
+    email = db.Column(db.String(120), index=True)
+    phone = db.Column(db.String(40))
+    address = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f'<Client {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'phone': self.phone,
+            'address': self.address,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class Kit(db.Model):
+    """Kit de um fornecedor como foi cotado (uma linha por proposta)."""
+    __tablename__ = 'kits'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    supplier = db.Column(db.String(40))
+    power_kwp = db.Column(db.Float, nullable=False)
+    modules_count = db.Column(db.Integer)
+    modules_desc = db.Column(db.String(255))
+    inverter_desc = db.Column(db.String(255))
+    inverter_type = db.Column(db.String(20))
+    cost = db.Column(db.Float, nullable=False)
+    freight_included = db.Column(db.Boolean, nullable=False, default=True)
+    freight_value = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Kit {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'supplier': self.supplier,
+            'power': self.power_kwp,
+            'modules_count': self.modules_count,
+            'modules_desc': self.modules_desc,
+            'inverter_desc': self.inverter_desc,
+            'inverter_type': self.inverter_type,
+            'vcusto_raw': self.cost,
+            'freight_included': self.freight_included,
+            'freight_value': self.freight_value
+        }
+
+
+class Proposal(db.Model):
+    """
+    Proposta calculada. As colunas usadas em filtros e ordenação são desnormalizadas
+    (potência, preço, margem, payback); o restante do cálculo fica em `data`.
+
+    Os índices compostos terminam em `id` para a paginação por cursor (keyset):
+    "depois de (valor, id)" vira uma busca no índice, sem OFFSET.
+    """
+    __tablename__ = 'proposals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    proposal_set_id = db.Column(db.String(32), index=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    kit_id = db.Column(db.Integer, db.ForeignKey('kits.id'), nullable=False)
+    seller = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    power_kwp = db.Column(db.Float, nullable=False)
+    final_price = db.Column(db.Float, nullable=False)
+    cash_price = db.Column(db.Float)
+    total_cost = db.Column(db.Float)
+    margin_percent = db.Column(db.Float)
+    payback_months = db.Column(db.Float)
+    monthly_generation = db.Column(db.Float)
+    ranking = db.Column(db.Integer)
+    is_recommended = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.JSON)
+
+    client = db.relationship(Client, lazy='joined')
+    kit = db.relationship(Kit, lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_proposals_created_at_id', 'created_at', 'id'),
+        db.Index('ix_proposals_client_created_at_id', 'client_id', 'created_at', 'id'),
+        db.Index('ix_proposals_power_kwp_id', 'power_kwp', 'id'),
+        db.Index('ix_proposals_final_price_id', 'final_price', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Proposal {self.id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'proposal_set_id': self.proposal_set_id,
+            'created_at': self.created_at.isoformat(),
+            'seller': self.seller,
+            'client': self.client.to_dict(),
+            'kit_info': self.kit.to_dict(),
+            'ranking': self.ranking,
+            'is_recommended': self.is_recommended,
+            **(self.data or {})
+        }
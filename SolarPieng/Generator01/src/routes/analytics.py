@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, jsonify, request
+
+from src.utils.analytics import sales_analytics
+
+analytics_bp = Blueprint('analytics', __name__)
+
+DEFAULT_PERIOD_DAYS = 30
+
+
+@analytics_bp.route('/analytics', methods=['GET'])
+def get_analytics():
+    """
+    Painel comercial: margem média por faixa de potência, distribuição de payback,
+    orçamentos por vendedor e dia e preço médio por kWp de cada fornecedor.
+
+    Período: since/until (datas ISO, inclusivas) ou days (padrão: últimos 30 dias).
+    Lê só as tabelas de resumo, mantidas a cada proposta gravada no histórico.
+    """
+    try:
+        until = date.fromisoformat(request.args['until']) if request.args.get('until') else date.today()
+        if request.args.get('since'):
+            since = date.fromisoformat(request.args['since'])
+        else:
+            days = int(request.args.get('days', DEFAULT_PERIOD_DAYS))
+            if days < 1:
+                raise ValueError('days deve ser positivo')
+            since = until - timedelta(days=days - 1)
+    except ValueError as e:
+        return jsonify({'error': f'Período inválido: {e}'}), 400
+    if since > until:
+        return jsonify({'error': 'since deve ser anterior a until'}), 400
+
+    return jsonify({'success': True, **sales_analytics.summary(since, until)})
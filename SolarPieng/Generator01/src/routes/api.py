@@ -1,12 +1,24 @@
-from flask import Blueprint, request, jsonify, send_file
-import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+import io
 import os
+import time
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
+from src.models.user import db
 from src.utils.calculator import SolarCalculator, QuickQuoteGenerator
+from src.utils.compression import send_precompressed
+from src.utils.concurrency import concurrency_limiter
+from src.utils.config_service import config_service
 from src.utils.data_extractor import DataExtractor
-from src.utils.html_generator import ProposalHTMLGenerator
+from src.utils.json_provider import line_dumps
+from src.utils.proposal_batch import calculate_records, iter_records, ndjson_chunks
+from src.utils.proposal_format import RESPONSE_FORMATS, parse_fields, project_fields, to_compact
+from src.utils.proposal_history import proposal_history
+from src.utils.proposal_store import ProposalSet, ProposalSetConflict, proposal_store
+from src.utils.storage import sqlite_storage, write_behind
+from src.utils.tenants import DEFAULT_MAX_TENANTS, TenantNotFoundError, TenantRegistry
+from src.utils.tracing import TRACE_HEADER, tracer
 
 # Criar blueprint para as rotas da API
 api_bp = Blueprint('api', __name__)
@@ -15,6 +27,13 @@ api_bp = Blueprint('api', __name__)
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
+TENANTS_FOLDER = 'data/tenants'
+TENANT_HEADER = 'X-Tenant-ID'
+SELLER_HEADER = 'X-Seller-ID'
+
+# Registro de tenants (branding + templates compilados, em LRU; tamanho em
+# TENANT_CACHE_SIZE, aplicado em main.py com init_app)
+tenant_registry = TenantRegistry(TENANTS_FOLDER, max_tenants=DEFAULT_MAX_TENANTS, config_service=config_service)
 
 # Garantir que as pastas existem
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -23,6 +42,46 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def request_seller(data):
+    """Vendedor responsável (histórico e /api/analytics): cabeçalho X-Seller-ID ou campo seller."""
+    seller = request.headers.get(SELLER_HEADER) or data.get('seller')
+    return str(seller)[:80] if seller else None
+
+def proposals_response(proposal_set, data, **extra):
+    """
+    Resposta JSON de um conjunto de propostas calculado.
+    
+    Formato da resposta: 'default' (aninhado) ou 'compact' (colunar),
+    opcionalmente restrito aos campos pedidos em fields=.
+    """
+    response_format = request.args.get('format') or data.get('format', 'default')
+    fields = parse_fields(request.args.get('fields') or data.get('fields'))
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({'error': f'Formato inválido: {response_format}'}), 400
+    
+    proposals = proposal_set.proposals
+    if response_format == 'compact':
+        result = to_compact(proposals, proposal_set.systems_data, proposal_set.parameters, fields)
+        result.update({
+            'success': True,
+            'client_data': proposal_set.client_data,
+            'proposal_set_id': proposal_set.set_id
+        })
+        result.update(extra)
+        return jsonify(result)
+    
+    if fields is not None:
+        proposals = [project_fields(p, fields) for p in proposals]
+    
+    return jsonify({
+        'success': True,
+        'client_data': proposal_set.client_data,
+        'proposals': proposals,
+        'parameters_used': proposal_set.parameters,
+        'proposal_set_id': proposal_set.set_id,
+        **extra
+    })
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde da API."""
@@ -33,9 +92,13 @@ def health_check():
     })
 
 @api_bp.route('/upload-ocr', methods=['POST'])
+@concurrency_limiter.limit('ocr')
 def upload_and_extract():
     """
     Endpoint para upload de arquivo e extração de dados via OCR.
+
+    Cada upload gera um trace (etapas do DataExtractor) gravado em TRACE_FILE;
+    com ?timing=1 a resposta inclui a linha do tempo em `timing`.
     """
     try:
         if 'file' not in request.files:
@@ -50,18 +113,29 @@ def upload_and_extract():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"{timestamp}_{filename}"
             filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
-            
-            # Extrair dados usando o DataExtractor
-            extractor = DataExtractor()
-            extracted_systems = extractor.extract_systems_from_file(filepath)
-            
-            return jsonify({
+
+            trace_id = tracer.accept_trace_id(request.headers.get(TRACE_HEADER))
+            with tracer.trace('upload-ocr', trace_id, file=filename) as trace:
+                with tracer.span('file_save') as span:
+                    file.save(filepath)
+                    span.set(bytes=os.path.getsize(filepath))
+
+                # Extrair dados usando o DataExtractor
+                extractor = DataExtractor()
+                extracted_systems = extractor.extract_systems_from_file(filepath)
+                trace.set(systems=len(extracted_systems))
+
+            result = {
                 'success': True,
                 'filename': filename,
                 'systems_extracted': len(extracted_systems),
                 'systems_data': extracted_systems
-            })
+            }
+            if request.args.get('timing') in ('1', 'true'):
+                result['timing'] = trace.to_dict()
+            response = jsonify(result)
+            response.headers[TRACE_HEADER] = trace.trace_id
+            return response
         
         return jsonify({'error': 'Tipo de arquivo não permitido'}), 400
     
@@ -69,6 +143,7 @@ def upload_and_extract():
         return jsonify({'error': f'Erro no processamento: {str(e)}'}), 500
 
 @api_bp.route('/calculate-proposal', methods=['POST'])
+@concurrency_limiter.limit('calc')
 def calculate_proposal():
     """
     Endpoint para calcular proposta baseada nos dados dos kits.
@@ -93,17 +168,48 @@ def calculate_proposal():
         # Calcular propostas para todos os sistemas
         proposals = calculator.compare_systems(systems_data, parameters)
         
-        return jsonify({
-            'success': True,
-            'client_data': client_data,
-            'proposals': proposals,
-            'parameters_used': parameters
-        })
+        # Guardar no servidor: /api/generate-html recebe só o proposal_set_id
+        proposal_set = proposal_store.create(client_data, systems_data, parameters, proposals)
+        proposal_history.record(proposal_set, seller=request_seller(data))
+        
+        return proposals_response(proposal_set, data)
     
     except Exception as e:
         return jsonify({'error': f'Erro no cálculo: {str(e)}'}), 500
 
+@api_bp.route('/calculate-proposal/batch', methods=['POST'])
+@concurrency_limiter.limit('calc')
+def calculate_proposal_batch():
+    """
+    Endpoint para calcular vários clientes numa só requisição (ex.: sincronização do CRM).
+    
+    Corpo NDJSON: um registro por linha, {"id": ..., "client_data": {...},
+    "systems_data": [...], "parameters": {...}}. A resposta também é NDJSON,
+    enviada em streaming: uma linha por registro, na mesma ordem, e uma linha
+    final com o resumo. Erros num registro não interrompem o lote.
+    
+    Query string: format=compact, fields=... (como em /calculate-proposal) e
+    store=1 para guardar cada conjunto e devolver o proposal_set_id.
+    """
+    response_format = request.args.get('format', 'default')
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({'error': f'Formato inválido: {response_format}'}), 400
+    fields = parse_fields(request.args.get('fields'))
+    store = proposal_store if request.args.get('store') in ('1', 'true') else None
+    
+    # Lotes podem passar do limite de upload; o corpo é lido em streaming
+    request.max_content_length = current_app.config['BATCH_MAX_CONTENT_LENGTH']
+    
+    # request.stream é um stream "cru": sem buffer, cada readline() leria byte a byte
+    body = io.BufferedReader(request.stream, buffer_size=current_app.config['BATCH_CHUNK_BYTES'])
+    records = iter_records(body, loads=current_app.json.loads)
+    results = calculate_records(records, SolarCalculator(), response_format, fields, store)
+    chunks = ndjson_chunks(results, line_dumps(current_app), current_app.config['BATCH_CHUNK_BYTES'])
+    
+    return Response(stream_with_context(chunks), mimetype='application/x-ndjson')
+
 @api_bp.route('/quick-quote', methods=['POST'])
+@concurrency_limiter.limit('calc')
 def generate_quick_quote():
     """
     Endpoint para gerar orçamento rápido baseado no consumo.
@@ -124,8 +230,8 @@ def generate_quick_quote():
         if not monthly_consumption and not bill_value:
             return jsonify({'error': 'Deve fornecer consumo mensal ou valor da conta'}), 400
         
-        # Inicializar gerador de orçamento rápido
-        quick_generator = QuickQuoteGenerator('data/components_db.json')
+        # Inicializar gerador de orçamento rápido com o catálogo já carregado
+        quick_generator = QuickQuoteGenerator(components_db=config_service.get('components_db'))
         
         # Gerar orçamento
         proposal = quick_generator.generate_quick_quote(
@@ -136,18 +242,28 @@ def generate_quick_quote():
             simultaneity_factor=simultaneity_factor
         )
         
+        proposal_set = proposal_store.create(data.get('client_data', {}), [proposal['kit_info']],
+                                             proposal['parameters_used'], [proposal])
+        proposal_history.record(proposal_set, seller=request_seller(data))
+        
         return jsonify({
             'success': True,
-            'proposal': proposal
+            'proposal': proposal,
+            'proposal_set_id': proposal_set.set_id
         })
     
     except Exception as e:
         return jsonify({'error': f'Erro no orçamento rápido: {str(e)}'}), 500
 
 @api_bp.route('/generate-html', methods=['POST'])
+@concurrency_limiter.limit('render')
 def generate_html_proposal():
     """
     Endpoint para gerar proposta HTML.
+    
+    As propostas vêm do conjunto guardado no servidor (proposal_set_id): valores
+    enviados pelo cliente (preços, paybacks) só são aceitos com
+    GENERATE_HTML_RAW_PROPOSALS=1.
     """
     try:
         data = request.get_json()
@@ -156,17 +272,32 @@ def generate_html_proposal():
             return jsonify({'error': 'Dados não fornecidos'}), 400
         
         # Extrair dados
-        proposals = data.get('proposals', [])
         client_data = data.get('client_data', {})
         format_type = data.get('format', 'standard')  # 'standard' ou 'analytical'
         
+        # Conjunto guardado no servidor: valores calculados não são reenviados pelo
+        # cliente (nem podem ser alterados por ele), nem recalculados
+        proposal_set_id = data.get('proposal_set_id')
+        if proposal_set_id:
+            proposal_set = proposal_store.get(proposal_set_id)
+            if proposal_set is None:
+                return jsonify({'error': 'Conjunto de propostas não encontrado ou expirado'}), 404
+            proposals = proposal_set.proposals
+            client_data = client_data or proposal_set.client_data
+        elif current_app.config['GENERATE_HTML_RAW_PROPOSALS']:
+            proposals = data.get('proposals', [])
+        else:
+            return jsonify({'error': 'proposal_set_id obrigatório (calcule a proposta antes)'}), 400
+        
         if not proposals:
             return jsonify({'error': 'Nenhuma proposta fornecida'}), 400
         
-        # Inicializar gerador HTML
-        html_generator = ProposalHTMLGenerator(
-            branding_path='data/branding.json'
-        )
+        # Inicializar gerador HTML com o branding do tenant (cabeçalho ou corpo)
+        tenant_id = request.headers.get(TENANT_HEADER) or data.get('tenant_id')
+        try:
+            html_generator = tenant_registry.get_generator(tenant_id)
+        except TenantNotFoundError as e:
+            return jsonify({'error': str(e)}), 404
         
         # Gerar nome do arquivo
         client_name = client_data.get('name', 'Cliente')
@@ -194,6 +325,125 @@ def generate_html_proposal():
     except Exception as e:
         return jsonify({'error': f'Erro na geração HTML: {str(e)}'}), 500
 
+@api_bp.route('/concurrency/stats', methods=['GET'])
+def concurrency_stats():
+    """
+    Endpoint com o estado dos pools de concorrência deste worker
+    (vagas ocupadas, fila, recusas e histograma de espera na fila).
+    """
+    return jsonify({
+        'success': True,
+        'stats': concurrency_limiter.stats()
+    })
+
+@api_bp.route('/storage/stats', methods=['GET'])
+def storage_stats():
+    """
+    PRAGMAs efetivos do SQLite principal (WAL, synchronous, mmap...) e estado da
+    fila de write-behind deste worker.
+    """
+    connection = db.engine.raw_connection()
+    try:
+        pragmas = sqlite_storage.stats(connection)
+    finally:
+        connection.close()
+    return jsonify({
+        'success': True,
+        'sqlite': pragmas,
+        'pool': db.engine.pool.status(),
+        'write_behind': write_behind.stats()
+    })
+
+@api_bp.route('/tenants/stats', methods=['GET'])
+def tenants_stats():
+    """
+    Contextos de tenant compilados em cache neste worker (ocupação do LRU e
+    quantas compilações já foram feitas).
+    """
+    return jsonify({
+        'success': True,
+        'stats': tenant_registry.stats()
+    })
+
+@api_bp.route('/proposal-sets/stats', methods=['GET'])
+def proposal_sets_stats():
+    """
+    Endpoint com estatísticas do armazenamento de conjuntos de propostas.
+    """
+    return jsonify({
+        'success': True,
+        'stats': proposal_store.stats()
+    })
+
+@api_bp.route('/proposal-sets/<set_id>', methods=['GET'])
+def get_proposal_set(set_id):
+    """
+    Endpoint para obter um conjunto de propostas guardado no servidor.
+    """
+    proposal_set = proposal_store.get(set_id)
+    if proposal_set is None:
+        return jsonify({'error': 'Conjunto de propostas não encontrado ou expirado'}), 404
+    
+    return jsonify({
+        'success': True,
+        'proposal_set_id': proposal_set.set_id,
+        'revision': proposal_set.revision,
+        'expires_at': datetime.fromtimestamp(proposal_set.expires_at).isoformat(),
+        'client_data': proposal_set.client_data,
+        'proposals': proposal_set.proposals,
+        'parameters_used': proposal_set.parameters
+    })
+
+@api_bp.route('/proposal-sets/<set_id>', methods=['PATCH'])
+@concurrency_limiter.limit('calc')
+def patch_proposal_set(set_id):
+    """
+    Endpoint para alterar parâmetros de um conjunto guardado.
+    
+    Recebe só os parâmetros alterados ({"parameters": {"discount_cash": 12}}) e
+    recalcula apenas os campos que dependem deles; o ranking só é refeito se
+    a ordem por payback mudou.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('parameters'), dict) or not data['parameters']:
+            return jsonify({'error': 'Nenhum parâmetro alterado fornecido'}), 400
+        
+        proposal_set = proposal_store.get(set_id)
+        if proposal_set is None:
+            return jsonify({'error': 'Conjunto de propostas não encontrado ou expirado'}), 404
+        
+        calculator = SolarCalculator()
+        changes = data['parameters']
+        unknown = sorted(set(changes) - set(calculator.default_params))
+        if unknown:
+            return jsonify({'error': f'Parâmetros desconhecidos: {", ".join(unknown)}'}), 400
+        invalid = sorted(k for k, v in changes.items() if isinstance(v, bool) or not isinstance(v, (int, float)))
+        if invalid:
+            return jsonify({'error': f'Parâmetros devem ser numéricos: {", ".join(invalid)}'}), 400
+        
+        previous_params = {**calculator.default_params, **(proposal_set.parameters or {})}
+        parameters = {**previous_params, **changes}
+        
+        started = time.perf_counter()
+        proposals, summary = calculator.recalculate_proposals(
+            proposal_set.proposals, parameters, previous_params, proposal_set.systems_data
+        )
+        summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        
+        updated = ProposalSet(set_id, proposal_set.client_data, proposal_set.systems_data, parameters,
+                              proposals, proposal_set.created_at, proposal_set.expires_at)
+        try:
+            proposal_store.update(updated, expected_revision=proposal_set.revision)
+        except ProposalSetConflict:
+            return jsonify({'error': 'Conjunto alterado por outra requisição; tente novamente'}), 409
+        
+        return proposals_response(updated, data, recalculation=summary)
+    
+    except Exception as e:
+        return jsonify({'error': f'Erro no recálculo: {str(e)}'}), 500
+
 @api_bp.route('/download/<filename>', methods=['GET'])
 def download_file(filename):
     """
@@ -205,7 +455,8 @@ def download_file(filename):
         if not os.path.exists(file_path):
             return jsonify({'error': 'Arquivo não encontrado'}), 404
         
-        return send_file(
+        # Serve a versão .br/.gz gerada na renderização, conforme Accept-Encoding
+        return send_precompressed(
             file_path,
             as_attachment=True,
             download_name=filename,
@@ -215,22 +466,21 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': f'Erro no download: {str(e)}'}), 500
 
-@api_bp.route('/components', methods=['GET'])
-def get_components():
-    """
-    Endpoint para obter lista de componentes disponíveis.
-    """
-    try:
-        with open('data/components_db.json', 'r', encoding='utf-8') as f:
-            components = json.load(f)
-        
-        return jsonify({
-            'success': True,
-            'components': components
-        })
+def _build_config_payload(snapshot) -> dict:
+    """Resposta de /api/config: config.json + branding.json (serializada uma vez por versão)."""
+    config = {}
     
-    except Exception as e:
-        return jsonify({'error': f'Erro ao carregar componentes: {str(e)}'}), 500
+    # Configurações principais
+    config.update(snapshot.get('config', {}))
+    
+    # Branding
+    if snapshot.get('branding') is not None:
+        config['branding'] = snapshot.get('branding')
+    
+    return {
+        'success': True,
+        'config': config
+    }
 
 @api_bp.route('/config', methods=['GET'])
 def get_config():
@@ -238,22 +488,7 @@ def get_config():
     Endpoint para obter configurações da aplicação.
     """
     try:
-        config = {}
-        
-        # Carregar configurações principais
-        if os.path.exists('data/config.json'):
-            with open('data/config.json', 'r', encoding='utf-8') as f:
-                config.update(json.load(f))
-        
-        # Carregar branding
-        if os.path.exists('data/branding.json'):
-            with open('data/branding.json', 'r', encoding='utf-8') as f:
-                config['branding'] = json.load(f)
-        
-        return jsonify({
-            'success': True,
-            'config': config
-        })
+        return config_service.json_response('config', _build_config_payload)
     
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar configurações: {str(e)}'}), 500
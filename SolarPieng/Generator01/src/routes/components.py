@@ -0,0 +1,82 @@
+import hashlib
+
+from flask import Blueprint, Response, jsonify, request
+
+from src.utils.component_catalog import component_catalog
+from src.utils.config_service import config_service
+
+components_bp = Blueprint('components', __name__)
+
+# Seções do components_db.json que não são catálogo (custos usados pelo orçamento rápido)
+COST_SECTIONS = ('cables', 'structure', 'installation', 'additional_costs')
+
+
+def _number_arg(name: str, kind=float):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f'{name} deve ser numérico') from None
+
+
+def _list_etag(version: int) -> str:
+    # Mesma versão do catálogo e mesmos parâmetros: mesma página
+    query = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    return hashlib.sha1(f'{version}?{query}'.encode('utf-8')).hexdigest()
+
+
+@components_bp.route('/components', methods=['GET'])
+def get_components():
+    """
+    Catálogo de componentes, paginado por cursor.
+
+    kind=modules|inverters (padrão: modules). Filtros: brand, type, min_power/max_power
+    (Wp para módulos, kW para inversores), min_price/max_price. Ordenação:
+    sort=power|price|brand, order=asc|desc. Paginação: limit (até 200) e cursor.
+    ETag pela versão do catálogo: If-None-Match devolve 304 só com a leitura da versão
+    (uma consulta curta), sem montar a listagem.
+    """
+    try:
+        version = component_catalog.version()
+        etag = _list_etag(version)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            kind = request.args.get('kind', 'modules')
+            components, next_cursor = component_catalog.list_components(
+                kind,
+                brand=request.args.get('brand'),
+                type=request.args.get('type'),
+                min_power=_number_arg('min_power'),
+                max_power=_number_arg('max_power'),
+                min_price=_number_arg('min_price'),
+                max_price=_number_arg('max_price'),
+                sort=request.args.get('sort', 'power'),
+                order=request.args.get('order', 'asc'),
+                limit=_number_arg('limit', int),
+                cursor=request.args.get('cursor')
+            )
+            response = jsonify({'success': True, 'kind': kind, 'version': version,
+                                'components': components, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao carregar componentes: {str(e)}'}), 500
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@components_bp.route('/components/costs', methods=['GET'])
+def get_component_costs():
+    """Custos de cabos, estrutura, instalação e adicionais (components_db.json), com ETag."""
+    components_db = config_service.get('components_db')
+    if components_db is None:
+        return jsonify({'error': 'Erro ao carregar componentes: catálogo não encontrado'}), 500
+    return config_service.json_response('component_costs', lambda snapshot: {
+        'success': True,
+        'costs': {section: snapshot.get('components_db').get(section) for section in COST_SECTIONS}
+    })
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+
+from src.utils.proposal_history import proposal_history
+
+history_bp = Blueprint('history', __name__)
+
+
+def _date_arg(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} deve ser uma data ISO (ex.: 2026-01-31 ou 2026-01-31T08:00)') from None
+
+
+def _number_arg(name: str, kind=float):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f'{name} deve ser numérico') from None
+
+
+@history_bp.route('/proposals', methods=['GET'])
+def list_proposals():
+    """
+    Histórico de propostas, paginado por cursor.
+
+    Filtros: client_id, min_power/max_power (kWp), min_price/max_price, since/until (data ISO).
+    Ordenação: sort=created_at|power|final_price, order=desc|asc. Paginação: limit (até 200)
+    e cursor=<next_cursor da página anterior>.
+    """
+    try:
+        proposals, next_cursor = proposal_history.list_proposals(
+            client_id=_number_arg('client_id', int),
+            min_power=_number_arg('min_power'),
+            max_power=_number_arg('max_power'),
+            min_price=_number_arg('min_price'),
+            max_price=_number_arg('max_price'),
+            since=_date_arg('since'),
+            until=_date_arg('until'),
+            sort=request.args.get('sort', 'created_at'),
+            order=request.args.get('order', 'desc'),
+            limit=_number_arg('limit', int),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'success': True, 'proposals': proposals, 'next_cursor': next_cursor})
+
+
+@history_bp.route('/proposals/<int:proposal_id>', methods=['GET'])
+def get_proposal(proposal_id):
+    """Proposta completa: cliente, kit e o cálculo (custos, preços, parâmetros)."""
+    proposal = proposal_history.get_proposal(proposal_id)
+    if proposal is None:
+        return jsonify({'error': 'Proposta não encontrada'}), 404
+    return jsonify({'success': True, 'proposal': proposal})
+
+
+@history_bp.route('/clients', methods=['GET'])
+def list_clients():
+    """Clientes em ordem alfabética; q=<prefixo do nome>, limit e cursor como em /proposals."""
+    try:
+        clients, next_cursor = proposal_history.list_clients(
+            name_prefix=request.args.get('q'),
+            limit=_number_arg('limit', int),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'success': True, 'clients': clients, 'next_cursor': next_cursor})
+
+
+@history_bp.route('/clients/<int:client_id>/proposals', methods=['GET'])
+def list_client_proposals(client_id):
+    """Propostas de um cliente (mais recentes primeiro), paginadas por cursor."""
+    try:
+        proposals, next_cursor = proposal_history.list_proposals(
+            client_id=client_id,
+            limit=_number_arg('limit', int),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'success': True, 'proposals': proposals, 'next_cursor': next_cursor})
@@ -1,12 +1,55 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy.exc import IntegrityError
+
 from src.models.user import User, db
+from src.utils import user_directory
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """
+    Usuários paginados por cursor.
+
+    Filtros: username e email (prefixo). Colunas: fields=username,email (o id vem sempre).
+    Ordenação: sort=id|username|email, order=asc|desc. Paginação: limit (50, até 200) e
+    cursor=<next_cursor da página anterior>.
+    """
+    limit = request.args.get('limit')
+    if limit and not limit.isdigit():
+        return jsonify({'error': 'limit deve ser numérico'}), 400
+    try:
+        users, next_cursor = user_directory.list_users(
+            username=request.args.get('username'),
+            email=request.args.get('email'),
+            fields=request.args.get('fields'),
+            sort=request.args.get('sort', 'id'),
+            order=request.args.get('order', 'asc'),
+            limit=int(limit) if limit else None,
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'success': True, 'users': users, 'next_cursor': next_cursor})
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_users():
+    """
+    Cria (ou atualiza) um lote de usuários numa transação: {"users": [{"username", "email"}, ...],
+    "on_conflict": "error" | "update"}. Com "update", quem já existe (mesmo username) recebe o
+    novo e-mail; com "error" (padrão), um duplicado desfaz o lote inteiro (409).
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        rows = user_directory.validate_users(data.get('users'))
+        ids = user_directory.bulk_save(rows, on_conflict=data.get('on_conflict', 'error'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        return jsonify({'error': 'Username ou e-mail já cadastrado; nenhum usuário do lote foi gravado'}), 409
+
+    return jsonify({'success': True, 'count': len(ids), 'ids': ids}), 201
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -19,8 +62,13 @@ def create_user():
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    try:
+        user = user_directory.get_user(user_id, fields=request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if user is None:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    return jsonify(user)
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -0,0 +1,265 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Sequence
+
+import click
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.analytics import MarginBandSummary, PaybackSummary, SellerDailySummary, SupplierPriceSummary
+from src.models.proposal import Kit, Proposal
+from src.models.user import db
+from src.utils.config_service import config_service
+from src.utils.data_extractor import DataExtractor
+from src.utils.storage import sqlite_storage
+
+logger = logging.getLogger(__name__)
+
+# Distribuição de payback em faixas de 2 meses; a última junta tudo acima de 48 meses
+PAYBACK_BUCKET_MONTHS = 2
+PAYBACK_MAX_MONTHS = 48
+
+UNKNOWN_SELLER = 'sem vendedor'
+UNKNOWN_BAND = 'sem faixa'
+
+SUMMARY_MODELS = (MarginBandSummary, PaybackSummary, SellerDailySummary, SupplierPriceSummary)
+
+# Colunas do histórico que alimentam os resumos (as mesmas no incremental e no rebuild)
+SOURCE_COLUMNS = (Proposal.created_at, Proposal.proposal_set_id, Proposal.seller, Proposal.power_kwp,
+                  Proposal.final_price, Proposal.margin_percent, Proposal.payback_months, Kit.supplier,
+                  Kit.name.label('kit_name'))
+
+REBUILD_CHUNK = 10000
+
+
+def power_bands() -> Sequence[Dict]:
+    """Faixas de potência de data/config_escalonamento.json, na ordem do arquivo."""
+    config = config_service.get('config_escalonamento') or {}
+    return (config.get('configuracao_comercial', {})
+            .get('escalonamento_por_potencia', {})
+            .get('faixas', ()))
+
+
+def band_for(power: float, bands: Sequence[Dict]) -> str:
+    # Só o limite superior: potências entre faixas (ex.: 10,005 kWp) caem na seguinte
+    for band in bands:
+        if power <= band['potencia_max_kwp']:
+            return band['nome']
+    return bands[-1]['nome'] if bands else UNKNOWN_BAND
+
+
+def payback_bucket(months: float) -> int:
+    return min(int(months // PAYBACK_BUCKET_MONTHS) * PAYBACK_BUCKET_MONTHS, PAYBACK_MAX_MONTHS)
+
+
+class SummaryDeltas:
+    """Incrementos das tabelas de resumo para um conjunto de propostas."""
+
+    def __init__(self, bands: Sequence[Dict]):
+        self.bands = bands
+        self.count = 0
+        self.margin = defaultdict(lambda: [0, 0.0])
+        self.payback = defaultdict(int)
+        self.sellers = defaultdict(lambda: [set(), 0, 0.0])
+        self.suppliers = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def add(self, row):
+        """Soma uma proposta (mapeamento com as chaves de SOURCE_COLUMNS)."""
+        day = row['created_at'].date()
+        power = row['power_kwp'] or 0
+        price = row['final_price'] or 0
+        self.count += 1
+
+        if row['margin_percent'] is not None:
+            margin = self.margin[(day, band_for(power, self.bands))]
+            margin[0] += 1
+            margin[1] += row['margin_percent']
+        if row['payback_months'] is not None:
+            self.payback[(day, payback_bucket(row['payback_months']))] += 1
+
+        seller = self.sellers[(day, row['seller'] or UNKNOWN_SELLER)]
+        seller[0].add(row['proposal_set_id'])
+        seller[1] += 1
+        seller[2] += price
+
+        # Kits gravados antes da coluna supplier: fornecedor pelo nome, como na gravação
+        supplier = self.suppliers[(day, row['supplier'] or DataExtractor.detect_supplier_from_text(row['kit_name']))]
+        supplier[0] += 1
+        supplier[1] += price
+        supplier[2] += power
+
+    def rows(self) -> Dict[type, List[Dict]]:
+        return {
+            MarginBandSummary: [{'day': day, 'band': band, 'proposals': n, 'margin_sum': total}
+                                for (day, band), (n, total) in self.margin.items()],
+            PaybackSummary: [{'day': day, 'bucket_months': bucket, 'proposals': n}
+                             for (day, bucket), n in self.payback.items()],
+            SellerDailySummary: [{'day': day, 'seller': seller, 'quotes': len(quotes), 'proposals': n,
+                                  'value_sum': total}
+                                 for (day, seller), (quotes, n, total) in self.sellers.items()],
+            SupplierPriceSummary: [{'day': day, 'supplier': supplier, 'proposals': n, 'price_sum': price,
+                                    'power_sum': power}
+                                   for (day, supplier), (n, price, power) in self.suppliers.items()]
+        }
+
+
+def _upsert(model, rows: List[Dict]):
+    """Soma os contadores às linhas existentes (INSERT ... ON CONFLICT DO UPDATE em lote)."""
+    if not rows:
+        return
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + stmt.excluded[name] for name in rows[0] if name not in keys}
+    )
+    db.session.execute(stmt, rows)
+
+
+class SalesAnalytics:
+    """
+    Indicadores comerciais mantidos em tabelas de resumo por dia.
+
+    Cada gravação do histórico (ProposalHistory.record) agenda na fila de write-behind
+    os incrementos da margem por faixa de potência, da distribuição de payback, dos
+    orçamentos e valor por vendedor e do preço por kWp de cada fornecedor.
+    /api/analytics lê só os resumos (dias × chaves), nunca a tabela de propostas.
+    Os resumos podem ficar um pouco atrás do histórico e, com a fila cheia ou um worker
+    morto, perder incrementos: rebuild-analytics os refaz a partir do histórico.
+
+    A faixa é a de config_escalonamento.json no momento da gravação; depois de mudar
+    as faixas (ou para backfill), `flask --app src.main:create_app rebuild-analytics`
+    recalcula tudo a partir do histórico.
+    """
+
+    def __init__(self):
+        self.enabled = True
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ANALYTICS_ENABLED', True)
+        app.extensions['sales_analytics'] = self
+
+        @app.cli.command('rebuild-analytics')
+        def rebuild_analytics_command():
+            """Recalcula as tabelas de resumo de /api/analytics a partir do histórico."""
+            click.echo(json.dumps(self.rebuild()))
+
+    def summarize(self, rows: List[Dict]) -> Dict[type, List[Dict]]:
+        """Incrementos dos resumos para propostas a gravar (mapeamentos com as chaves de SOURCE_COLUMNS)."""
+        if not self.enabled or not rows:
+            return {}
+        deltas = SummaryDeltas(power_bands())
+        for row in rows:
+            deltas.add(row)
+        return deltas.rows()
+
+    def write(self, summaries: Dict[type, List[Dict]]):
+        """Soma os incrementos de summarize (sem commit)."""
+        for model, summary_rows in summaries.items():
+            _upsert(model, summary_rows)
+
+    def apply(self, summaries: Dict[type, List[Dict]]):
+        """Soma os incrementos numa transação própria (tarefa da fila de write-behind)."""
+        try:
+            with sqlite_storage.write_lock():
+                self.write(summaries)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def rebuild(self) -> Dict:
+        """Apaga e recalcula todos os resumos numa transação."""
+        started = datetime.now()
+        try:
+            # Apagar primeiro: a transação já fica com a escrita e nenhum worker grava no meio
+            for model in SUMMARY_MODELS:
+                db.session.execute(delete(model))
+            deltas = SummaryDeltas(power_bands())
+            query = (select(*SOURCE_COLUMNS)
+                     .join(Kit, Kit.id == Proposal.kit_id)
+                     .execution_options(yield_per=REBUILD_CHUNK))
+            for row in db.session.execute(query).mappings():
+                deltas.add(row)
+            rows = deltas.rows()
+            for model, summary_rows in rows.items():
+                _upsert(model, summary_rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        result = {
+            'proposals': deltas.count,
+            'rows': {model.__tablename__: len(summary_rows) for model, summary_rows in rows.items()},
+            'seconds': round((datetime.now() - started).total_seconds(), 3)
+        }
+        logger.info('Resumos de analytics recalculados', extra=result)
+        return result
+
+    def summary(self, since: date, until: date) -> Dict:
+        """Indicadores do período [since, until] (datas inclusivas)."""
+        def between(model):
+            return model.day.between(since, until)
+
+        bands = power_bands()
+        margins = {band: (n, total) for band, n, total in db.session.execute(
+            select(MarginBandSummary.band, func.sum(MarginBandSummary.proposals),
+                   func.sum(MarginBandSummary.margin_sum))
+            .where(between(MarginBandSummary)).group_by(MarginBandSummary.band))}
+        margin_by_band = []
+        for band in bands:
+            n, total = margins.pop(band['nome'], (0, 0))
+            margin_by_band.append({'band': band['nome'], 'min_kwp': band['potencia_min_kwp'],
+                                   'max_kwp': band['potencia_max_kwp'], 'proposals': n,
+                                   'avg_margin_percent': total / n if n else None})
+        # Faixas que não existem mais na configuração (até um rebuild)
+        for band, (n, total) in sorted(margins.items()):
+            margin_by_band.append({'band': band, 'min_kwp': None, 'max_kwp': None, 'proposals': n,
+                                   'avg_margin_percent': total / n if n else None})
+
+        payback = db.session.execute(
+            select(PaybackSummary.bucket_months, func.sum(PaybackSummary.proposals))
+            .where(between(PaybackSummary)).group_by(PaybackSummary.bucket_months)
+            .order_by(PaybackSummary.bucket_months)).all()
+        payback_total = sum(n for _, n in payback)
+        payback_distribution = [{
+            'min_months': bucket,
+            'max_months': bucket + PAYBACK_BUCKET_MONTHS if bucket < PAYBACK_MAX_MONTHS else None,
+            'proposals': n,
+            'share': n / payback_total
+        } for bucket, n in payback]
+
+        sellers = db.session.execute(
+            select(SellerDailySummary.day, SellerDailySummary.seller, SellerDailySummary.quotes,
+                   SellerDailySummary.proposals, SellerDailySummary.value_sum)
+            .where(between(SellerDailySummary))
+            .order_by(SellerDailySummary.day.desc(), SellerDailySummary.seller))
+        proposals_per_seller = [{'day': day.isoformat(), 'seller': seller, 'quotes': quotes,
+                                 'proposals': n, 'total_value': total}
+                                for day, seller, quotes, n, total in sellers]
+
+        suppliers = db.session.execute(
+            select(SupplierPriceSummary.supplier, func.sum(SupplierPriceSummary.proposals),
+                   func.sum(SupplierPriceSummary.price_sum), func.sum(SupplierPriceSummary.power_sum))
+            .where(between(SupplierPriceSummary)).group_by(SupplierPriceSummary.supplier)
+            .order_by(SupplierPriceSummary.supplier)).all()
+        price_per_kwp = [{'supplier': supplier, 'proposals': n,
+                          'avg_price_per_kwp': price / power if power else None}
+                         for supplier, n, price, power in suppliers]
+
+        return {
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'margin_by_band': margin_by_band,
+            'payback_distribution': payback_distribution,
+            'proposals_per_seller': proposals_per_seller,
+            'price_per_kwp_by_supplier': price_per_kwp
+        }
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+sales_analytics = SalesAnalytics()
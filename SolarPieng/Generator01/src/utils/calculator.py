@@ -1,6 +1,88 @@
 import json
+import logging
 import math
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.utils.component_catalog import component_catalog
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de kits por chamada de compare_systems (exposto em /metrics)
+BATCH_SIZE = metrics.histogram('calculator_batch_size', 'Kits por cálculo comparativo', (),
+                               buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000))
+
+
+# Campos de calculate_pricing_structure: campo -> (entradas, fórmula(preços, params)).
+# Entradas são campos de preço já calculados ou parâmetros; a ordem respeita as dependências.
+PRICING_FORMULAS = {
+    # Preço à vista (com desconto)
+    'cash_price': (('final_price', 'discount_cash'),
+                   lambda f, p: f['final_price'] * (1 - p['discount_cash'] / 100)),
+    # Preço sem desconto (para 12x)
+    'price_no_discount': (('final_price', 'markup_no_discount'),
+                          lambda f, p: f['final_price'] * (1 + p['markup_no_discount'] / 100)),
+    # Preço "riscado" (INVESTIMENTO)
+    'crossed_price': (('price_no_discount', 'markup_crossed_price'),
+                      lambda f, p: f['price_no_discount'] * (1 + p['markup_crossed_price'] / 100)),
+    # Financiamento 18x
+    'financing_total': (('final_price', 'financing_rate'),
+                        lambda f, p: f['final_price'] * (1 + p['financing_rate'] / 100)),
+    'financing_installment': (('financing_total',),
+                              lambda f, p: f['financing_total'] / 18),
+    # Parcelamento 12x sem juros
+    'installment_12x': (('price_no_discount',),
+                        lambda f, p: f['price_no_discount'] / 12),
+    'discount_cash_percent': (('discount_cash',), lambda f, p: p['discount_cash']),
+    'financing_rate_percent': (('financing_rate',), lambda f, p: p['financing_rate'])
+}
+
+
+def _build_dependency_graph() -> Tuple:
+    """
+    Grafo de dependências dos campos derivados de uma proposta, em ordem topológica.
+
+    Cada nó é (seção, campo, entradas, fórmula(calculadora, proposta, params)), onde
+    as entradas são campos 'seção.campo' da própria proposta ou nomes de
+    parâmetros de cálculo.
+    """
+    payback_inputs = frozenset({'calculations.initial_price', 'calculations.monthly_savings',
+                                'payback_min', 'payback_max'})
+    graph = [
+        ('calculations', 'initial_price',
+         frozenset({'costs.total_cost', 'margin_target'}),
+         lambda c, prop, p: c.calculate_initial_price(prop['costs']['total_cost'], p)),
+        ('calculations', 'monthly_savings',
+         frozenset({'kit_info.power', 'hsp', 'days_per_month', 'system_efficiency',
+                    'consumption_factor', 'tariff'}),
+         lambda c, prop, p: c.calculate_monthly_savings(prop['kit_info']['power'], p)),
+        ('calculations', 'monthly_generation',
+         frozenset({'kit_info.power', 'hsp', 'days_per_month', 'system_efficiency'}),
+         lambda c, prop, p: c.calculate_monthly_generation(prop['kit_info']['power'], p)),
+        # adjust_price_for_payback devolve (preço, payback): um nó para cada
+        ('pricing', 'final_price', payback_inputs,
+         lambda c, prop, p: c.adjust_price_for_payback(prop['calculations']['initial_price'],
+                                                       prop['calculations']['monthly_savings'], p)[0]),
+        ('calculations', 'final_payback_months', payback_inputs,
+         lambda c, prop, p: c.adjust_price_for_payback(prop['calculations']['initial_price'],
+                                                       prop['calculations']['monthly_savings'], p)[1]),
+        ('calculations', 'final_margin_percent',
+         frozenset({'pricing.final_price', 'costs.total_cost'}),
+         lambda c, prop, p: c.calculate_margin(prop['pricing']['final_price'], prop['costs']['total_cost']))
+    ]
+
+    for field, (inputs, formula) in PRICING_FORMULAS.items():
+        graph.append((
+            'pricing', field,
+            frozenset(f'pricing.{name}' if name == 'final_price' or name in PRICING_FORMULAS else name
+                      for name in inputs),
+            lambda c, prop, p, formula=formula: formula(prop['pricing'], p)
+        ))
+    return tuple(graph)
+
+
+PROPOSAL_DEPENDENCIES = _build_dependency_graph()
 
 
 class SolarCalculator:
@@ -35,7 +117,7 @@ class SolarCalculator:
                     config = json.load(f)
                     self.default_params.update(config.get('calculation_params', {}))
             except Exception as e:
-                print(f"Erro ao carregar configuração: {e}")
+                logger.warning("Erro ao carregar configuração", extra={'path': config_path, 'error': str(e)})
     
     def calculate_monthly_savings(self, power_kwp: float, params: Dict = None) -> float:
         """
@@ -57,6 +139,28 @@ class SolarCalculator:
         monthly_savings = monthly_generation * params['tariff']
         return monthly_savings
     
+    def calculate_monthly_generation(self, power_kwp: float, params: Dict = None) -> float:
+        """Geração mensal estimada (kWh), sem o fator de consumo."""
+        if params is None:
+            params = self.default_params
+        
+        return (
+            power_kwp * 
+            params['hsp'] * 
+            params['days_per_month'] * 
+            (params['system_efficiency'] / 100)
+        )
+    
+    def calculate_initial_price(self, total_cost: float, params: Dict = None) -> float:
+        """Preço alvo inicial: custo total acrescido da margem alvo."""
+        if params is None:
+            params = self.default_params
+        return total_cost * (1 + params['margin_target'] / 100)
+    
+    def calculate_margin(self, final_price: float, total_cost: float) -> float:
+        """Margem final resultante (%) sobre o custo total."""
+        return ((final_price / total_cost) - 1) * 100
+    
     def calculate_payback(self, investment: float, monthly_savings: float) -> float:
         """Calcula o payback em meses."""
         if monthly_savings <= 0:
@@ -95,33 +199,10 @@ class SolarCalculator:
         if params is None:
             params = self.default_params
         
-        # Preço sem desconto (para 12x)
-        price_no_discount = final_price * (1 + params['markup_no_discount'] / 100)
-        
-        # Preço "riscado" (INVESTIMENTO)
-        crossed_price = price_no_discount * (1 + params['markup_crossed_price'] / 100)
-        
-        # Preço à vista (com desconto)
-        cash_price = final_price * (1 - params['discount_cash'] / 100)
-        
-        # Financiamento 18x
-        financing_total = final_price * (1 + params['financing_rate'] / 100)
-        financing_installment = financing_total / 18
-        
-        # Parcelamento 12x sem juros
-        installment_12x = price_no_discount / 12
-        
-        return {
-            'final_price': final_price,
-            'cash_price': cash_price,
-            'price_no_discount': price_no_discount,
-            'crossed_price': crossed_price,
-            'financing_total': financing_total,
-            'financing_installment': financing_installment,
-            'installment_12x': installment_12x,
-            'discount_cash_percent': params['discount_cash'],
-            'financing_rate_percent': params['financing_rate']
-        }
+        pricing = {'final_price': final_price}
+        for field, (_, formula) in PRICING_FORMULAS.items():
+            pricing[field] = formula(pricing, params)
+        return pricing
     
     def calculate_system_proposal(self, kit_data: Dict, params: Dict = None) -> Dict:
         """
@@ -147,7 +228,7 @@ class SolarCalculator:
             total_cost += kit_data.get('freight_value', 0)
         
         # Preço alvo inicial (margem de 40%)
-        initial_price = total_cost * (1 + params['margin_target'] / 100)
+        initial_price = self.calculate_initial_price(total_cost, params)
         
         # Economia mensal
         monthly_savings = self.calculate_monthly_savings(kit_data['power'], params)
@@ -159,15 +240,10 @@ class SolarCalculator:
         pricing = self.calculate_pricing_structure(final_price, params)
         
         # Margem final resultante
-        final_margin = ((final_price / total_cost) - 1) * 100
+        final_margin = self.calculate_margin(final_price, total_cost)
         
         # Geração mensal estimada
-        monthly_generation = (
-            kit_data['power'] * 
-            params['hsp'] * 
-            params['days_per_month'] * 
-            (params['system_efficiency'] / 100)
-        )
+        monthly_generation = self.calculate_monthly_generation(kit_data['power'], params)
         
         return {
             'kit_info': kit_data,
@@ -191,6 +267,7 @@ class SolarCalculator:
         """
         Compara múltiplos sistemas e retorna as propostas ordenadas por melhor custo-benefício.
         """
+        BATCH_SIZE.observe(len(systems_data))
         proposals = []
         
         for system in systems_data:
@@ -206,17 +283,145 @@ class SolarCalculator:
             proposal['is_recommended'] = (i == 0)  # O primeiro é o recomendado
         
         return proposals
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def dependency_plan(changed: FrozenSet[str]) -> Tuple:
+        """
+        Nós de PROPOSAL_DEPENDENCIES afetados, direta ou transitivamente, pelos
+        parâmetros em `changed`, na ordem em que devem ser recalculados.
+        """
+        dirty = set(changed)
+        plan = []
+        for node in PROPOSAL_DEPENDENCIES:
+            section, key, inputs, _ = node
+            if not dirty.isdisjoint(inputs):
+                plan.append(node)
+                dirty.add(f'{section}.{key}')
+        return tuple(plan)
+    
+    def recalculate_proposal(self, proposal: Dict, params: Dict, changed: Iterable[str]) -> List[str]:
+        """
+        Recalcula, no próprio dict, só os campos derivados que dependem dos
+        parâmetros em `changed`. Retorna os campos recalculados ('seção.campo').
+        """
+        plan = self.dependency_plan(frozenset(changed))
+        for section, key, _, formula in plan:
+            proposal[section][key] = formula(self, proposal, params)
+        proposal['parameters_used'] = params
+        return [f'{section}.{key}' for section, key, _, _ in plan]
+    
+    def recalculate_proposals(self, proposals: List[Dict], params: Dict, previous_params: Dict,
+                              systems_data: List[Dict] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Recálculo incremental de propostas já calculadas com `previous_params`.
+        
+        Alterações que só afetam campos de preço (desconto, juros, markups) são
+        aplicadas campo a campo, sem reordenar. Alterações que chegam ao payback
+        (tarifa, margem, faixa de payback) recalculam economia/preço inicial e o
+        payback; a estrutura de preços e a margem só onde o preço final mudou, e o
+        ranking só se a ordem por payback mudou. Só alterações da geração (HSP,
+        eficiência, dias) recalculam as propostas inteiras (compare_systems).
+        
+        As propostas originais não são alteradas (podem estar em uso por outra
+        requisição): retorna novas propostas e um resumo do que mudou.
+        """
+        changed = frozenset(k for k in params.keys() | previous_params.keys()
+                            if params.get(k) != previous_params.get(k))
+        plan = self.dependency_plan(changed)
+        summary = {
+            'changed_params': sorted(changed),
+            'recalculated_fields': [f'{section}.{key}' for section, key, _, _ in plan]
+        }
+        # Ordem dos kits da entrada: empates de payback ficam como em compare_systems
+        kits = systems_data if systems_data is not None else [p['kit_info'] for p in proposals]
+        
+        if any(key == 'monthly_generation' for _, key, _, _ in plan):
+            summary.update(mode='full', reranked=True)
+            return self.compare_systems(kits, params), summary
+        
+        if any(key == 'final_payback_months' for _, key, _, _ in plan):
+            result = self._recalculate_payback(proposals, params, changed, plan)
+            reranked = self._rerank(result, kits)
+            summary.update(mode='incremental', reranked=reranked)
+            return result, summary
+        
+        # Só as seções recalculadas são copiadas; kit_info e costs são compartilhados
+        sections = {section for section, _, _, _ in plan}
+        result = []
+        for original in proposals:
+            proposal = dict(original)
+            proposal['parameters_used'] = params
+            for section in sections:
+                proposal[section] = dict(original[section])
+            for section, key, _, formula in plan:
+                proposal[section][key] = formula(self, proposal, params)
+            result.append(proposal)
+        
+        summary.update(mode='incremental', reranked=False)
+        return result, summary
+    
+    def _recalculate_payback(self, proposals: List[Dict], params: Dict, changed: FrozenSet[str],
+                             plan: Tuple) -> List[Dict]:
+        # Preço inicial e economia, conforme o plano; depois payback e preço final de uma vez
+        upstream = [node for node in plan if node[1] in ('initial_price', 'monthly_savings')]
+        # Parâmetros de preço alterados junto (ex.: tarifa e desconto): reprecifica todas
+        reprice_all = any(section == 'pricing' and not changed.isdisjoint(inputs)
+                          for section, _, inputs, _ in plan)
+        result = []
+        for original in proposals:
+            proposal = dict(original)
+            proposal['parameters_used'] = params
+            calculations = proposal['calculations'] = dict(original['calculations'])
+            for _, key, _, formula in upstream:
+                calculations[key] = formula(self, proposal, params)
+            final_price, calculations['final_payback_months'] = self.adjust_price_for_payback(
+                calculations['initial_price'], calculations['monthly_savings'], params
+            )
+            # Payback dentro da faixa nos dois casos: preço, preços derivados e margem iguais
+            if reprice_all or final_price != original['pricing']['final_price']:
+                proposal['pricing'] = self.calculate_pricing_structure(final_price, params)
+                calculations['final_margin_percent'] = self.calculate_margin(
+                    final_price, proposal['costs']['total_cost']
+                )
+            result.append(proposal)
+        return result
+    
+    @staticmethod
+    def _rerank(proposals: List[Dict], kits: List[Dict]) -> bool:
+        """
+        Reordena `proposals` (no lugar) pelo novo payback, como compare_systems, e
+        refaz o ranking só se a ordem mudou. Retorna se houve reordenação.
+        """
+        position = {id(kit): i for i, kit in enumerate(kits)}
+        ranked = sorted(proposals, key=lambda p: (p['calculations']['final_payback_months'],
+                                                  position.get(id(p['kit_info']), len(kits))))
+        if all(a is b for a, b in zip(ranked, proposals)):
+            return False
+        proposals[:] = ranked
+        for i, proposal in enumerate(proposals):
+            proposal['ranking'] = i + 1
+            proposal['is_recommended'] = (i == 0)
+        return True
 
 
 class QuickQuoteGenerator:
     """
     Gerador de orçamentos rápidos baseado no consumo residencial.
+    
+    Módulos e inversores vêm do catálogo indexado (ComponentCatalog, exige app context);
+    components_db fornece só as seções de custos (estrutura, instalação, adicionais).
     """
     
-    def __init__(self, components_db_path: str):
-        with open(components_db_path, 'r', encoding='utf-8') as f:
-            self.components_db = json.load(f)
+    def __init__(self, components_db_path: str = None, components_db: Dict = None, catalog=None):
+        # Custos já carregados (ex.: config_service) ou lidos do arquivo
+        if components_db is not None:
+            self.components_db = components_db
+        else:
+            with open(components_db_path, 'r', encoding='utf-8') as f:
+                self.components_db = json.load(f)
         
+        self.catalog = catalog if catalog is not None else component_catalog
         self.calculator = SolarCalculator()
     
     def calculate_required_power(self, monthly_consumption_kwh: float, hsp: float = 5.25, 
@@ -240,35 +445,29 @@ class QuickQuoteGenerator:
         Seleciona os componentes otimizados para a potência necessária.
         CORRIGIDO: Agora seleciona realmente o melhor custo-benefício
         """
-        # CORREÇÃO CRÍTICA: Ordenar por melhor Wp por R$ (não R$ por Wp)
-        modules = sorted(self.components_db['modules'], 
-                        key=lambda x: x['power_wp'] / x['price_per_unit'], 
-                        reverse=True)  # Do maior para o menor (melhor custo-benefício)
+        # Melhor Wp por R$ (maior custo-benefício) e inversores por potência, por versão do catálogo
+        tables = self.catalog.quick_quote_tables()
         
-        if not modules:
+        if tables.best_module is None:
             raise ValueError("❌ Nenhum módulo disponível no banco de dados")
         
-        best_module = modules[0]
-        print(f"✅ Módulo selecionado: {best_module['name']} - {best_module['power_wp']}Wp por R${best_module['price_per_unit']}")
+        best_module = dict(tables.best_module)
+        logger.debug("Módulo selecionado", extra={'module_name': best_module['name'], 'power_wp': best_module['power_wp'],
+                                                  'price_per_unit': best_module['price_per_unit']})
         
         # Calcular quantidade de módulos necessária
         modules_needed = math.ceil((required_power_kwp * 1000) / best_module['power_wp'])
         actual_power = (modules_needed * best_module['power_wp']) / 1000
         
-        # Selecionar inversor adequado
-        inverters = [inv for inv in self.components_db['inverters'] 
-                    if inv['power_kw'] >= actual_power * 0.8 and inv['power_kw'] <= actual_power * 1.2]
+        # Inversor mais barato entre 80% e 120% da potência (ou o mais barato do catálogo)
+        best_inverter = tables.inverter_for(actual_power)
         
-        if not inverters:
-            # Se não encontrar inversor na faixa, pegar o mais próximo
-            inverters = sorted(self.components_db['inverters'], 
-                             key=lambda x: abs(x['power_kw'] - actual_power))
-        
-        if not inverters:
+        if best_inverter is None:
             raise ValueError("❌ Nenhum inversor disponível no banco de dados")
+        best_inverter = dict(best_inverter)
         
-        best_inverter = min(inverters, key=lambda x: x['price'])
-        print(f"✅ Inversor selecionado: {best_inverter['name']} - {best_inverter['power_kw']}kW por R${best_inverter['price']}")
+        logger.debug("Inversor selecionado", extra={'inverter': best_inverter['name'], 'power_kw': best_inverter['power_kw'],
+                                                    'price': best_inverter['price']})
         
         # Calcular custos
         module_cost = modules_needed * best_module['price_per_unit']
@@ -327,11 +526,8 @@ class QuickQuoteGenerator:
             # Calcular consumo baseado no valor da conta
             monthly_consumption_kwh = bill_value / tariff
         
-        print(f"📊 Calculando para consumo de {monthly_consumption_kwh:.0f} kWh/mês")
-        
         # Calcular potência necessária
         required_power = self.calculate_required_power(monthly_consumption_kwh, hsp, simultaneity_factor)
-        print(f"⚡ Potência necessária: {required_power:.2f} kWp")
         
         # Selecionar componentes
         system_data = self.select_optimal_components(required_power)
@@ -355,6 +551,10 @@ class QuickQuoteGenerator:
             'oversizing_percent': ((system_data['power'] / required_power) - 1) * 100
         }
         
-        print(f"✅ Proposta gerada com sucesso! Preço final: R${proposal['pricing']['final_price']:.2f}")
+        logger.info("Orçamento rápido gerado", extra={
+            'consumption_kwh': round(monthly_consumption_kwh, 1),
+            'required_kwp': round(required_power, 2),
+            'final_price': round(proposal['pricing']['final_price'], 2)
+        })
         
         return proposal
\ No newline at end of file
@@ -0,0 +1,429 @@
+import csv
+import functools
+import io
+import itertools
+import json
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import click
+from flask import current_app, jsonify, request
+from sqlalchemy import Column, MetaData, String, Table, bindparam, func, insert, select, update
+
+from src.models.component import CatalogState
+from src.models.user import db
+from src.utils.component_catalog import KINDS, component_catalog
+from src.utils.profiling import ADMIN_PREFIX, require_admin_token
+from src.utils.storage import sqlite_storage
+
+logger = logging.getLogger(__name__)
+
+IMPORT_PATH = ADMIN_PREFIX + 'components/import'
+MAX_ERRORS = 50
+
+# Cabeçalhos aceitos (sem acento, minúsculos, espaços como _) para cada campo
+FIELD_ALIASES = {
+    'kind': ('kind', 'categoria', 'category'),
+    'sku': ('sku', 'codigo', 'cod', 'code', 'id'),
+    'name': ('name', 'nome', 'descricao', 'description', 'produto'),
+    'brand': ('brand', 'marca', 'fabricante'),
+    'type': ('type', 'tipo'),
+    'power': ('power', 'potencia', 'power_wp', 'power_kw', 'potencia_wp', 'potencia_kw'),
+    'price': ('price', 'preco', 'price_per_unit', 'preco_unitario', 'valor'),
+    'efficiency': ('efficiency', 'eficiencia'),
+    'warranty_years': ('warranty_years', 'garantia', 'garantia_anos')
+}
+KIND_ALIASES = {
+    'modules': ('modules', 'module', 'modulo', 'modulos', 'painel', 'paineis'),
+    'inverters': ('inverters', 'inverter', 'inversor', 'inversores', 'microinversor')
+}
+# Coluna de potência de cada tipo e a unidade em que é guardada
+POWER_COLUMNS = {'modules': ('power_wp', 'w'), 'inverters': ('power_kw', 'kw')}
+REQUIRED_FOR_INSERT = ('name', 'power', 'price')
+# Remoção dos itens ausentes do arquivo: só das marcas presentes nele, ou do tipo inteiro
+DELETE_SCOPES = ('brand', 'all')
+LIMITS = {'sku': 64, 'name': 200, 'brand': 80, 'type': 20}
+
+NUMBER_PATTERN = re.compile(r'[-+]?[\d.,]+')
+# Um só ponto seguido de exatamente três dígitos, sem zero à esquerda: milhar ("12.500")
+THOUSANDS_PATTERN = re.compile(r'[-+]?[1-9]\d{0,2}\.\d{3}')
+
+# SKUs presentes no arquivo, por tipo: tabela temporária da conexão da importação
+SEEN = Table('catalog_import_seen', MetaData(),
+             Column('kind', String, primary_key=True), Column('sku', String, primary_key=True),
+             prefixes=['TEMPORARY'])
+
+
+class CatalogImportError(ValueError):
+    """Arquivo que não dá para importar (cabeçalho, codificação); linhas inválidas só entram no relatório."""
+
+
+@functools.lru_cache(maxsize=1024)
+def _slug(value: str) -> str:
+    # Em cache: categorias e tipos se repetem em quase todas as linhas
+    value = unicodedata.normalize('NFKD', value.strip().lower())
+    return re.sub(r'\W+', '_', ''.join(c for c in value if not unicodedata.combining(c))).strip('_')
+
+
+def parse_number(value: str) -> Optional[float]:
+    """
+    Número de planilha: "R$ 1.234,56", "1234.56", "21,5%", "550 Wp". Com ponto e vírgula,
+    o último é o separador decimal; só com vírgula, ela é o decimal. Só com ponto, ele é
+    milhar se houver mais de um ou se vier seguido de exatamente três dígitos ("12.500",
+    "5.000 W"), como nas planilhas brasileiras; "0.550" e "1234.56" seguem decimais.
+    Várias vírgulas também são milhar ("1,234,567"). Grupos de milhar fora do padrão
+    não são número.
+
+    >>> parse_number('R$ 12.500'), parse_number('1.234'), parse_number('1.234.567')
+    (12500.0, 1234.0, 1234567.0)
+    >>> parse_number('R$ 1.234,56'), parse_number('1,234.56'), parse_number('1,234,567')
+    (1234.56, 1234.56, 1234567.0)
+    >>> parse_number('5.000 W'), parse_number('0.550 kWp'), parse_number('1234.56'), parse_number('21,5%')
+    (5000.0, 0.55, 1234.56, 21.5)
+    >>> parse_number('1.23.4'), parse_number('abc')
+    (None, None)
+    """
+    match = NUMBER_PATTERN.search(value.replace(' ', ''))
+    if not match:
+        return None
+    number = match.group()
+    if ',' in number and '.' in number:
+        decimal = ',' if number.rfind(',') > number.rfind('.') else '.'
+        integer, _, fraction = number.rpartition(decimal)
+        number = _strip_thousands(integer, '.' if decimal == ',' else ',')
+        number = None if number is None else f'{number}.{fraction}'
+    elif number.count('.') > 1 or THOUSANDS_PATTERN.fullmatch(number):
+        number = _strip_thousands(number, '.')
+    elif number.count(',') > 1:
+        number = _strip_thousands(number, ',')
+    elif ',' in number:
+        number = number.replace(',', '.')
+    if number is None:
+        return None
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _strip_thousands(number: str, separator: str) -> Optional[str]:
+    # Grupos de milhar válidos: 1 a 3 dígitos e depois grupos de exatamente 3
+    groups = number.lstrip('+-').split(separator)
+    if not (1 <= len(groups[0]) <= 3 and groups[0].isdigit()
+            and all(len(group) == 3 and group.isdigit() for group in groups[1:])):
+        return None
+    return number.replace(separator, '')
+
+
+def _power(value: str, kind: str) -> Optional[float]:
+    number = parse_number(value)
+    if number is None:
+        return None
+    unit = POWER_COLUMNS[kind][1]
+    lowered = value.lower()
+    # Unidade explícita diferente da guardada (ex.: inversor "5000 W", módulo "0,55 kWp")
+    if unit == 'kw' and re.search(r'\d\s*w', lowered) and 'kw' not in lowered:
+        return number / 1000
+    if unit == 'w' and 'kw' in lowered:
+        return number * 1000
+    return number
+
+
+class CatalogImporter:
+    """
+    Importação de listas de preço de fornecedores (CSV) para o catálogo de componentes.
+
+    - Lê o arquivo linha a linha (memória constante): cada lote de `batch_size` linhas
+      é comparado pelo SKU com o catálogo e só as inserções e alterações são gravadas,
+      numa transação por lote (INSERT/UPDATE em lote)
+    - Colunas ausentes no arquivo não são alteradas (uma lista só com sku e preço
+      atualiza preços); SKU novo precisa de nome, potência e preço
+    - Célula vazia: em nome, potência e preço é erro da linha; na marca mantém a atual;
+      em tipo, eficiência e garantia apaga o valor. Linha curta: o que falta é vazio
+    - Itens ausentes do arquivo são mantidos. Com delete_missing (listas completas, com
+      nome, potência e preço), ao final remove os do tipo importado cujo SKU não veio no
+      arquivo: 'brand' só das marcas presentes no arquivo (a lista de um fornecedor não
+      apaga as dos outros), 'all' de todas. Os SKUs vistos ficam numa tabela temporária
+      do SQLite, não em memória
+    - Cada lote com alteração incrementa a versão do catálogo (ETag de /api/components);
+      ao final o snapshot compartilhado do catálogo é recompilado, e os demais workers
+      o remapeiam na próxima requisição
+    - Linhas inválidas não interrompem a importação: entram no relatório (até 50)
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self.token: Optional[str] = None
+
+    def init_app(self, app):
+        self.batch_size = int(app.config.get('CATALOG_IMPORT_BATCH_SIZE', self.batch_size))
+        self.token = app.config.get('PROFILE_ADMIN_TOKEN') or None
+        app.extensions['catalog_importer'] = self
+
+        @app.cli.command('import-components')
+        @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+        @click.option('--kind', type=click.Choice(list(KINDS)), help='tipo das linhas sem coluna kind/categoria')
+        @click.option('--delete-missing', type=click.Choice(DELETE_SCOPES),
+                      help='remove itens ausentes do arquivo: das marcas do arquivo (brand) ou todos (all)')
+        @click.option('--dry-run', is_flag=True, help='só calcula as diferenças')
+        @click.option('--encoding', default='utf-8-sig', show_default=True)
+        def import_components_command(path, kind, delete_missing, dry_run, encoding):
+            """Importa uma lista de preços CSV para o catálogo de módulos e inversores."""
+            with open(path, 'r', encoding=encoding, newline='') as f:
+                report = self.run(f, kind=kind, delete_missing=delete_missing, dry_run=dry_run)
+            click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+
+        if self.token:
+            app.add_url_rule(IMPORT_PATH, 'import_components', self._import_view, methods=['POST'])
+
+    def _import_view(self):
+        """
+        POST com o CSV no corpo (text/csv) ou no campo `file` (multipart). Parâmetros:
+        kind, delete_missing (brand|all; padrão: mantém), dry_run (0), encoding (utf-8-sig).
+        """
+        require_admin_token(self.token)
+        request.max_content_length = current_app.config['CATALOG_IMPORT_MAX_CONTENT_LENGTH']
+        upload = request.files.get('file')
+        raw = upload.stream if upload is not None else io.BufferedReader(request.stream)
+        stream = io.TextIOWrapper(raw, encoding=request.args.get('encoding', 'utf-8-sig'), newline='')
+        try:
+            report = self.run(stream,
+                              kind=request.args.get('kind'),
+                              delete_missing=request.args.get('delete_missing') or None,
+                              dry_run=request.args.get('dry_run', '0') == '1')
+        except (CatalogImportError, UnicodeDecodeError) as e:
+            return jsonify({'error': f'Arquivo inválido: {e}'}), 400
+        return jsonify({'success': True, **report})
+
+    def run(self, stream: TextIO, kind: str = None, delete_missing: Optional[str] = None,
+            dry_run: bool = False) -> Dict:
+        """Importa o CSV de `stream`; retorna as contagens e os primeiros erros."""
+        if kind is not None and kind not in KINDS:
+            raise CatalogImportError(f"kind deve ser um de: {', '.join(KINDS)}")
+        if delete_missing is not None and delete_missing not in DELETE_SCOPES:
+            raise CatalogImportError(f"delete_missing deve ser um de: {', '.join(DELETE_SCOPES)}")
+        header, reader = self._reader(stream)
+        if delete_missing == 'brand' and 'brand' not in header:
+            raise CatalogImportError('delete_missing=brand exige a coluna marca')
+        report = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'invalid': 0,
+                  'errors': [], 'dry_run': dry_run}
+        # Marcas presentes no arquivo, por tipo (minúsculas)
+        seen_brands: Dict[str, set] = {}
+
+        with db.engine.connect() as conn:
+            SEEN.create(conn)
+            conn.commit()
+            try:
+                rows = self._rows(reader, header, kind, report)
+                for batch in iter(lambda: list(itertools.islice(rows, self.batch_size)), []):
+                    for batch_kind, items in _by_kind(batch).items():
+                        seen_brands.setdefault(batch_kind, set()).update(
+                            item['brand'].lower() for item in items if item.get('brand'))
+                        self._apply(conn, batch_kind, items, set(header), report, dry_run)
+                # Só uma lista completa (nome, potência e preço) substitui itens do catálogo
+                if delete_missing and set(REQUIRED_FOR_INSERT) <= set(header):
+                    for seen_kind, brands in sorted(seen_brands.items()):
+                        report['deleted'] += self._delete_missing(
+                            conn, seen_kind, brands if delete_missing == 'brand' else None, dry_run)
+                report['version'] = conn.execute(select(CatalogState.version)).scalar()
+            finally:
+                conn.rollback()
+                SEEN.drop(conn)
+                conn.commit()
+
+        if not dry_run:
+            component_catalog.refresh()
+        logger.info('Lista de preços importada', extra={key: value for key, value in report.items() if key != 'errors'})
+        return report
+
+    @staticmethod
+    def _reader(stream: TextIO) -> Tuple[List[str], Iterator[List[str]]]:
+        first = stream.readline()
+        if not first.strip():
+            raise CatalogImportError('arquivo vazio')
+        # Planilhas brasileiras costumam exportar com ";"
+        delimiter = max((';', ',', '\t'), key=first.count)
+        reader = csv.reader(itertools.chain([first], stream), delimiter=delimiter)
+        columns = [_slug(name) for name in next(reader)]
+        header = []
+        for column in columns:
+            field = next((name for name, aliases in FIELD_ALIASES.items() if column in aliases), None)
+            header.append(field)
+        if 'sku' not in header:
+            raise CatalogImportError('coluna sku (ou código) obrigatória')
+        return header, reader
+
+    @staticmethod
+    def _rows(reader: Iterable[List[str]], header: List[Optional[str]], default_kind: Optional[str],
+              report: Dict) -> Iterator[Dict]:
+        """
+        Linhas normalizadas. As inválidas vão para o relatório e, se têm SKU, seguem só
+        com kind/sku e `invalid` (contam como vistas: delete_missing não as remove).
+        """
+        for line_number, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            report['rows'] += 1
+            # Linha curta: as células que faltam contam como vazias
+            values = values + [''] * (len(header) - len(values))
+            raw = {field: value.strip() for field, value in zip(header, values) if field is not None}
+            try:
+                yield dict(_normalize(raw, default_kind), line=line_number)
+            except ValueError as e:
+                _report_error(report, str(e), sku=raw.get('sku'), line=line_number)
+                kind = _kind(raw.get('kind'), default_kind)
+                if raw.get('sku') and kind is not None:
+                    yield {'kind': kind, 'sku': raw['sku'], 'line': line_number, 'invalid': True}
+
+    def _apply(self, conn, kind: str, items: List[Dict], fields: set, report: Dict, dry_run: bool):
+        model = KINDS[kind][0]
+        table = model.__table__
+        power_column = POWER_COLUMNS[kind][0]
+        # Colunas presentes no arquivo (as demais ficam como estão no catálogo)
+        columns = [power_column if field == 'power' else field
+                   for field in ('name', 'brand', 'type', 'power', 'price', 'efficiency', 'warranty_years')
+                   if field in fields]
+        items = list({item['sku']: item for item in items}.values())
+        now = datetime.now()
+
+        conn.execute(SEEN.insert().prefix_with('OR IGNORE'), [{'kind': kind, 'sku': item['sku']} for item in items])
+        conn.commit()
+        items = [item for item in items if not item.get('invalid')]
+        if not items:
+            return
+
+        with sqlite_storage.write_lock():
+            existing = {row.sku: row for row in conn.execute(
+                select(table.c.sku, *(table.c[column] for column in columns))
+                .where(table.c.sku.in_([item['sku'] for item in items]))
+            )}
+            inserts, updates = [], {}
+            for item in items:
+                values = {(power_column if key == 'power' else key): value
+                          for key, value in item.items() if key not in ('sku', 'kind', 'line')}
+                current = existing.get(item['sku'])
+                if current is None:
+                    missing = [field for field in REQUIRED_FOR_INSERT if item.get(field) is None]
+                    if missing:
+                        _report_error(report, f"SKU novo sem {', '.join(missing)}", sku=item['sku'],
+                                      line=item['line'])
+                        continue
+                    inserts.append(dict(values, sku=item['sku'], brand=values.get('brand') or 'Genérico',
+                                        updated_at=now))
+                    continue
+                # Vazio só apaga colunas opcionais; nas obrigatórias (ex.: marca) fica o valor atual
+                changed = {column: values.get(column) for column in columns
+                           if values.get(column) is not None or table.c[column].nullable}
+                if any(getattr(current, column) != value for column, value in changed.items()):
+                    updates.setdefault(tuple(changed), []).append(dict(changed, b_sku=item['sku'], updated_at=now))
+                else:
+                    report['unchanged'] += 1
+
+            if inserts:
+                conn.execute(insert(table), inserts)
+            # Um UPDATE em lote por conjunto de colunas alteradas
+            for rows in updates.values():
+                conn.execute(update(table).where(table.c.sku == bindparam('b_sku')), rows)
+            if dry_run:
+                conn.rollback()
+            else:
+                if inserts or updates:
+                    _bump_version(conn, now)
+                conn.commit()
+        report['inserted'] += len(inserts)
+        report['updated'] += sum(len(rows) for rows in updates.values())
+
+    @staticmethod
+    def _delete_missing(conn, kind: str, brands: Optional[set], dry_run: bool) -> int:
+        """Remove os itens de `kind` ausentes do arquivo; com `brands`, só dessas marcas."""
+        table = KINDS[kind][0].__table__
+        missing = table.c.sku.not_in(select(SEEN.c.sku).where(SEEN.c.kind == kind))
+        if brands is not None:
+            if not brands:
+                return 0
+            missing = missing & func.lower(table.c.brand).in_(sorted(brands))
+        if dry_run:
+            return conn.execute(select(func.count()).select_from(table).where(missing)).scalar()
+        with sqlite_storage.write_lock():
+            deleted = conn.execute(table.delete().where(missing)).rowcount
+            if deleted:
+                _bump_version(conn, datetime.now())
+            conn.commit()
+        return deleted
+
+
+def _bump_version(conn, now: datetime):
+    conn.execute(update(CatalogState.__table__).where(CatalogState.id == 1)
+                 .values(version=CatalogState.version + 1, updated_at=now))
+
+
+def _report_error(report: Dict, error: str, sku: str = None, line: int = None):
+    report['invalid'] += 1
+    if len(report['errors']) < MAX_ERRORS:
+        report['errors'].append({'line': line, 'sku': sku, 'error': error})
+
+
+def _kind(value: Optional[str], default_kind: Optional[str]) -> Optional[str]:
+    if not value:
+        return default_kind
+    slug = _slug(value)
+    return next((name for name, aliases in KIND_ALIASES.items() if slug in aliases), None)
+
+
+def _by_kind(items: List[Dict]) -> Dict[str, List[Dict]]:
+    groups: Dict[str, List[Dict]] = {}
+    for item in items:
+        groups.setdefault(item['kind'], []).append(item)
+    return groups
+
+
+def _normalize(raw: Dict[str, str], default_kind: Optional[str]) -> Dict:
+    """Campos presentes de uma linha, convertidos e validados (ValueError com o motivo)."""
+    kind = _kind(raw.get('kind'), default_kind)
+    if kind is None:
+        if raw.get('kind'):
+            raise ValueError(f"categoria desconhecida: {raw['kind']}")
+        raise ValueError('sem categoria (coluna kind/categoria ou parâmetro kind)')
+
+    item = {'kind': kind, 'sku': raw.get('sku', '')}
+    for field in ('name', 'brand', 'type'):
+        if field in raw:
+            item[field] = raw[field] or None
+    if item.get('type'):
+        item['type'] = _slug(item['type'])
+    for field, limit in LIMITS.items():
+        if item.get(field) and len(item[field]) > limit:
+            raise ValueError(f'{field} com mais de {limit} caracteres')
+    if not item['sku']:
+        raise ValueError('sku vazio')
+
+    if 'power' in raw:
+        item['power'] = _power(raw['power'], kind) if raw['power'] else None
+        if item['power'] is not None and item['power'] <= 0:
+            raise ValueError(f"potência inválida: {raw['power']}")
+    if 'price' in raw:
+        item['price'] = parse_number(raw['price']) if raw['price'] else None
+        if item['price'] is not None and item['price'] <= 0:
+            raise ValueError(f"preço inválido: {raw['price']}")
+    if 'efficiency' in raw:
+        efficiency = parse_number(raw['efficiency']) if raw['efficiency'] else None
+        # 21,5% ou 21.5 -> 0.215
+        item['efficiency'] = efficiency / 100 if efficiency is not None and efficiency > 1 else efficiency
+    if 'warranty_years' in raw:
+        warranty = parse_number(raw['warranty_years']) if raw['warranty_years'] else None
+        item['warranty_years'] = int(warranty) if warranty is not None else None
+    for field in ('power', 'price'):
+        if field in raw and raw[field] and item.get(field) is None:
+            raise ValueError(f'{field} não numérico: {raw[field]}')
+    # Coluna obrigatória presente no arquivo, mas vazia nesta linha
+    for field in REQUIRED_FOR_INSERT:
+        if field in raw and item.get(field) is None:
+            raise ValueError(f'{field} vazio')
+    return item
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+catalog_importer = CatalogImporter()
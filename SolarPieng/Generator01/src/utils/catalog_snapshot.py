@@ -0,0 +1,155 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Arquivo: cabeçalho fixo (assinatura, tamanho do JSON, início dos dados), cabeçalho JSON
+# (versão e seções) e as seções, cada uma alinhada em 64 bytes
+MAGIC = b'PICATLG1'
+HEADER = struct.Struct('<8sIQ')
+ALIGN = 64
+
+# Índice de string para campos de texto vazios (None)
+NO_STRING = np.iinfo(np.uint32).max
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def file_key(path: Optional[str]) -> Optional[Tuple]:
+    """Identidade do arquivo (inode, mtime, tamanho): muda a cada os.replace; None se não existe."""
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class StringTable:
+    """Strings únicas (UTF-8) de um snapshot; os campos de texto dos arrays guardam o índice."""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._offsets = [0]
+        self._data = bytearray()
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self._offsets) - 1
+            self._data += value.encode('utf-8')
+            self._offsets.append(len(self._data))
+        return index
+
+    def sections(self) -> Dict[str, np.ndarray]:
+        return {
+            'string_offsets': np.array(self._offsets, dtype='<u8'),
+            'string_data': np.frombuffer(bytes(self._data), dtype=np.uint8)
+        }
+
+
+class CatalogSnapshot:
+    """
+    Catálogo compilado: arrays estruturados do NumPy (uma seção por tabela) e uma
+    tabela de strings, num arquivo binário mapeado só para leitura.
+
+    - Aberto com open(), os arrays são views sobre o mmap: as páginas vêm do page
+      cache e são as mesmas em todos os workers (e no master, com preload_app), em
+      vez de uma cópia em dicts por worker. Contam na RSS de cada worker, mas não na
+      memória privada (PSS/USS)
+    - O arquivo nunca é alterado no lugar: write_snapshot grava um temporário e faz
+      os.replace, então quem já mapeou a versão anterior continua lendo-a inteira até
+      remapear (o inode antigo só é liberado quando o último mapeamento é desfeito)
+    """
+
+    def __init__(self, version: int, sections: Dict[str, np.ndarray], key: Optional[Tuple] = None):
+        self.version = version
+        self.sections = sections
+        self.key = key
+        self._offsets = sections['string_offsets']
+        self._data = sections['string_data']
+
+    @classmethod
+    def open(cls, path: str) -> 'CatalogSnapshot':
+        """Mapeia o arquivo (ValueError se não for um snapshot válido)."""
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            # O mapeamento continua válido depois de fechar o arquivo
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f'snapshot truncado: {path}')
+        magic, header_size, data_offset = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'não é um snapshot do catálogo: {path}')
+        header = json.loads(buffer[HEADER.size:HEADER.size + header_size])
+
+        sections = {}
+        for name, section in header['sections'].items():
+            dtype = np.lib.format.descr_to_dtype(_descr(section['descr']))
+            if section['count'] == 0:
+                sections[name] = np.empty(0, dtype=dtype)
+                continue
+            offset = data_offset + section['offset']
+            if offset + dtype.itemsize * section['count'] > len(buffer):
+                raise ValueError(f'snapshot truncado: {path}')
+            sections[name] = np.frombuffer(buffer, dtype=dtype, count=section['count'], offset=offset)
+        return cls(header['version'], sections, key=(st.st_ino, st.st_mtime_ns, st.st_size))
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes().decode('utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.sections.values())
+
+
+def _descr(value):
+    # O JSON transforma as tuplas (nome, tipo) da descrição do dtype em listas
+    if isinstance(value, list):
+        return [tuple(field) for field in value]
+    return value
+
+
+def write_snapshot(path: str, version: int, sections: Dict[str, np.ndarray]):
+    """Grava as seções num temporário ao lado de `path` e o troca de lugar atomicamente."""
+    offsets, position = {}, 0
+    for name, array in sections.items():
+        position = _aligned(position)
+        offsets[name] = position
+        position += array.nbytes
+    header = json.dumps({
+        'version': version,
+        'sections': {
+            name: {'descr': np.lib.format.dtype_to_descr(array.dtype), 'offset': offsets[name],
+                   'count': len(array)}
+            for name, array in sections.items()
+        }
+    }).encode('utf-8')
+    data_offset = _aligned(HEADER.size + len(header))
+
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header), data_offset))
+            f.write(header)
+            for name, array in sections.items():
+                f.seek(data_offset + offsets[name])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_offset + _aligned(position))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
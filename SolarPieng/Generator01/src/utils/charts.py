@@ -0,0 +1,325 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Fator sazonal de irradiação (HSP mensal / HSP média) típico do Centro-Oeste.
+# Média = 1.0, então a geração anual bate com o cálculo por HSP média.
+MONTHLY_HSP_FACTORS = np.array([
+    0.97, 1.01, 0.98, 1.00, 0.96, 0.93, 0.98, 1.06, 1.05, 1.03, 1.01, 1.02
+])
+MONTHLY_HSP_FACTORS = MONTHLY_HSP_FACTORS / MONTHLY_HSP_FACTORS.mean()
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=float)
+
+MONTH_LABELS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
+                'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Degradação anual dos painéis (mesmo valor de DEGRADACAO_ANUAL_PAINEIS em config.json)
+DEFAULT_PANEL_DEGRADATION = 0.006
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 280
+MARGIN = {'left': 70, 'right': 20, 'top': 36, 'bottom': 40}
+
+
+class _SVGCache:
+    """LRU de fragmentos SVG indexado pelo digest dos dados de entrada."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return svg
+
+    def put(self, key: str, svg: str):
+        with self._lock:
+            self._entries[key] = svg
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+svg_cache = _SVGCache()
+
+
+def series_digest(kind: str, *parts) -> str:
+    """
+    Digest estável dos dados de um gráfico.
+    Arrays NumPy entram pelos bytes brutos; o resto pela representação textual.
+    """
+    h = hashlib.blake2b(kind.encode('utf-8'), digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str(part.shape).encode('ascii'))
+            h.update(np.ascontiguousarray(part, dtype=float).tobytes())
+        else:
+            h.update(repr(part).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Séries (cálculo vetorizado)
+# ---------------------------------------------------------------------------
+
+def cumulative_savings_series(monthly_savings: float, investment: float, years: int = 25,
+                              energy_inflation: float = 4.8,
+                              degradation: float = DEFAULT_PANEL_DEGRADATION) -> np.ndarray:
+    """
+    Saldo acumulado (economia - investimento) ao fim de cada ano.
+    A economia cresce com a inflação energética e cai com a degradação dos painéis.
+    """
+    year_idx = np.arange(years, dtype=float)
+    yearly = (monthly_savings * 12
+              * np.power(1 + energy_inflation / 100, year_idx)
+              * np.power(1 - degradation, year_idx))
+    return np.concatenate(([-investment], np.cumsum(yearly) - investment))
+
+
+def monthly_generation_series(power_kwp: float, hsp: float, system_efficiency: float = 75) -> np.ndarray:
+    """Geração estimada (kWh) para cada mês do ano, com sazonalidade da irradiação."""
+    return power_kwp * hsp * MONTHLY_HSP_FACTORS * DAYS_IN_MONTH * (system_efficiency / 100)
+
+
+# ---------------------------------------------------------------------------
+# Primitivas SVG
+# ---------------------------------------------------------------------------
+
+def _nice_bounds(values: np.ndarray, include_zero: bool = True):
+    low = float(values.min()) if values.size else 0.0
+    high = float(values.max()) if values.size else 1.0
+    if include_zero:
+        low, high = min(low, 0.0), max(high, 0.0)
+    if high == low:
+        high = low + 1.0
+    pad = (high - low) * 0.05
+    return low - (pad if low < 0 else 0), high + pad
+
+
+def _format_value(value: float) -> str:
+    if abs(value) >= 1000:
+        return f"{value / 1000:.0f}k" if abs(value) >= 10000 else f"{value / 1000:.1f}k"
+    return f"{value:.0f}"
+
+
+def _svg_frame(title: str, low: float, high: float, body: List[str], x_labels: List[str],
+               x_positions: np.ndarray, legend: List[tuple]) -> str:
+    plot_h = CHART_HEIGHT - MARGIN['top'] - MARGIN['bottom']
+
+    ticks = np.linspace(low, high, 5)
+    tick_y = MARGIN['top'] + plot_h * (1 - (ticks - low) / (high - low))
+
+    parts = [
+        f'<svg class="chart" viewBox="0 0 {CHART_WIDTH} {CHART_HEIGHT}" '
+        f'xmlns="http://www.w3.org/2000/svg" role="img" aria-label="{escape(title)}">',
+        f'<text x="{CHART_WIDTH / 2:.0f}" y="20" text-anchor="middle" class="chart-title">{escape(title)}</text>'
+    ]
+    for value, y in zip(ticks, tick_y):
+        parts.append(
+            f'<line x1="{MARGIN["left"]}" x2="{CHART_WIDTH - MARGIN["right"]}" y1="{y:.1f}" y2="{y:.1f}" class="chart-grid"/>'
+            f'<text x="{MARGIN["left"] - 6}" y="{y + 4:.1f}" text-anchor="end" class="chart-axis">{_format_value(value)}</text>'
+        )
+    if low < 0 < high:
+        zero_y = MARGIN['top'] + plot_h * (1 - (0 - low) / (high - low))
+        parts.append(
+            f'<line x1="{MARGIN["left"]}" x2="{CHART_WIDTH - MARGIN["right"]}" y1="{zero_y:.1f}" y2="{zero_y:.1f}" class="chart-zero"/>'
+        )
+
+    parts.extend(body)
+
+    for label, x in zip(x_labels, x_positions):
+        if label:
+            parts.append(
+                f'<text x="{x:.1f}" y="{CHART_HEIGHT - MARGIN["bottom"] + 16}" text-anchor="middle" class="chart-axis">{escape(label)}</text>'
+            )
+
+    legend_x = MARGIN['left']
+    for name, color in legend:
+        parts.append(
+            f'<rect x="{legend_x}" y="{CHART_HEIGHT - 14}" width="10" height="10" fill="{color}"/>'
+            f'<text x="{legend_x + 14}" y="{CHART_HEIGHT - 5}" class="chart-axis">{escape(name)}</text>'
+        )
+        legend_x += 24 + 7 * len(name)
+
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def line_chart(title: str, series: Dict[str, np.ndarray], x_labels: Sequence[str],
+               colors: Sequence[str]) -> str:
+    """Gráfico de linhas; todas as séries devem ter o mesmo comprimento."""
+    names = list(series.keys())
+    matrix = np.vstack([np.asarray(series[n], dtype=float) for n in names])
+    key = series_digest('line', title, names, list(x_labels), list(colors), matrix)
+    cached = svg_cache.get(key)
+    if cached is not None:
+        return cached
+
+    low, high = _nice_bounds(matrix)
+    plot_w = CHART_WIDTH - MARGIN['left'] - MARGIN['right']
+    plot_h = CHART_HEIGHT - MARGIN['top'] - MARGIN['bottom']
+    count = matrix.shape[1]
+
+    xs = MARGIN['left'] + plot_w * np.arange(count) / max(count - 1, 1)
+    ys = MARGIN['top'] + plot_h * (1 - (matrix - low) / (high - low))
+
+    body = []
+    for i, name in enumerate(names):
+        points = ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs, ys[i]))
+        body.append(f'<polyline points="{points}" fill="none" stroke="{colors[i % len(colors)]}" stroke-width="2.5"/>')
+
+    svg = _svg_frame(title, low, high, body, list(x_labels), xs,
+                     [(n, colors[i % len(colors)]) for i, n in enumerate(names)])
+    svg_cache.put(key, svg)
+    return svg
+
+
+def bar_chart(title: str, categories: Sequence[str], groups: Dict[str, np.ndarray],
+              colors: Sequence[str]) -> str:
+    """Gráfico de barras agrupadas: uma barra por grupo em cada categoria."""
+    names = list(groups.keys())
+    matrix = np.vstack([np.asarray(groups[n], dtype=float) for n in names])
+    key = series_digest('bar', title, names, list(categories), list(colors), matrix)
+    cached = svg_cache.get(key)
+    if cached is not None:
+        return cached
+
+    low, high = _nice_bounds(matrix)
+    plot_w = CHART_WIDTH - MARGIN['left'] - MARGIN['right']
+    plot_h = CHART_HEIGHT - MARGIN['top'] - MARGIN['bottom']
+    n_groups, n_cats = matrix.shape
+
+    slot = plot_w / max(n_cats, 1)
+    bar_w = slot * 0.8 / n_groups
+    centers = MARGIN['left'] + slot * (np.arange(n_cats) + 0.5)
+    # x de cada barra: matriz (grupo, categoria)
+    bar_x = centers - slot * 0.4 + bar_w * np.arange(n_groups)[:, None]
+    zero_y = MARGIN['top'] + plot_h * (1 - (0 - low) / (high - low))
+    value_y = MARGIN['top'] + plot_h * (1 - (matrix - low) / (high - low))
+    top_y = np.minimum(value_y, zero_y)
+    heights = np.abs(value_y - zero_y)
+
+    body = []
+    for g in range(n_groups):
+        color = colors[g % len(colors)]
+        for x, y, h in zip(bar_x[g], top_y[g], heights[g]):
+            body.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{bar_w:.1f}" height="{h:.1f}" fill="{color}" rx="2"/>')
+
+    legend = [(n, colors[i % len(colors)]) for i, n in enumerate(names)] if n_groups > 1 else []
+    svg = _svg_frame(title, low, high, body, list(categories), centers, legend)
+    svg_cache.put(key, svg)
+    return svg
+
+
+# ---------------------------------------------------------------------------
+# Gráficos da proposta
+# ---------------------------------------------------------------------------
+
+def cumulative_savings_chart(proposal: Dict, colors: Sequence[str], years: int = 25) -> str:
+    """Retorno acumulado do investimento ao longo dos anos."""
+    params = proposal.get('parameters_used', {})
+    balance = cumulative_savings_series(
+        proposal['calculations']['monthly_savings'],
+        proposal['pricing']['final_price'],
+        years=years,
+        energy_inflation=params.get('energy_inflation', 4.8)
+    )
+    labels = [str(y) if y % 5 == 0 else '' for y in range(years + 1)]
+    return line_chart('Retorno acumulado (R$) por ano', {'Saldo acumulado': balance}, labels, colors)
+
+
+def _consumption_kwh(value) -> Optional[float]:
+    """Consumo mensal informado pelo cliente, ou None se vazio ou não numérico."""
+    try:
+        consumption = float(value)
+    except (TypeError, ValueError):
+        return None
+    return consumption if math.isfinite(consumption) and consumption > 0 else None
+
+
+def generation_vs_consumption_chart(proposal: Dict, colors: Sequence[str],
+                                    monthly_consumption_kwh: float = None) -> str:
+    """Geração mensal estimada x consumo do cliente (quando conhecido e numérico)."""
+    params = proposal.get('parameters_used', {})
+    generation = monthly_generation_series(
+        proposal['kit_info']['power'],
+        params.get('hsp', 5.25),
+        params.get('system_efficiency', 75)
+    )
+    groups = {'Geração (kWh)': generation}
+    consumption = _consumption_kwh(monthly_consumption_kwh)
+    if consumption is not None:
+        groups['Consumo (kWh)'] = np.full(12, consumption)
+    return bar_chart('Geração mensal x consumo', MONTH_LABELS, groups, colors)
+
+
+def payment_options_chart(proposal: Dict, colors: Sequence[str]) -> str:
+    """Valor total pago em cada modalidade de pagamento."""
+    pricing = proposal['pricing']
+    categories = ['À vista/PIX', 'Preço final', '12x sem juros', '18x cartão']
+    totals = np.array([
+        pricing['cash_price'],
+        pricing['final_price'],
+        pricing['price_no_discount'],
+        pricing['financing_total']
+    ])
+    return bar_chart('Total por modalidade de pagamento (R$)', categories, {'Total': totals}, colors)
+
+
+def payback_comparison_chart(proposals: List[Dict], colors: Sequence[str]) -> str:
+    """Payback (meses) de cada kit comparado."""
+    names = [p['kit_info'].get('name', f'Kit {i + 1}')[:14] for i, p in enumerate(proposals)]
+    paybacks = np.array([p['calculations']['final_payback_months'] for p in proposals])
+    return bar_chart('Payback por kit (meses)', names, {'Payback': paybacks}, colors)
+
+
+def price_per_kwp_chart(proposals: List[Dict], colors: Sequence[str]) -> str:
+    """Preço final por kWp de cada kit comparado."""
+    names = [p['kit_info'].get('name', f'Kit {i + 1}')[:14] for i, p in enumerate(proposals)]
+    prices = np.array([p['pricing']['final_price'] for p in proposals])
+    powers = np.array([p['kit_info']['power'] for p in proposals], dtype=float)
+    per_kwp = np.divide(prices, powers, out=np.zeros_like(prices, dtype=float), where=powers > 0)
+    return bar_chart('Preço por kWp (R$)', names, {'R$/kWp': per_kwp}, colors)
+
+
+def proposal_charts(proposals: List[Dict], client_data: Dict, colors: Sequence[str]) -> List[str]:
+    """Gera todos os gráficos SVG da proposta analítica (melhor proposta + comparativos)."""
+    if not proposals:
+        return []
+
+    best = proposals[0]
+    consumption = (best.get('quick_quote_info', {}).get('original_consumption_kwh')
+                   or client_data.get('monthly_consumption_kwh'))
+
+    charts = [
+        cumulative_savings_chart(best, colors),
+        generation_vs_consumption_chart(best, colors, consumption),
+        payment_options_chart(best, colors)
+    ]
+    if len(proposals) > 1:
+        charts.append(payback_comparison_chart(proposals, colors))
+        charts.append(price_per_kwp_chart(proposals, colors))
+    return charts
@@ -0,0 +1,355 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+
+from src.models.component import CatalogState, Inverter, Module
+from src.models.user import db
+from src.utils.catalog_snapshot import CatalogSnapshot, StringTable, file_key, write_snapshot
+from src.utils.config_service import config_service
+from src.utils.proposal_history import decode_cursor, encode_cursor, page_size
+from src.utils.storage import sqlite_file, sqlite_storage
+
+logger = logging.getLogger(__name__)
+
+# Colunas com as chaves do components_db.json (id = sku); row_id só para o cursor
+MODULE_COLUMNS = (Module.sku.label('id'), Module.name, Module.brand, Module.type, Module.power_wp,
+                  Module.price.label('price_per_unit'), Module.efficiency, Module.warranty_years)
+INVERTER_COLUMNS = (Inverter.sku.label('id'), Inverter.name, Inverter.brand, Inverter.type, Inverter.power_kw,
+                    Inverter.price, Inverter.efficiency, Inverter.warranty_years)
+
+# kind da rota -> (modelo, coluna de potência, colunas da listagem)
+KINDS = {
+    'modules': (Module, Module.power_wp, MODULE_COLUMNS),
+    'inverters': (Inverter, Inverter.power_kw, INVERTER_COLUMNS)
+}
+SORTS = ('power', 'price', 'brand')
+
+# Linhas do snapshot compartilhado, na ordem das colunas acima: textos como índice na
+# tabela de strings, eficiência ausente como NaN e garantia ausente como -1
+SNAPSHOT_DTYPES = {
+    kind: np.dtype([('sku', '<u4'), ('name', '<u4'), ('brand', '<u4'), ('type', '<u4'),
+                    (power.key, '<f8'), ('price', '<f8'), ('efficiency', '<f8'), ('warranty_years', '<i2')])
+    for kind, (_model, power, _columns) in KINDS.items()
+}
+# Módulos na ordem de cadastro; inversores por (potência, preço) para a busca binária
+SNAPSHOT_ORDER = {
+    'modules': (Module.id,),
+    'inverters': (Inverter.power_kw, Inverter.price, Inverter.id)
+}
+
+
+def module_row(item: Dict) -> Dict:
+    """Linha de catalog_modules a partir de um item no formato do components_db.json."""
+    return {
+        'sku': str(item['id']),
+        'name': item['name'],
+        'brand': item.get('brand') or 'Genérico',
+        'type': item.get('type'),
+        'power_wp': float(item['power_wp']),
+        'price': float(item.get('price_per_unit', item.get('price'))),
+        'efficiency': item.get('efficiency'),
+        'warranty_years': item.get('warranty_years')
+    }
+
+
+def inverter_row(item: Dict) -> Dict:
+    """Linha de catalog_inverters a partir de um item no formato do components_db.json."""
+    return {
+        'sku': str(item['id']),
+        'name': item['name'],
+        'brand': item.get('brand') or 'Genérico',
+        'type': item.get('type'),
+        'power_kw': float(item['power_kw']),
+        'price': float(item['price']),
+        'efficiency': item.get('efficiency'),
+        'warranty_years': item.get('warranty_years')
+    }
+
+
+def _snapshot_rows(rows: Iterable[Tuple], strings: StringTable) -> Iterator[Tuple]:
+    for sku, name, brand, type, power, price, efficiency, warranty_years in rows:
+        yield (strings.add(sku), strings.add(name), strings.add(brand), strings.add(type), power, price,
+               math.nan if efficiency is None else efficiency, -1 if warranty_years is None else warranty_years)
+
+
+def snapshot_item(snapshot: CatalogSnapshot, kind: str, index: int) -> Dict:
+    """Um módulo ou inversor do snapshot, com as chaves do components_db.json."""
+    row = snapshot.sections[kind][index]
+    sku, name, brand, type, power, price, efficiency, warranty_years = row.item()
+    values = (snapshot.string(sku), snapshot.string(name), snapshot.string(brand), snapshot.string(type),
+              power, price, None if math.isnan(efficiency) else efficiency,
+              None if warranty_years < 0 else warranty_years)
+    return {column.key: value for column, value in zip(KINDS[kind][2], values)}
+
+
+def select_inverter(powers: np.ndarray, prices: np.ndarray, power_kw: float) -> Optional[int]:
+    """
+    Índice do inversor do orçamento rápido, com os inversores ordenados por
+    (potência, preço): o mais barato entre 80% e 120% da potência. Sem nenhum na
+    faixa, o mais barato do catálogo inteiro (no empate de preço, o de potência mais
+    próxima), como o gerador sempre fez.
+
+    >>> powers, prices = np.array([3.0, 5.0, 5.0, 8.0, 20.0]), np.array([2500., 3200., 3000., 4100., 9000.])
+    >>> select_inverter(powers, prices, 5.2)    # na faixa: o mais barato entre 4,16 e 6,24 kW
+    2
+    >>> select_inverter(powers, prices, 1.0)    # abaixo da faixa: o mais barato (3 kW)
+    0
+    >>> select_inverter(powers, prices, 40.0)   # acima da faixa: o mais barato, não o de 20 kW
+    0
+    >>> select_inverter(powers, np.array([2500., 3200., 3000., 4100., 2500.]), 40.0)
+    4
+    >>> select_inverter(np.array([]), np.array([]), 5.0) is None
+    True
+    """
+    start = int(powers.searchsorted(power_kw * 0.8, 'left'))
+    end = int(powers.searchsorted(power_kw * 1.2, 'right'))
+    if start < end:
+        return start + int(prices[start:end].argmin())
+    if not len(prices):
+        return None
+    cheapest = np.flatnonzero(prices == prices.min())
+    return int(cheapest[np.abs(powers[cheapest] - power_kw).argmin()])
+
+
+class QuickQuoteTables:
+    """
+    Tabelas do orçamento rápido sobre o snapshot de uma versão do catálogo: o módulo
+    de melhor custo-benefício e os inversores já ordenados por (potência, preço), para
+    escolher o inversor por busca binária (select_inverter). Só o item escolhido vira dict.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        modules = snapshot.sections['modules']
+        # Mais Wp por R$; no empate, o primeiro cadastrado (argmax devolve o primeiro)
+        priced = np.flatnonzero(modules['price'] > 0)
+        self.best_module = None
+        if priced.size:
+            ratio = modules['power_wp'][priced] / modules['price'][priced]
+            self.best_module = snapshot_item(snapshot, 'modules', int(priced[np.argmax(ratio)]))
+        self.powers = snapshot.sections['inverters_power_kw']
+        self.prices = snapshot.sections['inverters']['price']
+        # Só os inversores já escolhidos viram dict (poucos por versão do catálogo)
+        self._inverters: Dict[int, Dict] = {}
+
+    def inverter_for(self, power_kw: float) -> Optional[Dict]:
+        """Inversor escolhido por select_inverter; None com o catálogo sem inversores."""
+        index = select_inverter(self.powers, self.prices, power_kw)
+        return None if index is None else self._inverter(index)
+
+    def _inverter(self, index: int) -> Dict:
+        item = self._inverters.get(index)
+        if item is None:
+            item = self._inverters[index] = snapshot_item(self.snapshot, 'inverters', index)
+        return item
+
+
+class ComponentCatalog:
+    """
+    Catálogo de módulos e inversores em tabelas indexadas do banco principal
+    (catalog_modules e catalog_inverters), no lugar das listas do components_db.json.
+
+    - Índices (coluna, id) em potência, preço, marca e tipo: filtros por faixa e
+      paginação por cursor sem ler o catálogo inteiro
+    - O JSON só semeia as tabelas num banco novo; as seções de custos (cabos,
+      estrutura, instalação, adicionais) continuam no components_db.json
+    - catalog_state.version muda a cada alteração: é o ETag de /api/components
+    - Snapshot compartilhado (CatalogSnapshot): módulos e inversores compilados em
+      arrays do NumPy num arquivo ao lado do banco (CATALOG_SNAPSHOT_PATH, padrão
+      <banco>-catalog), mapeado só para leitura por todos os workers. O orçamento
+      rápido lê dele em vez de manter os inversores em dicts em cada worker
+    - Quem altera o catálogo chama refresh(): o snapshot é recompilado e trocado por
+      os.replace. Os demais workers fazem um stat do arquivo a cada uso e remapeiam na
+      próxima requisição; a versão do banco ainda é conferida a cada
+      `revalidate_interval` segundos, para alterações feitas sem refresh()
+    - Banco em memória: o snapshot fica só nos arrays deste processo
+    """
+
+    def __init__(self, revalidate_interval: float = 5.0):
+        self.revalidate_interval = revalidate_interval
+        self.snapshot_path: Optional[str] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._quick_quote: Optional[QuickQuoteTables] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Chamar depois de config_service.init_app (semeia a partir do components_db.json)."""
+        self.revalidate_interval = app.config.get('CONFIG_REVALIDATE_SECONDS', self.revalidate_interval)
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        self.snapshot_path = app.config.get('CATALOG_SNAPSHOT_PATH') or (
+            make_url(uri).database + '-catalog' if sqlite_file(uri) else None)
+        self.invalidate()
+        app.extensions['component_catalog'] = self
+        with app.app_context():
+            self._seed(config_service.get('components_db') or {})
+            # Com preload_app, o master já deixa o snapshot mapeado para os workers
+            self.snapshot()
+
+    @staticmethod
+    def _seed(components_db: Dict):
+        if db.session.get(CatalogState, 1) is not None:
+            return
+        modules = [module_row(item) for item in components_db.get('modules', ())]
+        inverters = [inverter_row(item) for item in components_db.get('inverters', ())]
+        try:
+            with sqlite_storage.write_lock():
+                if modules:
+                    db.session.execute(insert(Module), modules)
+                if inverters:
+                    db.session.execute(insert(Inverter), inverters)
+                db.session.add(CatalogState(id=1, version=1))
+                db.session.commit()
+        except IntegrityError:
+            # Outro worker semeou ao mesmo tempo
+            db.session.rollback()
+            return
+        logger.info('Catálogo de componentes semeado a partir do components_db.json',
+                    extra={'modules': len(modules), 'inverters': len(inverters)})
+
+    def version(self) -> int:
+        """Versão atual do catálogo (sempre consultada no banco)."""
+        return db.session.execute(select(CatalogState.version).where(CatalogState.id == 1)).scalar() or 0
+
+    def invalidate(self):
+        """Descarta o snapshot mapeado neste worker (a versão é consultada no próximo uso)."""
+        with self._lock:
+            self._snapshot = None
+            self._next_check = 0.0
+
+    def refresh(self) -> CatalogSnapshot:
+        """Depois de alterar o catálogo: recompila o snapshot se a versão mudou."""
+        self.invalidate()
+        return self.snapshot()
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Snapshot da versão atual (mapeado do arquivo compartilhado ou recompilado)."""
+        key = file_key(self.snapshot_path)
+        current = self._snapshot
+        if current is not None and current.key == key and time.monotonic() < self._next_check:
+            return current
+        with self._lock:
+            current = self._snapshot
+            # Arquivo trocado por outro worker: remapeia sem consultar o banco
+            if self.snapshot_path is not None and (current is None or current.key != key):
+                current = self._map()
+            if current is None or time.monotonic() >= self._next_check:
+                if current is None or current.version != self.version():
+                    current = self._rebuild()
+                self._next_check = time.monotonic() + self.revalidate_interval
+            self._snapshot = current
+            return current
+
+    def rebuild(self) -> CatalogSnapshot:
+        """Recompila o snapshot mesmo sem mudança de versão (ex.: arquivo apagado ou corrompido)."""
+        with self._lock:
+            self._snapshot = self._rebuild(force=True)
+            self._next_check = time.monotonic() + self.revalidate_interval
+            return self._snapshot
+
+    def _map(self) -> Optional[CatalogSnapshot]:
+        try:
+            return CatalogSnapshot.open(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            logger.warning('Snapshot do catálogo inválido; será recompilado',
+                           extra={'path': self.snapshot_path, 'error': str(e)})
+            return None
+
+    def _rebuild(self, force: bool = False) -> CatalogSnapshot:
+        # Sob o write_lock: as gravações do catálogo esperam (versão e linhas da mesma
+        # leitura) e só um worker compila; os outros encontram o arquivo já trocado
+        with sqlite_storage.write_lock(), db.engine.connect() as conn:
+            version = conn.execute(select(CatalogState.version).where(CatalogState.id == 1)).scalar() or 0
+            if not force and self.snapshot_path is not None:
+                mapped = self._map()
+                if mapped is not None and mapped.version == version:
+                    return mapped
+
+            started = time.perf_counter()
+            strings = StringTable()
+            sections = {}
+            for kind, order in SNAPSHOT_ORDER.items():
+                rows = conn.execute(select(*KINDS[kind][2]).order_by(*order))
+                sections[kind] = np.fromiter(_snapshot_rows(rows, strings), dtype=SNAPSHOT_DTYPES[kind])
+            # Índice contíguo da busca binária (searchsorted num campo do array estruturado,
+            # com passo de uma linha inteira, copiaria a coluna a cada orçamento)
+            sections['inverters_power_kw'] = np.ascontiguousarray(sections['inverters']['power_kw'])
+            sections.update(strings.sections())
+            if self.snapshot_path is None:
+                return CatalogSnapshot(version, sections)
+            write_snapshot(self.snapshot_path, version, sections)
+
+        snapshot = CatalogSnapshot.open(self.snapshot_path)
+        logger.info('Snapshot do catálogo compilado',
+                    extra={'version': version, 'modules': len(sections['modules']),
+                           'inverters': len(sections['inverters']), 'bytes': snapshot.key[2],
+                           'ms': round((time.perf_counter() - started) * 1000, 1)})
+        return snapshot
+
+    def list_components(self, kind: str, brand: str = None, type: str = None, min_power: float = None,
+                        max_power: float = None, min_price: float = None, max_price: float = None,
+                        sort: str = 'power', order: str = 'asc', limit: int = None,
+                        cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """Uma página de módulos ou inversores e o cursor da próxima (None na última)."""
+        if kind not in KINDS:
+            raise ValueError(f"kind deve ser um de: {', '.join(KINDS)}")
+        if sort not in SORTS:
+            raise ValueError(f"sort deve ser um de: {', '.join(SORTS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError('order deve ser asc ou desc')
+        limit = page_size(limit)
+        model, power, columns = KINDS[kind]
+        column = {'power': power, 'price': model.price, 'brand': model.brand}[sort]
+
+        query = select(*columns, column.label('sort_value'), model.id.label('row_id'))
+        if brand is not None:
+            query = query.where(model.brand == brand)
+        if type is not None:
+            query = query.where(model.type == type)
+        if min_power is not None:
+            query = query.where(power >= min_power)
+        if max_power is not None:
+            query = query.where(power <= max_power)
+        if min_price is not None:
+            query = query.where(model.price >= min_price)
+        if max_price is not None:
+            query = query.where(model.price <= max_price)
+
+        position = tuple_(column, model.id)
+        if cursor:
+            after = tuple_(*decode_cursor(cursor, str if sort == 'brand' else (int, float)))
+            query = query.where(position < after if order == 'desc' else position > after)
+        if order == 'desc':
+            query = query.order_by(column.desc(), model.id.desc())
+        else:
+            query = query.order_by(column.asc(), model.id.asc())
+
+        # Um item a mais só para saber se há próxima página
+        rows = db.session.execute(query.limit(limit + 1)).mappings().all()
+        keys = [c.key for c in columns]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last['sort_value'], last['row_id'])
+        return [{key: row[key] for key in keys} for row in rows[:limit]], next_cursor
+
+    def quick_quote_tables(self) -> QuickQuoteTables:
+        """Tabelas do orçamento rápido sobre o snapshot atual (montadas uma vez por snapshot)."""
+        snapshot = self.snapshot()
+        tables = self._quick_quote
+        if tables is None or tables.snapshot is not snapshot:
+            tables = self._quick_quote = QuickQuoteTables(snapshot)
+        return tables
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+component_catalog = ComponentCatalog()
@@ -0,0 +1,228 @@
+import gzip
+import mimetypes
+import os
+from typing import Dict, List, Optional
+
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+
+# Extensões que valem a pena comprimir (texto). Imagens já são comprimidas.
+COMPRESSIBLE_EXTENSIONS = {'.html', '.htm', '.css', '.js', '.json', '.svg', '.txt', '.xml'}
+
+# Abaixo deste tamanho o cabeçalho da compressão não compensa
+MIN_COMPRESS_SIZE = 256
+
+# Sufixo do arquivo pré-comprimido para cada Content-Encoding
+ENCODING_SUFFIXES = {
+    'br': '.br',
+    'gzip': '.gz'
+}
+
+
+def available_encodings() -> List[str]:
+    """Encodings suportados neste ambiente, em ordem de preferência."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    """Comprime os bytes com o encoding informado ('br' ou 'gzip')."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 deixa a saída determinística (mesmo conteúdo, mesmos bytes)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_precompressed(path: str, data: bytes = None) -> Dict[str, str]:
+    """
+    Gera as versões pré-comprimidas (.gz e, se disponível, .br) ao lado do arquivo.
+
+    Deve ser chamada uma única vez, logo após o arquivo ser escrito.
+    Retorna {encoding: caminho} com as variantes geradas.
+    """
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+
+    variants = {}
+    if len(data) < MIN_COMPRESS_SIZE:
+        return variants
+
+    for encoding in available_encodings():
+        compressed = compress_bytes(data, encoding)
+        variant_path = path + ENCODING_SUFFIXES[encoding]
+        # Só mantém a variante se realmente for menor que o original
+        if len(compressed) < len(data):
+            _write_atomic(variant_path, compressed)
+            variants[encoding] = variant_path
+
+    return variants
+
+
+def precompress_directory(directory: str) -> int:
+    """
+    Pré-comprime os arquivos de texto de um diretório (ex.: static/).
+    Arquivos cujas variantes já estão atualizadas (por mtime) são ignorados.
+    Retorna a quantidade de arquivos comprimidos.
+    """
+    count = 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            if len(_fresh_variants(path)) == len(available_encodings()):
+                continue
+            if write_precompressed(path):
+                count += 1
+    return count
+
+
+def _fresh_variants(path: str) -> Dict[str, str]:
+    """Variantes existentes que não são mais antigas que o arquivo original."""
+    try:
+        source_mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    variants = {}
+    for encoding in available_encodings():
+        variant_path = path + ENCODING_SUFFIXES[encoding]
+        try:
+            if os.stat(variant_path).st_mtime >= source_mtime:
+                variants[encoding] = variant_path
+        except OSError:
+            continue
+    return variants
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Interpreta o cabeçalho Accept-Encoding em {encoding: q}."""
+    accepted = {}
+    if not header:
+        return accepted
+
+    for item in header.split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str], available: List[str]) -> Optional[str]:
+    """
+    Escolhe o melhor encoding disponível aceito pelo cliente.
+    Em caso de empate no q, vale a ordem de preferência de `available`.
+    """
+    accepted = parse_accept_encoding(header)
+    best = None
+    best_q = 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def send_precompressed(path: str, mimetype: str = None, **kwargs):
+    """
+    Envia o arquivo usando a variante pré-comprimida aceita pelo cliente.
+
+    O envio é feito por send_file, que usa o wsgi.file_wrapper do servidor
+    (sendfile no gunicorn), sem copiar o conteúdo para a memória do Python.
+    """
+    # send_file resolve caminhos relativos a partir de app.root_path (src/), mas os
+    # arquivos gerados (output/) são relativos ao diretório de trabalho
+    path = os.path.abspath(path)
+    variants = _fresh_variants(path)
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'),
+                                  [e for e in available_encodings() if e in variants])
+
+    if mimetype is None:
+        # Mimetype sempre do arquivo original, nunca do .gz/.br
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if encoding is None:
+        response = send_file(path, mimetype=mimetype, **kwargs)
+    else:
+        kwargs.setdefault('download_name', os.path.basename(path))
+        response = send_file(variants[encoding], mimetype=mimetype, **kwargs)
+        response.headers['Content-Encoding'] = encoding
+
+    if variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+# Tipos de resposta dinâmica que valem compressão on-the-fly
+DYNAMIC_COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css',
+    'application/javascript', 'image/svg+xml', 'application/x-ndjson'
+}
+
+
+def init_response_compression(app, min_size: int = None, gzip_level: int = None, brotli_quality: int = None):
+    """
+    Comprime respostas dinâmicas (JSON das propostas, HTML) acima de um tamanho mínimo.
+
+    Configurável por app.config: COMPRESS_MIN_SIZE (bytes, padrão 1024),
+    COMPRESS_GZIP_LEVEL (padrão 6) e COMPRESS_BROTLI_QUALITY (padrão 4; qualidades
+    altas ficam para os arquivos pré-comprimidos, que são gerados uma vez só).
+    Arquivos servidos por send_file/send_precompressed não passam por aqui.
+    """
+    min_size = min_size or app.config.get('COMPRESS_MIN_SIZE', 1024)
+    gzip_level = gzip_level or app.config.get('COMPRESS_GZIP_LEVEL', 6)
+    brotli_quality = brotli_quality or app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in DYNAMIC_COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # A representação mudou: o ETag (se houver) passa a ser fraco
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return compress_response
@@ -0,0 +1,285 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, List, Optional
+
+from flask import jsonify, make_response
+
+from src.utils.metrics import format_header, format_sample, histogram_samples
+
+logger = logging.getLogger(__name__)
+
+# Limites de bucket (segundos) do histograma de espera na fila
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Pools padrão: (execuções simultâneas, tamanho da fila, espera máxima na fila em segundos).
+# Somam 13 requisições caras, abaixo do limite por worker com as 16 threads padrão (15)
+DEFAULT_POOLS = {
+    'ocr': (1, 2, 15.0),
+    'render': (2, 2, 10.0),
+    'calc': (2, 4, 5.0)
+}
+
+
+def fit_pools(pools: Dict[str, tuple], budget: int) -> Dict[str, tuple]:
+    """
+    Ajusta os pools para caberem em `budget` requisições caras (executando + na fila),
+    para que a fila de cada pool (429) seja alcançável antes do limite do worker (503):
+    reduz primeiro as filas maiores e, se ainda não couber, as vagas (mínimo 1 por pool).
+    """
+    fitted = {name: list(limits) for name, limits in pools.items()}
+    for index, minimum in ((1, 0), (0, 1)):
+        while sum(limits[0] + limits[1] for limits in fitted.values()) > budget:
+            name = max(fitted, key=lambda pool: fitted[pool][index])
+            if fitted[name][index] <= minimum:
+                break
+            fitted[name][index] -= 1
+    return {name: tuple(limits) for name, limits in fitted.items()}
+
+
+class PoolSaturated(Exception):
+    """Requisição recusada pelo limitador (fila cheia ou espera esgotada)."""
+
+    def __init__(self, pool: str, status: int, retry_after: int, message: str):
+        super().__init__(message)
+        self.pool = pool
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+
+class ConcurrencyPool:
+    """
+    Limita quantas requisições de um tipo executam ao mesmo tempo em um worker.
+
+    Até `max_concurrent` executam; as seguintes esperam numa fila de até
+    `max_queue` posições por no máximo `queue_timeout` segundos.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        # Média móvel do tempo de execução, usada para estimar o Retry-After
+        self.avg_service_seconds = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+
+    def _retry_after(self) -> int:
+        # Tempo para esvaziar a fila atual com as vagas disponíveis (mínimo 1s)
+        estimate = self.avg_service_seconds * (self.waiting + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(estimate))
+
+    def _observe_wait(self, seconds: float):
+        self.admitted += 1
+        self.wait_sum += seconds
+        self.wait_buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def acquire(self) -> float:
+        """Ocupa uma vaga, esperando na fila se preciso. Retorna o tempo de espera."""
+        started = time.perf_counter()
+        with self._cond:
+            # Sem furar a fila: só entra direto se ninguém estiver esperando
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self._observe_wait(0.0)
+                return 0.0
+
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise PoolSaturated(self.name, 429, self._retry_after(),
+                                    'Muitas requisições em andamento; tente novamente em instantes')
+
+            self.waiting += 1
+            try:
+                deadline = started + self.queue_timeout
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        # Uma vaga liberada pode ter acordado justamente esta thread
+                        self._cond.notify()
+                        raise PoolSaturated(self.name, 503, self._retry_after(),
+                                            'Servidor ocupado; tente novamente em instantes')
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+            waited = time.perf_counter() - started
+            self._observe_wait(waited)
+            return waited
+
+    def release(self, service_seconds: float):
+        with self._cond:
+            self.active -= 1
+            self.avg_service_seconds = (service_seconds if self.avg_service_seconds == 0
+                                        else 0.8 * self.avg_service_seconds + 0.2 * service_seconds)
+            self._cond.notify()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            cumulative = []
+            total = 0
+            for bound, count in zip(WAIT_BUCKETS + (float('inf'),), self.wait_buckets):
+                total += count
+                cumulative.append((bound, total))
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'avg_service_seconds': self.avg_service_seconds,
+                'queue_wait_seconds': {
+                    'buckets': [['+Inf' if b == float('inf') else b, c] for b, c in cumulative],
+                    'sum': self.wait_sum,
+                    'count': self.admitted
+                }
+            }
+
+
+class ConcurrencyLimiter:
+    """
+    Pools de concorrência por tipo de rota (OCR, renderização, cálculo).
+
+    Além do limite de cada pool, `max_inflight` limita o total de requisições
+    caras (executando ou na fila) no worker: com gthread, cada uma ocupa uma
+    thread, e pelo menos uma precisa sobrar para /health e rotas baratas.
+
+    Os pools são ajustados (fit_pools) para que a soma de vagas e filas caiba em
+    `max_inflight`: quem recusa é sempre o pool (429 com fila cheia, 503 com espera
+    esgotada). O limite do worker só age se houver mais pools que requisições
+    permitidas.
+    """
+
+    def __init__(self):
+        self.pools: Dict[str, ConcurrencyPool] = {}
+        self.max_inflight: Optional[int] = None
+        self.enabled = True
+        self.inflight = 0
+        self.rejected_inflight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for name, (max_concurrent, max_queue, queue_timeout) in DEFAULT_POOLS.items():
+            self.pools[name] = ConcurrencyPool(name, max_concurrent, max_queue, queue_timeout)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CONCURRENCY_LIMITS_ENABLED', True)
+        self.max_inflight = app.config.get('CONCURRENCY_MAX_INFLIGHT')
+        pools = {name: (pool.max_concurrent, pool.max_queue, pool.queue_timeout) for name, pool in self.pools.items()}
+        pools.update(app.config.get('CONCURRENCY_POOLS', {}))
+        if self.max_inflight is not None:
+            fitted = fit_pools(pools, self.max_inflight)
+            if fitted != pools:
+                logger.warning('Pools de concorrência reduzidos para caber no limite do worker',
+                               extra={'max_inflight': self.max_inflight,
+                                      'pools': {name: f'{c}:{q}' for name, (c, q, _t) in fitted.items()}})
+            pools = fitted
+        for name, (max_concurrent, max_queue, queue_timeout) in pools.items():
+            self.pools[name] = ConcurrencyPool(name, max_concurrent, max_queue, queue_timeout)
+        app.extensions['concurrency_limiter'] = self
+
+    def _enter(self, pool: ConcurrencyPool):
+        with self._lock:
+            if self.max_inflight is not None and self.inflight >= self.max_inflight:
+                self.rejected_inflight[pool.name] = self.rejected_inflight.get(pool.name, 0) + 1
+                raise PoolSaturated(pool.name, 503, pool._retry_after(),
+                                    'Servidor ocupado; tente novamente em instantes')
+            self.inflight += 1
+        try:
+            pool.acquire()
+        except PoolSaturated:
+            self._leave()
+            raise
+
+    def _leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def limit(self, pool_name: str):
+        """
+        Decorator de rota: executa a view dentro do pool `pool_name`.
+
+        Respostas em streaming só liberam a vaga quando terminam de ser enviadas.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                pool = self.pools.get(pool_name)
+                if not self.enabled or pool is None:
+                    return view(*args, **kwargs)
+
+                try:
+                    self._enter(pool)
+                except PoolSaturated as e:
+                    response = jsonify({'error': e.message, 'pool': e.pool})
+                    response.status_code = e.status
+                    response.headers['Retry-After'] = str(e.retry_after)
+                    return response
+
+                started = time.perf_counter()
+
+                def release():
+                    pool.release(time.perf_counter() - started)
+                    self._leave()
+
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except BaseException:
+                    release()
+                    raise
+
+                if response.is_streamed:
+                    response.call_on_close(release)
+                else:
+                    release()
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'max_inflight': self.max_inflight,
+            'inflight': self.inflight,
+            'rejected_inflight': dict(self.rejected_inflight),
+            'pools': {name: pool.stats() for name, pool in self.pools.items()}
+        }
+
+    def collect_metrics(self) -> List[str]:
+        """Estado dos pools para o /metrics (registrado com metrics.register_collector)."""
+        pools = [(name, pool.stats(), pool.wait_buckets[:]) for name, pool in self.pools.items()]
+        lines = format_header('pieng_concurrency_active', 'gauge', 'Requisições executando por pool')
+        lines += [format_sample('pieng_concurrency_active', {'pool': n}, s['active']) for n, s, _ in pools]
+        lines += format_header('pieng_concurrency_waiting', 'gauge', 'Requisições na fila por pool')
+        lines += [format_sample('pieng_concurrency_waiting', {'pool': n}, s['waiting']) for n, s, _ in pools]
+        lines += format_header('pieng_concurrency_rejected_total', 'counter', 'Requisições recusadas pelo limitador')
+        for name, stats, _ in pools:
+            lines.append(format_sample('pieng_concurrency_rejected_total', {'pool': name, 'reason': 'queue_full'},
+                                       stats['rejected_queue_full']))
+            lines.append(format_sample('pieng_concurrency_rejected_total', {'pool': name, 'reason': 'timeout'},
+                                       stats['rejected_timeout']))
+            lines.append(format_sample('pieng_concurrency_rejected_total', {'pool': name, 'reason': 'inflight'},
+                                       self.rejected_inflight.get(name, 0)))
+        lines += format_header('pieng_concurrency_queue_wait_seconds', 'histogram', 'Espera na fila do pool')
+        for name, stats, counts in pools:
+            lines += histogram_samples('pieng_concurrency_queue_wait_seconds', {'pool': name}, WAIT_BUCKETS,
+                                       counts, stats['queue_wait_seconds']['sum'])
+        return lines
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+concurrency_limiter = ConcurrencyLimiter()
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Response, request
+
+
+class FrozenDict(dict):
+    """
+    Dicionário somente leitura. Continua sendo um dict (serializa normalmente
+    em JSON), mas qualquer tentativa de alteração gera TypeError.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Configuração somente leitura; use thaw() para obter uma cópia editável")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Converte recursivamente dicts em FrozenDict e listas em tuplas."""
+    if isinstance(value, dict):
+        frozen = FrozenDict()
+        for key, item in value.items():
+            dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Cópia editável (dicts e listas comuns) de uma visão congelada."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def serialize(payload: Any) -> bytes:
+    """Serializa como o jsonify do Flask (chaves ordenadas, ASCII, compacto)."""
+    return json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class ConfigSnapshot:
+    """Conteúdo imutável de todos os data/*.json em um dado momento."""
+
+    def __init__(self, files: Dict[str, Any], signature: Tuple, errors: Dict[str, str]):
+        self.files = files
+        self.signature = signature
+        self.errors = errors
+        self.version = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.files.get(name, default)
+
+    def response_body(self, key: str, build) -> Tuple[bytes, str]:
+        """
+        Corpo pré-serializado (e ETag) de uma resposta derivada deste snapshot.
+        `build(snapshot)` só é chamado na primeira vez para cada chave.
+        """
+        cached = self._responses.get(key)
+        if cached is None:
+            with self._lock:
+                cached = self._responses.get(key)
+                if cached is None:
+                    body = serialize(build(self))
+                    etag = hashlib.sha1(body).hexdigest()
+                    cached = (body, etag)
+                    self._responses[key] = cached
+        return cached
+
+
+class ConfigService:
+    """
+    Serviço único de configuração/catálogo, compartilhado pelas rotas.
+
+    Carrega todos os arquivos data/*.json uma vez, como visões congeladas.
+    No máximo a cada `revalidate_interval` segundos faz um stat dos arquivos;
+    se algum mudou, recarrega tudo e troca o snapshot de forma atômica
+    (requisições em andamento continuam usando o snapshot anterior).
+    """
+
+    def __init__(self, data_path: str = 'data', revalidate_interval: float = 5.0):
+        self.data_path = data_path
+        self.revalidate_interval = revalidate_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+
+    def init_app(self, app):
+        """Configura a partir do app Flask e carrega os arquivos imediatamente."""
+        self.data_path = app.config.get('DATA_FOLDER', self.data_path)
+        self.revalidate_interval = app.config.get('CONFIG_REVALIDATE_SECONDS', self.revalidate_interval)
+        self._snapshot = None
+        self.snapshot()
+        app.extensions['config_service'] = self
+
+    def _scan(self) -> Tuple:
+        """Assinatura barata (nome, mtime, tamanho) dos arquivos JSON."""
+        entries = []
+        try:
+            names = sorted(os.listdir(self.data_path))
+        except OSError:
+            return ()
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.data_path, name))
+            except OSError:
+                continue
+            entries.append((name, st.st_mtime_ns, st.st_size))
+        return tuple(entries)
+
+    def _load(self, signature: Tuple) -> ConfigSnapshot:
+        files = {}
+        errors = {}
+        for name, _mtime, _size in signature:
+            key = name[:-len('.json')]
+            try:
+                with open(os.path.join(self.data_path, name), 'r', encoding='utf-8') as f:
+                    files[key] = freeze(json.load(f))
+            except (OSError, ValueError) as e:
+                # Mantém a versão anterior do arquivo, se houver, em vez de derrubar o serviço
+                errors[key] = str(e)
+                if self._snapshot is not None and key in self._snapshot.files:
+                    files[key] = self._snapshot.files[key]
+        self.reloads += 1
+        return ConfigSnapshot(files, signature, errors)
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Snapshot atual, revalidado no máximo a cada `revalidate_interval` segundos."""
+        now = time.monotonic()
+        current = self._snapshot
+        if current is not None and now < self._next_check:
+            return current
+
+        with self._reload_lock:
+            current = self._snapshot
+            if current is not None and now < self._next_check:
+                return current
+            signature = self._scan()
+            if current is None or signature != current.signature:
+                current = self._load(signature)
+                self._snapshot = current
+            self._next_check = now + self.revalidate_interval
+            return current
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Visão congelada de data/<name>.json (ex.: get('components_db'))."""
+        return self.snapshot().get(name, default)
+
+    @property
+    def version(self) -> str:
+        return self.snapshot().version
+
+    def json_response(self, key: str, build) -> Response:
+        """
+        Resposta JSON pré-serializada com ETag; devolve 304 se o cliente já
+        possui a versão atual (If-None-Match).
+        """
+        body, etag = self.snapshot().response_body(key, build)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+config_service = ConfigService()
@@ -1,14 +1,37 @@
-import pdfplumber
+import logging
 import re
 import random
 from typing import Dict, List, Optional  # <--- ADICIONE Optional AQUI
 import os
-from PIL import Image
-import pytesseract
 import warnings
 
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Métricas do pipeline de extração (expostas em /metrics)
+STAGE_SECONDS = metrics.histogram(
+    'extraction_stage_duration_seconds', 'Duração das etapas da extração (pdfplumber, OCR, parsing)', ('stage',))
+EXTRACTION_RESULTS = metrics.counter(
+    'extraction_results_total', 'Resultados da extração por fornecedor', ('source', 'supplier', 'outcome'))
+
+# pdfplumber, PIL e pytesseract são importados sob demanda (ver _extract_from_pdf /
+# _extract_from_image): workers que só calculam não pagam o custo de importação.
+
 warnings.filterwarnings('ignore')
 
+# Maior lado (px) da imagem enviada ao Tesseract: ~300 DPI numa página A4 já sobra para o OCR,
+# e fotos de celular de 12+ MP em resolução cheia multiplicam a RSS do worker
+OCR_MAX_SIDE = int(os.environ.get('OCR_MAX_SIDE', 3500))
+
+
+def preload_heavy_modules():
+    """Importa antecipadamente os módulos de PDF/OCR (ex.: no master do gunicorn)."""
+    import pdfplumber  # noqa: F401
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+
 
 class DataExtractor:
     def __init__(self):
@@ -54,8 +77,9 @@ class DataExtractor:
             }
         }
 
-    def detect_supplier_from_text(self, text: str) -> str:
-        """Detecta o fornecedor baseado no texto."""
+    @staticmethod
+    def detect_supplier_from_text(text: str) -> str:
+        """Detecta o fornecedor baseado no texto (do PDF ou do nome do kit)."""
         text_lower = text.lower()
         if 'fortlev' in text_lower or 'dah solar' in text_lower:
             return 'fortlev'
@@ -68,36 +92,57 @@ class DataExtractor:
 
     def _extract_from_pdf(self, filepath: str) -> List[Dict]:
         """Extrai dados de um PDF."""
-        print(f"📤 Extraindo dados do PDF: {os.path.basename(filepath)}")
+        filename = os.path.basename(filepath)
+        logger.info("Extraindo dados do PDF", extra={'file': filename})
         extracted_systems = []
+        supplier = 'desconhecido'
+        tracer.annotate(source='pdf')
         try:
-            with pdfplumber.open(filepath) as pdf:
-                text_full = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_full += page_text + "\n"
+            with tracer.span('import_modules'):
+                import pdfplumber
+
+            with STAGE_SECONDS.time(stage='pdf_text'):
+                with tracer.span('pdf_open', file=filename) as span:
+                    pdf = pdfplumber.open(filepath)
+                with pdf:
+                    span.set(pages=len(pdf.pages))
+                    text_full = ""
+                    for number, page in enumerate(pdf.pages, start=1):
+                        with tracer.span('pdf_page', page=number) as span:
+                            try:
+                                page_text = page.extract_text()
+                            finally:
+                                # Libera os objetos de layout (chars, rects...) em cache na página
+                                page.close()
+                            span.set(chars=len(page_text or ''))
+                        if page_text:
+                            text_full += page_text + "\n"
 
             if not text_full.strip():
-                print("❌ Não foi possível extrair texto do PDF")
-                return [self._generate_generic_system(os.path.basename(filepath))]
+                logger.warning("Não foi possível extrair texto do PDF", extra={'file': filename})
+                EXTRACTION_RESULTS.inc(source='pdf', supplier=supplier, outcome='empty')
+                return [self._generate_generic_system(filename)]
 
             supplier = self.detect_supplier_from_text(text_full)
-            print(f"🏢 Fornecedor detectado (PDF): {supplier}")
+            tracer.annotate(supplier=supplier)
+            logger.info("Fornecedor detectado", extra={'file': filename, 'source': 'pdf', 'supplier': supplier})
 
             # Reusa a lógica de extração baseada em padrões
             data = self._parse_text_with_patterns(
                 text_full, self.pdf_patterns.get(supplier, {}), supplier)
             if data:
                 extracted_systems.append(data)
+                EXTRACTION_RESULTS.inc(source='pdf', supplier=supplier, outcome='success')
             else:  # Fallback para genérico se a extração específica falhar
                 extracted_systems.append(
-                    self._generate_generic_system(os.path.basename(filepath)))
+                    self._generate_generic_system(filename))
+                EXTRACTION_RESULTS.inc(source='pdf', supplier=supplier, outcome='fallback')
 
-        except Exception as e:
-            print(f"❌ Erro na extração de PDF: {str(e)}")
+        except Exception:
+            logger.exception("Erro na extração de PDF", extra={'file': filename})
+            EXTRACTION_RESULTS.inc(source='pdf', supplier=supplier, outcome='error')
             extracted_systems.append(
-                self._generate_generic_system(os.path.basename(filepath)))
+                self._generate_generic_system(filename))
 
         return extracted_systems
 
@@ -106,27 +151,22 @@ class DataExtractor:
            Esta é a parte que precisa de desenvolvimento robusto para MÚLTIPLOS CARDS.
            Por enquanto, fará um OCR simples na imagem toda ou simulará.
         """
-        print(
-            f"📤 Extraindo dados da imagem (OCR): {os.path.basename(filepath)}")
+        filename = os.path.basename(filepath)
+        logger.info("Extraindo dados da imagem (OCR)", extra={'file': filename})
         extracted_systems = []
+        tracer.annotate(source='image')
+        with tracer.span('import_modules'):
+            import pytesseract
+            from PIL import Image  # noqa: F401 (usado em _ocr_image)
         try:
-            image = Image.open(filepath)
-
-            # --- Pré-processamento de imagem (Básico) ---
-            # Pode ser necessário mais pré-processamento aqui para melhorar o OCR
-            # ex: image = image.convert('L') # Convert to grayscale
-            #     image = image.point(lambda x: 0 if x < 128 else 255) # Binarize
-
             # --- Lógica de Segmentação (PROVISÓRIO / SIMULADO) ---
             # Esta é a parte mais complexa. Para 'fortlev02.jpg' que é um grid,
             # precisaríamos de visão computacional para detectar cada card.
             # Por agora, faremos OCR na imagem inteira e tentaremos extrair UM sistema
             # ou simularemos múltiplos sistemas para demonstração da estrutura.
-
-            text_full = pytesseract.image_to_string(
-                image, lang='por')  # OCR em português
-            # Print dos primeiros 500 chars
-            print(f"Texto extraído da imagem:\n{text_full[:500]}...")
+            text_full = self._ocr_image(filepath)
+            # Primeiros 500 caracteres, só em nível DEBUG
+            logger.debug("Texto extraído da imagem", extra={'file': filename, 'text': text_full[:500]})
 
             # Simulação de extração de múltiplos sistemas (se o layout permitir um padrão)
             # Para o layout de cards da Fortlev (fortlev02.jpg), podemos buscar por "Gerador FV"
@@ -151,52 +191,99 @@ class DataExtractor:
                     parsed_card_texts.append(card_texts[i])
 
             if not parsed_card_texts:  # Se não encontrou múltiplos cards, tenta extrair da imagem toda como um único sistema
-                print(
-                    "Não foram detectados múltiplos cards, tentando extração única da imagem.")
+                logger.info("Nenhum card detectado, extração única da imagem", extra={'file': filename})
                 data = self._parse_text_with_patterns(
                     text_full, self.image_patterns['generico'], 'generico_imagem')
                 if data:
                     extracted_systems.append(data)
+                    EXTRACTION_RESULTS.inc(source='image', supplier='generico', outcome='success')
                 else:
                     extracted_systems.append(
-                        self._generate_generic_system(os.path.basename(filepath)))
+                        self._generate_generic_system(filename))
+                    EXTRACTION_RESULTS.inc(source='image', supplier='generico', outcome='fallback')
             else:
-                print(
-                    f"Detectados {len(parsed_card_texts)} potenciais cards na imagem.")
+                logger.info("Cards detectados na imagem",
+                            extra={'file': filename, 'cards': len(parsed_card_texts)})
                 for i, card_text in enumerate(parsed_card_texts):
-                    print(f"Processando Card {i+1}...")
+                    logger.debug("Processando card", extra={'file': filename, 'card': i + 1})
                     data = self._parse_text_with_patterns(
                         card_text, self.image_patterns['generico'], f'generico_imagem_card_{i+1}')
                     if data:
                         # Adicionar um nome mais descritivo se possível
                         if "Fortlev" in card_text:
                             data['name'] = f"Fortlev Imagem Sistema {i+1}"
+                            supplier = 'fortlev'
                         elif "Soollar" in card_text:
                             data['name'] = f"Soollar Imagem Sistema {i+1}"
+                            supplier = 'soollar'
                         # ... outros fornecedores de imagem
                         else:
                             data['name'] = f"Imagem Sistema {i+1}"
+                            supplier = 'generico'
 
                         extracted_systems.append(data)
+                        EXTRACTION_RESULTS.inc(source='image', supplier=supplier, outcome='success')
                     else:
-                        print(
-                            f"❌ Falha na extração do Card {i+1}, gerando sistema genérico.")
+                        logger.warning("Falha na extração do card, gerando sistema genérico",
+                                       extra={'file': filename, 'card': i + 1})
                         extracted_systems.append(self._generate_generic_system(
-                            f"{os.path.basename(filepath)}_card_{i+1}"))
+                            f"{filename}_card_{i+1}"))
+                        EXTRACTION_RESULTS.inc(source='image', supplier='generico', outcome='fallback')
 
         except pytesseract.TesseractNotFoundError:
-            print("❌ Tesseract OCR não encontrado. Por favor, instale-o no seu sistema.")
+            logger.error("Tesseract OCR não encontrado. Por favor, instale-o no seu sistema.")
+            EXTRACTION_RESULTS.inc(source='image', supplier='desconhecido', outcome='error')
             extracted_systems.append(self._generate_generic_system(
-                os.path.basename(filepath), error="Tesseract não instalado"))
+                filename, error="Tesseract não instalado"))
         except Exception as e:
-            print(f"❌ Erro na extração de imagem: {str(e)}")
+            logger.exception("Erro na extração de imagem", extra={'file': filename})
+            EXTRACTION_RESULTS.inc(source='image', supplier='desconhecido', outcome='error')
             extracted_systems.append(self._generate_generic_system(
-                os.path.basename(filepath), error=str(e)))
+                filename, error=str(e)))
 
         return extracted_systems
 
+    def _ocr_image(self, filepath: str) -> str:
+        """
+        Decodifica a imagem (reduzida a OCR_MAX_SIDE) e roda o Tesseract.
+        A imagem é fechada ao sair, mesmo com erro: os buffers não esperam o GC.
+        """
+        import pytesseract
+        from PIL import Image
+
+        with Image.open(filepath) as image:
+            with STAGE_SECONDS.time(stage='image_open'), \
+                    tracer.span('image_decode', file=os.path.basename(filepath)) as span:
+                span.set(width=image.width, height=image.height, mode=image.mode)
+                scale = OCR_MAX_SIDE / max(image.size)
+                if scale < 1:
+                    # JPEG: o decoder já entrega a imagem reduzida (sem alocar a resolução cheia)
+                    image.draft(image.mode, (int(image.width * scale), int(image.height * scale)))
+                # Image.open só lê o cabeçalho: decodifica aqui para medir a etapa separada do OCR
+                image.load()
+                if max(image.size) > OCR_MAX_SIDE:
+                    image.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE))
+                span.set(decoded_size=list(image.size))
+
+            # --- Pré-processamento de imagem (Básico) ---
+            # Pode ser necessário mais pré-processamento aqui para melhorar o OCR
+            # ex: image = image.convert('L') # Convert to grayscale
+            #     image = image.point(lambda x: 0 if x < 128 else 255) # Binarize
+
+            with STAGE_SECONDS.time(stage='ocr'), tracer.span('ocr', lang='por') as span:
+                text_full = pytesseract.image_to_string(
+                    image, lang='por')  # OCR em português
+                span.set(chars=len(text_full))
+        return text_full
+
     def _parse_text_with_patterns(self, text: str, patterns: Dict, default_name: str) -> Optional[Dict]:
         """Tenta extrair dados usando um conjunto de padrões."""
+        with STAGE_SECONDS.time(stage='parse'), tracer.span('parse', system=default_name) as span:
+            data = self._match_patterns(text, patterns, default_name)
+            span.set(matched=data is not None)
+        return data
+
+    def _match_patterns(self, text: str, patterns: Dict, default_name: str) -> Optional[Dict]:
         data = {"name": default_name, "freight_included": True,
                 "freight_value": 0}  # Default
 
@@ -256,14 +343,17 @@ class DataExtractor:
 
         # Validação mínima
         if 'power' not in data or 'vcusto_raw' not in data:
-            print(
-                f"❌ Falha na extração de dados essenciais para {default_name}")
+            logger.warning("Falha na extração de dados essenciais", extra={'system': default_name})
             return None  # Retorna None se não conseguir extrair o mínimo
 
         return data
 
     def _generate_generic_system(self, filename: str, error: str = "") -> Dict:
         """Gera um sistema genérico em caso de falha na extração."""
+        with tracer.span('fallback', file=filename, error=error or None):
+            return self._simulated_system(filename, error)
+
+    def _simulated_system(self, filename: str, error: str) -> Dict:
         base_power = random.uniform(50.0, 120.0)
         base_vcusto = base_power * random.uniform(900, 1200)
         # Supondo painéis de 600Wp para estimativa
@@ -294,6 +384,5 @@ class DataExtractor:
         elif file_extension in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff']:
             return self._extract_from_image(filepath)
         else:
-            print(
-                f"🚫 Tipo de arquivo não suportado para extração: {file_extension}")
+            logger.warning("Tipo de arquivo não suportado para extração", extra={'extension': file_extension})
             return [self._generate_generic_system(os.path.basename(filepath), error="Tipo de arquivo não suportado")]
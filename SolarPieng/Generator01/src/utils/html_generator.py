@@ -2,120 +2,16 @@ import json
 import os
 from datetime import datetime
 from typing import Dict, List
-from jinja2 import Template
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemLoader
 
+from src.utils.compression import write_precompressed
 
-class ProposalHTMLGenerator:
-    """
-    Gerador de propostas HTML responsivas para energia solar.
-    Suporta dois formatos: Padrão (enxuto) e Analítico (detalhado).
-    """
-    
-    def __init__(self, templates_path: str = None, branding_path: str = None):
-        self.templates_path = templates_path or "src/templates"
-        
-        # Carregar configurações de branding
-        if branding_path and os.path.exists(branding_path):
-            with open(branding_path, 'r', encoding='utf-8') as f:
-                self.branding = json.load(f)
-        else:
-            self.branding = self._default_branding()
-    
-    def _default_branding(self) -> Dict:
-        """Configurações padrão de branding da PiEng."""
-        return {
-            "company_name": "PiEng Solar",
-            "company_full_name": "PiEng Soluções Energéticas",
-            "logo_symbol": "π",
-            "primary_color": "#3366CC",
-            "secondary_color": "#FF6B35",
-            "gradient": "linear-gradient(135deg, #3366CC 0%, #FF6B35 100%)",
-            "warranty_equipment": "12 anos",
-            "warranty_installation": "12 meses",
-            "contact_phone": "(62) 99999-9999",
-            "contact_email": "contato@pieng.com.br",
-            "website": "www.pieng.com.br"
-        }
-    
-    def _generate_ai_analysis(self, proposals: List[Dict], client_name: str) -> str:
-        """
-        Gera análise persuasiva com IA para a proposta analítica.
-        """
-        best_proposal = proposals[0] if proposals else None
-        if not best_proposal:
-            return ""
-        
-        power = best_proposal['kit_info']['power']
-        monthly_savings = best_proposal['calculations']['monthly_savings']
-        payback = best_proposal['calculations']['final_payback_months']
-        final_price = best_proposal['pricing']['final_price']
-        
-        analysis = f"""
-        <div class="ai-analysis">
-            <h3>🤖 Análise Inteligente do Investimento</h3>
-            
-            <div class="analysis-section">
-                <h4>💰 Viabilidade Financeira Excepcional</h4>
-                <p>Caro(a) {client_name}, nossa análise técnica revela que este investimento em energia solar 
-                apresenta características financeiras extraordinárias. Com um payback de apenas 
-                <strong>{payback:.1f} meses</strong>, você recuperará seu investimento em menos de 
-                <strong>{payback/12:.1f} anos</strong>, muito abaixo da média nacional de 4-6 anos.</p>
-            </div>
-            
-            <div class="analysis-section">
-                <h4>🌱 Impacto Ambiental e Sustentabilidade</h4>
-                <p>Além dos benefícios financeiros, seu sistema de {power:.2f} kWp evitará a emissão de 
-                aproximadamente <strong>{power * 1.2:.1f} toneladas de CO₂</strong> por ano, equivalente ao 
-                plantio de <strong>{int(power * 15)} árvores</strong>. Você estará contribuindo ativamente 
-                para um futuro mais sustentável.</p>
-            </div>
-            
-            <div class="analysis-section">
-                <h4>📈 Valorização Patrimonial</h4>
-                <p>Estudos do mercado imobiliário indicam que imóveis com energia solar valorizam entre 
-                <strong>3% a 6%</strong>. Para um imóvel de R$ 500.000, isso representa uma valorização 
-                adicional de <strong>R$ 15.000 a R$ 30.000</strong>, além da economia mensal de energia.</p>
-            </div>
-            
-            <div class="analysis-section">
-                <h4>🛡️ Proteção Contra Inflação Energética</h4>
-                <p>Com a tarifa de energia aumentando em média <strong>4,8% ao ano</strong>, sua economia 
-                mensal de R$ {monthly_savings:.2f} crescerá proporcionalmente. Em 10 anos, considerando 
-                apenas a inflação energética, você economizará mais de 
-                <strong>R$ {monthly_savings * 12 * 10 * 1.6:.0f}</strong>.</p>
-            </div>
-            
-            <div class="analysis-section">
-                <h4>⚡ Tecnologia de Ponta e Confiabilidade</h4>
-                <p>Os equipamentos selecionados utilizam tecnologia fotovoltaica de última geração, com 
-                <strong>garantia de 12 anos do fabricante</strong> e <strong>12 meses de garantia de 
-                instalação pela PiEng Solar</strong>. Nossa equipe técnica especializada garante máxima 
-                eficiência e durabilidade do seu sistema.</p>
-            </div>
-            
-            <div class="conclusion">
-                <h4>🎯 Conclusão da Análise</h4>
-                <p><strong>Este é o momento ideal para investir em energia solar.</strong> Com tecnologia 
-                madura, preços competitivos e incentivos governamentais vigentes, você tem a oportunidade 
-                única de transformar um gasto mensal em um investimento rentável e sustentável.</p>
-                
-                <div class="urgency-note">
-                    <p>⏰ <strong>Atenção:</strong> Os preços dos equipamentos fotovoltaicos têm apresentado 
-                    volatilidade devido ao cenário internacional. Garantimos este orçamento por 
-                    <strong>15 dias</strong>.</p>
-                </div>
-            </div>
-        </div>
-        """
-        
-        return analysis
-    
-    def generate_standard_proposal(self, proposals: List[Dict], client_data: Dict, 
-                                 output_path: str = None) -> str:
-        """
-        Gera proposta padrão/enxuta focada em impacto visual e benefícios principais.
-        """
-        template_content = """
+
+STANDARD_TEMPLATE_NAME = 'standard.html'
+
+# Template da proposta padrão (a analítica é construída sobre ele).
+# Pode ser sobrescrito por tenant em data/tenants/<id>/templates/standard.html.
+STANDARD_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="pt-BR">
 <head>
@@ -529,8 +425,186 @@ class ProposalHTMLGenerator:
 </body>
 </html>
         """
+
+DEFAULT_TEMPLATES = {
+    STANDARD_TEMPLATE_NAME: STANDARD_TEMPLATE
+}
+
+
+def build_environment(overrides_path: str = None) -> Environment:
+    """
+    Cria o ambiente Jinja com os templates embutidos.
+    Se `overrides_path` for informado, templates com o mesmo nome nessa pasta
+    têm prioridade. Os templates são compilados uma vez e ficam em cache no ambiente
+    (arquivos de override são recarregados quando o mtime muda).
+    """
+    loaders = []
+    if overrides_path and os.path.isdir(overrides_path):
+        loaders.append(FileSystemLoader(overrides_path))
+    loaders.append(DictLoader(DEFAULT_TEMPLATES))
+    return Environment(loader=ChoiceLoader(loaders), cache_size=16, auto_reload=True)
+
+
+# Ambiente padrão (sem tenant), compilado uma vez por processo
+default_environment = build_environment()
+
+
+class ProposalHTMLGenerator:
+    """
+    Gerador de propostas HTML responsivas para energia solar.
+    Suporta dois formatos: Padrão (enxuto) e Analítico (detalhado).
+    """
+    
+    def __init__(self, templates_path: str = None, branding_path: str = None,
+                 branding: Dict = None, environment: Environment = None):
+        self.templates_path = templates_path or "src/templates"
+        
+        # Ambiente Jinja já compilado (por tenant) ou o padrão do processo
+        if environment is not None:
+            self.environment = environment
+        elif templates_path:
+            self.environment = build_environment(templates_path)
+        else:
+            self.environment = default_environment
+        
+        # Carregar configurações de branding
+        if branding is not None:
+            self.branding = branding
+        elif branding_path and os.path.exists(branding_path):
+            with open(branding_path, 'r', encoding='utf-8') as f:
+                self.branding = json.load(f)
+        else:
+            self.branding = self._default_branding()
+    
+    @staticmethod
+    def _default_branding() -> Dict:
+        """Configurações padrão de branding da PiEng."""
+        return {
+            "company_name": "PiEng Solar",
+            "company_full_name": "PiEng Soluções Energéticas",
+            "logo_symbol": "π",
+            "primary_color": "#3366CC",
+            "secondary_color": "#FF6B35",
+            "gradient": "linear-gradient(135deg, #3366CC 0%, #FF6B35 100%)",
+            "warranty_equipment": "12 anos",
+            "warranty_installation": "12 meses",
+            "contact_phone": "(62) 99999-9999",
+            "contact_email": "contato@pieng.com.br",
+            "website": "www.pieng.com.br"
+        }
+    
+    def _write_output(self, output_path: str, html_content: str):
+        """
+        Salva a proposta e suas versões pré-comprimidas (.gz/.br).
+        A compressão é feita uma única vez aqui, não a cada download.
+        """
+        data = html_content.encode('utf-8')
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        write_precompressed(output_path, data)
+    
+    def _generate_ai_analysis(self, proposals: List[Dict], client_name: str) -> str:
+        """
+        Gera análise persuasiva com IA para a proposta analítica.
+        """
+        best_proposal = proposals[0] if proposals else None
+        if not best_proposal:
+            return ""
         
-        template = Template(template_content)
+        power = best_proposal['kit_info']['power']
+        monthly_savings = best_proposal['calculations']['monthly_savings']
+        payback = best_proposal['calculations']['final_payback_months']
+        final_price = best_proposal['pricing']['final_price']
+        company_name = self.branding.get('company_name', 'PiEng Solar')
+        
+        analysis = f"""
+        <div class="ai-analysis">
+            <h3>🤖 Análise Inteligente do Investimento</h3>
+            
+            <div class="analysis-section">
+                <h4>💰 Viabilidade Financeira Excepcional</h4>
+                <p>Caro(a) {client_name}, nossa análise técnica revela que este investimento em energia solar 
+                apresenta características financeiras extraordinárias. Com um payback de apenas 
+                <strong>{payback:.1f} meses</strong>, você recuperará seu investimento em menos de 
+                <strong>{payback/12:.1f} anos</strong>, muito abaixo da média nacional de 4-6 anos.</p>
+            </div>
+            
+            <div class="analysis-section">
+                <h4>🌱 Impacto Ambiental e Sustentabilidade</h4>
+                <p>Além dos benefícios financeiros, seu sistema de {power:.2f} kWp evitará a emissão de 
+                aproximadamente <strong>{power * 1.2:.1f} toneladas de CO₂</strong> por ano, equivalente ao 
+                plantio de <strong>{int(power * 15)} árvores</strong>. Você estará contribuindo ativamente 
+                para um futuro mais sustentável.</p>
+            </div>
+            
+            <div class="analysis-section">
+                <h4>📈 Valorização Patrimonial</h4>
+                <p>Estudos do mercado imobiliário indicam que imóveis com energia solar valorizam entre 
+                <strong>3% a 6%</strong>. Para um imóvel de R$ 500.000, isso representa uma valorização 
+                adicional de <strong>R$ 15.000 a R$ 30.000</strong>, além da economia mensal de energia.</p>
+            </div>
+            
+            <div class="analysis-section">
+                <h4>🛡️ Proteção Contra Inflação Energética</h4>
+                <p>Com a tarifa de energia aumentando em média <strong>4,8% ao ano</strong>, sua economia 
+                mensal de R$ {monthly_savings:.2f} crescerá proporcionalmente. Em 10 anos, considerando 
+                apenas a inflação energética, você economizará mais de 
+                <strong>R$ {monthly_savings * 12 * 10 * 1.6:.0f}</strong>.</p>
+            </div>
+            
+            <div class="analysis-section">
+                <h4>⚡ Tecnologia de Ponta e Confiabilidade</h4>
+                <p>Os equipamentos selecionados utilizam tecnologia fotovoltaica de última geração, com 
+                <strong>garantia de 12 anos do fabricante</strong> e <strong>12 meses de garantia de 
+                instalação pela {company_name}</strong>. Nossa equipe técnica especializada garante máxima 
+                eficiência e durabilidade do seu sistema.</p>
+            </div>
+            
+            <div class="conclusion">
+                <h4>🎯 Conclusão da Análise</h4>
+                <p><strong>Este é o momento ideal para investir em energia solar.</strong> Com tecnologia 
+                madura, preços competitivos e incentivos governamentais vigentes, você tem a oportunidade 
+                única de transformar um gasto mensal em um investimento rentável e sustentável.</p>
+                
+                <div class="urgency-note">
+                    <p>⏰ <strong>Atenção:</strong> Os preços dos equipamentos fotovoltaicos têm apresentado 
+                    volatilidade devido ao cenário internacional. Garantimos este orçamento por 
+                    <strong>15 dias</strong>.</p>
+                </div>
+            </div>
+        </div>
+        """
+        
+        return analysis
+    
+    def _generate_charts_section(self, proposals: List[Dict], client_data: Dict) -> str:
+        """
+        Gera a seção de gráficos SVG (inline, sem JavaScript) da proposta analítica.
+        """
+        # Importado sob demanda: os gráficos só são carregados quando há proposta analítica
+        from src.utils.charts import proposal_charts
+        
+        colors = [self.branding.get('primary_color', '#3366CC'),
+                  self.branding.get('secondary_color', '#FF6B35')]
+        charts = proposal_charts(proposals, client_data, colors)
+        if not charts:
+            return ""
+        
+        items = ''.join(f'<div class="chart-item">{svg}</div>' for svg in charts)
+        return f"""
+        <div class="charts-section">
+            <h3>📊 Análise Gráfica do Investimento</h3>
+            <div class="charts-grid">{items}</div>
+        </div>
+        """
+    
+    def generate_standard_proposal(self, proposals: List[Dict], client_data: Dict, 
+                                 output_path: str = None) -> str:
+        """
+        Gera proposta padrão/enxuta focada em impacto visual e benefícios principais.
+        """
+        
+        template = self.environment.get_template(STANDARD_TEMPLATE_NAME)
         html_content = template.render(
             proposals=proposals,
             client_data=client_data,
@@ -539,8 +613,7 @@ class ProposalHTMLGenerator:
         )
         
         if output_path:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            self._write_output(output_path, html_content)
         
         return html_content
     
@@ -550,14 +623,15 @@ class ProposalHTMLGenerator:
         Gera proposta analítica com análise detalhada, gráficos e texto persuasivo da IA.
         """
         ai_analysis = self._generate_ai_analysis(proposals, client_data.get('name', 'Cliente'))
+        charts_section = self._generate_charts_section(proposals, client_data)
         
         # Para a versão analítica, vamos usar o template padrão + seções adicionais
         standard_html = self.generate_standard_proposal(proposals, client_data)
         
-        # Inserir análise da IA antes da seção de CTA
+        # Inserir gráficos e análise da IA antes da seção de CTA
         analytical_html = standard_html.replace(
             '<div class="cta-section">',
-            ai_analysis + '<div class="cta-section">'
+            charts_section + ai_analysis + '<div class="cta-section">'
         )
         
         # Adicionar estilos específicos para a análise
@@ -598,6 +672,46 @@ class ProposalHTMLGenerator:
             color: white !important;
             margin-bottom: 10px;
         }
+        .charts-section {
+            margin: 20px 0;
+        }
+        .charts-section h3 {
+            color: #3366CC;
+            margin-bottom: 15px;
+            font-size: 1.3em;
+        }
+        .charts-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
+            gap: 15px;
+        }
+        .chart-item {
+            background: white;
+            border-radius: 8px;
+            padding: 10px;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+        }
+        .chart {
+            width: 100%;
+            height: auto;
+        }
+        .chart-title {
+            font-size: 14px;
+            font-weight: bold;
+            fill: #333;
+        }
+        .chart-axis {
+            font-size: 10px;
+            fill: #666;
+        }
+        .chart-grid {
+            stroke: #e9ecef;
+            stroke-width: 1;
+        }
+        .chart-zero {
+            stroke: #999;
+            stroke-width: 1;
+        }
         .urgency-note {
             background: rgba(255, 255, 255, 0.2);
             padding: 10px;
@@ -608,11 +722,14 @@ class ProposalHTMLGenerator:
         </style>
         """
         
+        # Cores do tenant no lugar das cores padrão da PiEng
+        ai_styles = (ai_styles
+                     .replace('#3366CC', self.branding.get('primary_color', '#3366CC'))
+                     .replace('#FF6B35', self.branding.get('secondary_color', '#FF6B35')))
         analytical_html = analytical_html.replace('</head>', ai_styles + '</head>')
         
         if output_path:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(analytical_html)
+            self._write_output(output_path, analytical_html)
         
         return analytical_html
 
@@ -0,0 +1,62 @@
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from src.utils.tracing import TraceIdFilter
+
+# Atributos padrão de um LogRecord; o resto veio de `extra=` e vira campo estruturado
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formata os registros com os campos passados em `extra`:
+
+        logger.info('Fornecedor detectado', extra={'supplier': 'fortlev', 'file': 'a.pdf'})
+
+    - text: `2025-01-01T12:00:00 INFO src.utils.data_extractor Fornecedor detectado supplier='fortlev' file='a.pdf'`
+    - json: uma linha JSON por registro (para agregadores de log)
+    """
+
+    def __init__(self, json_output: bool = False):
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in vars(record).items() if k not in _RESERVED}
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds')
+
+        if self.json_output:
+            data = {'ts': timestamp, 'level': record.levelname, 'logger': record.name,
+                    'msg': record.getMessage(), **fields}
+            if record.exc_info:
+                data['exc'] = self.formatException(record.exc_info)
+            return json.dumps(data, default=str, ensure_ascii=False)
+
+        line = f'{timestamp} {record.levelname} {record.name} {record.getMessage()}'
+        if fields:
+            line += ' ' + ' '.join(f'{k}={v!r}' for k, v in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def init_logging(app):
+    """
+    Configura o logger `src` (módulos da aplicação) com LOG_LEVEL e LOG_FORMAT ('text' ou 'json').
+    Bibliotecas (werkzeug, gunicorn) mantêm a configuração delas. Registros emitidos
+    dentro de um trace (ver tracing.py) ganham o campo `trace_id`.
+    """
+    logger = logging.getLogger('src')
+    logger.setLevel(app.config.get('LOG_LEVEL', 'INFO').upper())
+
+    handler = next((h for h in logger.handlers if getattr(h, '_pieng_handler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler._pieng_handler = True
+        handler.addFilter(TraceIdFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    handler.setFormatter(StructuredFormatter(json_output=app.config.get('LOG_FORMAT') == 'json'))
+    return logger
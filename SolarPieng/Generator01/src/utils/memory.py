@@ -0,0 +1,236 @@
+import logging
+import os
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import g, jsonify, request
+
+from src.utils.metrics import format_header, format_sample, metrics
+from src.utils.profiling import ADMIN_PREFIX, require_admin_token
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Buckets (bytes) do crescimento de RSS por requisição
+RSS_DELTA_BUCKETS = (256 * 1024, MB, 4 * MB, 16 * MB, 64 * MB, 256 * MB)
+
+REQUEST_RSS_GROWTH = metrics.histogram(
+    'request_rss_growth_bytes', 'Crescimento da RSS do worker durante a requisição', ('route',),
+    buckets=RSS_DELTA_BUCKETS)
+
+MEMORY_PATH = ADMIN_PREFIX + 'memory'
+
+# Quadros de pilha guardados por alocação quando o tracemalloc está ligado
+TRACEMALLOC_FRAMES = 5
+
+# Snapshots mantidos em MEMORY_SNAPSHOT_DIR (os mais antigos são apagados)
+SNAPSHOTS_KEPT = 10
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss() -> Optional[int]:
+    """RSS atual do processo em bytes (Linux, via /proc); None onde não há /proc."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryWatchdog:
+    """
+    Acompanha a RSS do worker por requisição e recicla o worker ao passar do limite.
+
+    - Crescimento de RSS por rota: histograma `pieng_request_rss_growth_bytes` e
+      GET /api/admin/memory (aproximado: com gthread, requisições simultâneas se somam)
+    - MEMORY_RECYCLE_MB: acima disso, o worker do gunicorn termina as requisições em
+      andamento e sai (como no max_requests); o master sobe outro no lugar
+    - Snapshots do tracemalloc sob demanda em POST /api/admin/memory/snapshot
+      (mesmo token de PROFILE_ADMIN_TOKEN), gravados em MEMORY_SNAPSHOT_DIR
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.recycle_bytes = 0
+        self.warn_delta_bytes = 64 * MB
+        self.token: Optional[str] = None
+        self.snapshot_dir = os.path.join('logs', 'memory')
+        self.worker = None
+        self.recycling = False
+        self.routes: Dict[str, List[float]] = {}
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('MEMORY_WATCHDOG_ENABLED', True) and current_rss() is not None
+        self.recycle_bytes = int(app.config.get('MEMORY_RECYCLE_MB') or 0) * MB
+        self.warn_delta_bytes = int(app.config.get('MEMORY_WARN_DELTA_MB', 64)) * MB
+        self.token = app.config.get('PROFILE_ADMIN_TOKEN') or None
+        self.snapshot_dir = app.config.get('MEMORY_SNAPSHOT_DIR', self.snapshot_dir)
+        app.extensions['memory_watchdog'] = self
+
+        if app.config.get('MEMORY_TRACEMALLOC') and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+            metrics.register_collector(self.collect_metrics)
+
+        if self.token:
+            app.add_url_rule(MEMORY_PATH, 'memory_status', self._status_view, methods=['GET'])
+            app.add_url_rule(f'{MEMORY_PATH}/snapshot', 'memory_snapshot', self._snapshot_view,
+                             methods=['POST', 'DELETE'])
+
+    def attach_worker(self, worker):
+        """Chamado no post_fork do gunicorn: permite reciclar este worker."""
+        self.worker = worker
+        self.recycling = False
+        rss = current_rss()
+        if self.recycle_bytes and rss is not None and rss >= self.recycle_bytes:
+            # Reciclar um worker que já nasce acima do limite só criaria um ciclo de reinícios
+            logger.warning('MEMORY_RECYCLE_MB abaixo da RSS inicial do worker; reciclagem desligada',
+                           extra={'rss_mb': round(rss / MB, 1), 'limit_mb': self.recycle_bytes // MB})
+            self.recycling = True
+
+    def _before_request(self):
+        g.memory_rss_before = current_rss()
+
+    def _teardown_request(self, exc):
+        before = g.pop('memory_rss_before', None)
+        if before is None:
+            return
+        rss = current_rss()
+        growth = max(rss - before, 0)
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_RSS_GROWTH.observe(growth, route=route)
+
+        with self._lock:
+            stats = self.routes.setdefault(route, [0, 0, 0])  # [requisições, soma, máximo]
+            stats[0] += 1
+            stats[1] += growth
+            stats[2] = max(stats[2], growth)
+
+        if growth >= self.warn_delta_bytes:
+            logger.warning('Requisição aumentou a memória do worker',
+                           extra={'route': route, 'rss_growth_mb': round(growth / MB, 1),
+                                  'rss_mb': round(rss / MB, 1)})
+        if self.recycle_bytes and rss >= self.recycle_bytes:
+            self._recycle(rss)
+
+    def _recycle(self, rss: int):
+        with self._lock:
+            if self.recycling:
+                return
+            self.recycling = True
+        if self.worker is None:
+            # Fora do gunicorn (servidor de desenvolvimento) não há quem suba outro processo
+            logger.warning('Memória acima do limite de reciclagem',
+                           extra={'rss_mb': round(rss / MB, 1), 'limit_mb': self.recycle_bytes // MB})
+            return
+        logger.warning('Memória acima do limite: reciclando o worker',
+                       extra={'rss_mb': round(rss / MB, 1), 'limit_mb': self.recycle_bytes // MB,
+                              'pid': os.getpid()})
+        # Mesmo mecanismo do max_requests: o worker para de aceitar conexões,
+        # termina as requisições em andamento e sai
+        self.worker.alive = False
+
+    def stats(self) -> Dict:
+        rss = current_rss()
+        with self._lock:
+            routes = {
+                route: {'requests': count, 'avg_growth_bytes': round(total / count), 'max_growth_bytes': peak}
+                for route, (count, total, peak) in self.routes.items()
+            }
+        return {
+            'pid': os.getpid(),
+            'rss_bytes': rss,
+            'recycle_bytes': self.recycle_bytes or None,
+            'recycling': self.recycling,
+            'tracemalloc': tracemalloc.is_tracing(),
+            'routes': dict(sorted(routes.items(), key=lambda item: -item[1]['max_growth_bytes']))
+        }
+
+    def take_snapshot(self, limit: int = 25) -> Dict:
+        """
+        Snapshot do tracemalloc (iniciado na primeira chamada). A partir do segundo,
+        compara com o anterior: as linhas que mais cresceram entre as chamadas apontam o vazamento.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            return {'started': True, 'tracemalloc': True,
+                    'message': 'tracemalloc iniciado; chame de novo após algumas requisições'}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        filename = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}_{os.getpid()}.tracemalloc"
+        snapshot.dump(os.path.join(self.snapshot_dir, filename))
+        self._prune_snapshots()
+
+        with self._lock:
+            previous, self._previous_snapshot = self._previous_snapshot, snapshot
+        if previous is not None:
+            top = [{'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'size_diff_bytes': stat.size_diff,
+                    'count': stat.count, 'count_diff': stat.count_diff}
+                   for stat in snapshot.compare_to(previous, 'lineno')[:limit]]
+        else:
+            top = [{'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+                   for stat in snapshot.statistics('lineno')[:limit]]
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'started': False,
+            'tracemalloc': True,
+            'file': filename,
+            'compared_to_previous': previous is not None,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'top': top
+        }
+
+    def _prune_snapshots(self):
+        names = sorted(name for name in os.listdir(self.snapshot_dir) if name.endswith('.tracemalloc'))
+        for name in names[:-SNAPSHOTS_KEPT]:
+            try:
+                os.remove(os.path.join(self.snapshot_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def stop_tracing(self):
+        with self._lock:
+            self._previous_snapshot = None
+        tracemalloc.stop()
+
+    def collect_metrics(self) -> List[str]:
+        lines = format_header('pieng_process_rss_bytes', 'gauge', 'RSS atual do worker')
+        lines.append(format_sample('pieng_process_rss_bytes', {}, current_rss() or 0))
+        if self.recycle_bytes:
+            lines += format_header('pieng_process_rss_recycle_bytes', 'gauge', 'Limite de RSS para reciclar o worker')
+            lines.append(format_sample('pieng_process_rss_recycle_bytes', {}, self.recycle_bytes))
+        return lines
+
+    def _status_view(self):
+        """RSS do worker, crescimento por rota e estado do tracemalloc."""
+        require_admin_token(self.token)
+        return jsonify({'success': True, **self.stats()})
+
+    def _snapshot_view(self):
+        """POST: snapshot (e diff com o anterior) do tracemalloc; DELETE: desliga o tracemalloc."""
+        require_admin_token(self.token)
+        if request.method == 'DELETE':
+            self.stop_tracing()
+            return jsonify({'success': True, 'tracemalloc': False})
+        limit = request.args.get('limit', 25, type=int)
+        return jsonify({'success': True, **self.take_snapshot(limit)})
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+memory_watchdog = MemoryWatchdog()
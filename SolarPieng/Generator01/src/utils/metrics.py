@@ -0,0 +1,222 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from flask import Response, g, request
+
+# Buckets padrão de latência (segundos), como os do cliente oficial do Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_sample(name: str, labels: Dict, value: float) -> str:
+    """Uma linha no formato texto do Prometheus: nome{rótulo="valor"} valor."""
+    if labels:
+        rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return f'{name}{{{rendered}}} {format_value(value)}'
+    return f'{name} {format_value(value)}'
+
+
+def format_header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple) -> Dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return format_header(self.name, self.kind, self.help) + [
+            format_sample(self.name, self._labels(key), value) for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [contagens por bucket (+Inf no fim), soma]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco: `with histogram.time(stage='ocr'): ...`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = format_header(self.name, self.kind, self.help)
+        for key, counts, total in items:
+            labels = self._labels(key)
+            lines.extend(histogram_samples(self.name, labels, self.buckets, counts, total))
+        return lines
+
+
+def histogram_samples(name: str, labels: Dict, buckets: Iterable[float], counts: List[int],
+                      total: float) -> List[str]:
+    """Linhas _bucket/_sum/_count de um histograma a partir das contagens por bucket."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(tuple(buckets) + (float('inf'),), counts):
+        cumulative += count
+        lines.append(format_sample(f'{name}_bucket', dict(labels, le=format_value(float(bound))), cumulative))
+    lines.append(format_sample(f'{name}_sum', labels, total))
+    lines.append(format_sample(f'{name}_count', labels, cumulative))
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas em processo, exposto em /metrics no formato texto do Prometheus.
+
+    Cada worker do gunicorn tem o seu registro: o Prometheus deve coletar de cada
+    worker (ou agregar por instância), como no modo sem multiprocess do cliente oficial.
+    """
+
+    def __init__(self, prefix: str = 'pieng'):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+        self.request_duration = self.histogram(
+            'http_request_duration_seconds', 'Latência das requisições por rota', ('route', 'method', 'status'))
+        self.requests_in_flight = self.gauge(
+            'http_requests_in_flight', 'Requisições em andamento por rota', ('route',))
+
+    def _register(self, cls, name: str, *args, **kwargs) -> _Metric:
+        name = f'{self.prefix}_{name}'
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """Coletor chamado a cada /metrics (métricas derivadas do estado de outro componente)."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        """Mede latência e requisições em andamento por rota e registra GET /metrics."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view, methods=['GET'])
+        app.extensions['metrics'] = self
+
+    @staticmethod
+    def _route() -> str:
+        # Regra da rota (ex.: /api/proposal-sets/<set_id>), não a URL: cardinalidade limitada
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_route = self._route()
+        self.requests_in_flight.inc(route=g.metrics_route)
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        route = g.pop('metrics_route')
+        status = g.pop('metrics_status', 500)
+        self.requests_in_flight.dec(route=route)
+        self.request_duration.observe(time.perf_counter() - started,
+                                      route=route, method=request.method, status=status)
+
+    def _metrics_view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+metrics = MetricsRegistry()
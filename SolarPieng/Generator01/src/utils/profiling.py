@@ -0,0 +1,253 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import abort, jsonify, request, send_from_directory
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# Rotas perfiladas por padrão (as caras: OCR, cálculo, orçamento e renderização)
+DEFAULT_PROFILE_PATHS = ('/api/upload-ocr', '/api/calculate-proposal', '/api/quick-quote',
+                         '/api/generate-html')
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# Rotas de diagnóstico (perfis, memória): exigem o token e nunca são perfiladas
+ADMIN_PREFIX = '/api/admin/'
+ADMIN_PATH = ADMIN_PREFIX + 'profiles'
+
+# 20261018T120000123456_api-upload-ocr_1234ms_ab12cd34.prof (timestamp com microssegundos:
+# a ordem alfabética é a cronológica)
+PROFILE_NAME_PATTERN = re.compile(
+    r'^(?P<ts>\d{8}T\d{12})_(?P<route>[\w-]+)_(?P<ms>\d+)ms_(?P<id>[0-9a-f]+)\.(?P<ext>prof|folded)$'
+)
+
+
+class StackSampler:
+    """
+    Profiler por amostragem de uma thread: a cada `interval` segundos lê a pilha
+    atual dela (sys._current_frames) e conta as pilhas no formato "collapsed"
+    (func;func;func N), compatível com flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}'
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class ProfilerMiddleware:
+    """
+    Middleware WSGI que perfila uma fração das requisições das rotas em `paths`
+    (ou qualquer uma com o cabeçalho X-Profile-Token correto) e grava o resultado
+    em `profile_dir`: .prof (pstats, modo cprofile) ou .folded (modo sampling).
+
+    Só é instalado quando habilitado (ver RequestProfiler.init_app): desligado,
+    não há nenhum custo por requisição.
+    """
+
+    def __init__(self, wsgi_app, profile_dir: str, sample_rate: float = 0.0, token: Optional[str] = None,
+                 paths=DEFAULT_PROFILE_PATHS, mode: str = 'cprofile', max_files: int = 100,
+                 sampling_interval: float = 0.005):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.token = token
+        self.paths = frozenset(paths)
+        self.mode = mode
+        self.max_files = max_files
+        self.sampling_interval = sampling_interval
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def _should_profile(self, environ) -> bool:
+        if environ.get('PATH_INFO', '').startswith(ADMIN_PREFIX):
+            return False
+        if self.token:
+            given = environ.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_'))
+            if given and hmac.compare_digest(given, self.token):
+                return True
+        return (self.sample_rate > 0 and environ.get('PATH_INFO') in self.paths
+                and random.random() < self.sample_rate)
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        profile_id = secrets.token_hex(4)
+
+        def start_with_id(status, headers, exc_info=None):
+            headers.append((PROFILE_ID_HEADER, profile_id))
+            return start_response(status, headers, exc_info)
+
+        if self.mode == 'sampling':
+            profiler = StackSampler(threading.get_ident(), self.sampling_interval)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, start_with_id)
+        finally:
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            if self.mode == 'sampling':
+                profiler.stop()
+            else:
+                profiler.disable()
+            self._save(profiler, environ.get('PATH_INFO', ''), elapsed_ms, profile_id)
+
+    def _save(self, profiler, path: str, elapsed_ms: int, profile_id: str):
+        route = re.sub(r'[^\w]+', '-', path).strip('-') or 'root'
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        ext = 'folded' if self.mode == 'sampling' else 'prof'
+        filename = f'{timestamp}_{route[:60]}_{elapsed_ms}ms_{profile_id}.{ext}'
+        target = os.path.join(self.profile_dir, filename)
+        if self.mode == 'sampling':
+            profiler.write(target)
+        else:
+            profiler.dump_stats(target)
+        self._prune()
+
+    def _prune(self):
+        files = list_profiles(self.profile_dir)
+        for entry in files[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, entry['filename']))
+            except FileNotFoundError:
+                pass
+
+
+def require_admin_token(token: Optional[str]):
+    """Aborta com 403 se a requisição não trouxer X-Profile-Token igual a `token`."""
+    given = request.headers.get(PROFILE_HEADER, '')
+    if not token or not hmac.compare_digest(given, token):
+        abort(403)
+
+
+def list_profiles(profile_dir: str) -> List[Dict]:
+    """Perfis gravados em `profile_dir`, do mais recente para o mais antigo."""
+    entries = []
+    try:
+        names = os.listdir(profile_dir)
+    except FileNotFoundError:
+        return entries
+    for name in names:
+        match = PROFILE_NAME_PATTERN.match(name)
+        if not match:
+            continue
+        stat = os.stat(os.path.join(profile_dir, name))
+        entries.append({
+            'filename': name,
+            'id': match.group('id'),
+            'route': match.group('route'),
+            'duration_ms': int(match.group('ms')),
+            'format': 'pstats' if match.group('ext') == 'prof' else 'collapsed',
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'size_bytes': stat.st_size
+        })
+    entries.sort(key=lambda e: e['filename'], reverse=True)
+    return entries
+
+
+class RequestProfiler:
+    """
+    Profiling opcional por requisição.
+
+    Habilitado por PROFILE_SAMPLE_RATE > 0 (fração das requisições das rotas
+    perfiladas) e/ou PROFILE_ADMIN_TOKEN (perfila qualquer requisição com
+    X-Profile-Token: <token> e libera /api/admin/profiles). Sem nenhum dos dois,
+    nada é instalado.
+    """
+
+    def __init__(self):
+        self.middleware: Optional[ProfilerMiddleware] = None
+        self.token: Optional[str] = None
+        self.profile_dir = 'logs/profiles'
+
+    def init_app(self, app):
+        sample_rate = float(app.config.get('PROFILE_SAMPLE_RATE') or 0)
+        self.token = app.config.get('PROFILE_ADMIN_TOKEN') or None
+        self.profile_dir = app.config.get('PROFILE_DIR', self.profile_dir)
+        app.extensions['request_profiler'] = self
+
+        if sample_rate <= 0 and not self.token:
+            return
+
+        mode = app.config.get('PROFILE_MODE', 'cprofile')
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'PROFILE_MODE inválido: {mode}')
+
+        self.middleware = ProfilerMiddleware(
+            app.wsgi_app, self.profile_dir, sample_rate=sample_rate, token=self.token,
+            paths=app.config.get('PROFILE_PATHS', DEFAULT_PROFILE_PATHS), mode=mode,
+            max_files=app.config.get('PROFILE_MAX_FILES', 100)
+        )
+        app.wsgi_app = self.middleware
+
+        if self.token:
+            app.add_url_rule(ADMIN_PATH, 'list_profiles', self._list_view, methods=['GET'])
+            app.add_url_rule(f'{ADMIN_PATH}/<filename>', 'download_profile', self._download_view,
+                             methods=['GET'])
+
+    def _list_view(self):
+        """Perfis recentes (mais novos primeiro)."""
+        require_admin_token(self.token)
+        limit = request.args.get('limit', 50, type=int)
+        profiles = list_profiles(self.profile_dir)
+        return jsonify({
+            'success': True,
+            'sample_rate': self.middleware.sample_rate,
+            'mode': self.middleware.mode,
+            'profiles': profiles[:limit]
+        })
+
+    def _download_view(self, filename: str):
+        """Baixa um perfil (.prof: `python -m pstats arquivo`; .folded: flamegraph)."""
+        require_admin_token(self.token)
+        if not PROFILE_NAME_PATTERN.match(filename):
+            abort(404)
+        return send_from_directory(os.path.abspath(self.profile_dir), filename, as_attachment=True)
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+request_profiler = RequestProfiler()
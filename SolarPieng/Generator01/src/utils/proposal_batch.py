@@ -0,0 +1,119 @@
+import json
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.utils.calculator import SolarCalculator
+from src.utils.proposal_format import project_fields, to_compact
+
+# Tamanho alvo de cada bloco da resposta: pequeno o bastante para o cliente
+# processar enquanto o servidor calcula, grande o bastante para não gerar um
+# write() por linha
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+
+def iter_records(lines: Iterable[bytes], loads: Callable[[bytes], object] = json.loads) -> Iterator[Dict]:
+    """
+    Lê registros NDJSON (um objeto JSON por linha) sem carregar o corpo inteiro.
+
+    Linhas inválidas viram {'_error': ...} para que o lote continue e a
+    resposta indique qual registro falhou.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            yield {'_error': f'JSON inválido: {e}'}
+            continue
+        if not isinstance(record, dict):
+            yield {'_error': 'Registro deve ser um objeto JSON'}
+            continue
+        yield record
+
+
+def calculate_records(records: Iterable[Dict], calculator: SolarCalculator = None,
+                      response_format: str = 'default', fields: Optional[List[str]] = None,
+                      store=None) -> Iterator[Dict]:
+    """
+    Calcula um registro (client_data, systems_data, parameters) por vez com a mesma
+    calculadora, produzindo um resultado por registro, na ordem de entrada.
+
+    Parâmetros parciais são completados com os padrões da calculadora. Com
+    `store` (proposal_store), cada conjunto é guardado e o resultado traz o
+    proposal_set_id, como em /api/calculate-proposal.
+    """
+    calculator = calculator or SolarCalculator()
+
+    for index, record in enumerate(records):
+        result = {'index': index}
+        if 'id' in record:
+            result['id'] = record['id']
+
+        if '_error' in record:
+            result.update(success=False, error=record['_error'])
+            yield result
+            continue
+
+        try:
+            client_data = record.get('client_data', {})
+            systems_data = record.get('systems_data', [])
+            if not systems_data:
+                raise ValueError('Nenhum sistema fornecido')
+            parameters = {**calculator.default_params, **(record.get('parameters') or {})}
+
+            proposals = calculator.compare_systems(systems_data, parameters)
+
+            result['success'] = True
+            result['client_data'] = client_data
+            if store is not None:
+                result['proposal_set_id'] = store.create(client_data, systems_data, parameters,
+                                                         proposals).set_id
+
+            if response_format == 'compact':
+                result.update(to_compact(proposals, systems_data, parameters, fields))
+            else:
+                if fields is not None:
+                    proposals = [project_fields(p, fields) for p in proposals]
+                result['proposals'] = proposals
+                result['parameters_used'] = parameters
+        except Exception as e:
+            result = {k: v for k, v in result.items() if k in ('index', 'id')}
+            result.update(success=False, error=f'Erro no cálculo: {str(e)}')
+
+        yield result
+
+
+def ndjson_chunks(results: Iterable[Dict], dumps: Callable[[Dict], bytes],
+                  chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Serializa os resultados em NDJSON, agrupados em blocos de ~`chunk_bytes`.
+
+    Por ser um gerador, o próximo registro só é lido/calculado quando o
+    servidor consegue enviar o bloco anterior: memória constante e o ritmo é
+    ditado pelo cliente. A última linha é um resumo do lote.
+    """
+    started = time.perf_counter()
+    total = failed = 0
+    buffer = []
+    size = 0
+
+    for result in results:
+        total += 1
+        if not result.get('success'):
+            failed += 1
+        line = dumps(result) + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+
+    buffer.append(dumps({'summary': {
+        'records': total,
+        'failed': failed,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    }}) + b'\n')
+    yield b''.join(buffer)
@@ -0,0 +1,154 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+
+# Seções numéricas da proposta que viram colunas no formato compacto
+NUMERIC_SECTIONS = ('costs', 'calculations', 'pricing')
+
+# Campos de ranking (adicionados por compare_systems)
+RANKING_FIELDS = ('ranking', 'is_recommended')
+
+RESPONSE_FORMATS = ('default', 'compact')
+
+
+def parse_fields(fields: Union[str, Iterable[str], None]) -> Optional[List[str]]:
+    """
+    Normaliza o seletor de campos: 'pricing.final_price,kit_info.name' ou lista.
+    Retorna None quando nenhum campo foi pedido (todos os campos).
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    parsed = [f.strip() for f in fields if f and f.strip()]
+    return parsed or None
+
+
+def _field_selected(path: str, fields: Optional[List[str]]) -> bool:
+    """Um campo é selecionado se ele ou uma seção que o contém foi pedido."""
+    if fields is None:
+        return True
+    return any(path == f or path.startswith(f + '.') for f in fields)
+
+
+def project_fields(proposal: Dict, fields: Optional[List[str]]) -> Dict:
+    """
+    Recorta uma proposta (formato padrão, aninhado) para os campos pedidos.
+    Ex.: ['kit_info.name', 'pricing'] mantém só o nome do kit e a seção de preços.
+    """
+    if fields is None:
+        return proposal
+
+    result = {}
+    for path in fields:
+        # Campo já coberto por uma seção inteira pedida (ex.: 'pricing' e 'pricing.cash_price')
+        if any(path.startswith(f + '.') for f in fields):
+            continue
+        parts = path.split('.')
+        if not _has_path(proposal, parts):
+            continue
+
+        value = proposal
+        for part in parts:
+            value = value[part]
+
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return result
+
+
+def _has_path(data: Dict, parts: List[str]) -> bool:
+    for part in parts:
+        if not isinstance(data, dict) or part not in data:
+            return False
+        data = data[part]
+    return True
+
+
+def to_compact(proposals: List[Dict], systems_data: List[Dict], params: Optional[Dict],
+               fields: Optional[List[str]] = None) -> Dict:
+    """
+    Converte as propostas para o formato compacto:
+
+    - `parameters_used` enviado uma única vez (não repetido por kit);
+    - `kits`: tabela com os dados de entrada, na ordem de `systems_data`;
+    - `proposals`: colunas paralelas (uma lista por campo), em ordem de ranking,
+      com `kit` apontando para o índice em `kits`.
+
+    `fields` (ex.: ['kit_info.name', 'pricing.final_price']) restringe as colunas
+    e os campos de `kits`; `kit` é sempre incluído.
+    """
+    # kit_info é o próprio dict de systems_data (calculate_system_proposal não copia)
+    index_by_id = {id(system): i for i, system in enumerate(systems_data)}
+    kits = list(systems_data)
+
+    kit_column = []
+    for proposal in proposals:
+        kit = proposal['kit_info']
+        index = index_by_id.get(id(kit))
+        if index is None:
+            index = len(kits)
+            kits.append(kit)
+            index_by_id[id(kit)] = index
+        kit_column.append(index)
+
+    columns = {'kit': kit_column}
+    for name in RANKING_FIELDS:
+        if proposals and name in proposals[0] and _field_selected(name, fields):
+            columns[name] = [p.get(name) for p in proposals]
+
+    for section in NUMERIC_SECTIONS:
+        keys = proposals[0].get(section, {}).keys() if proposals else ()
+        for key in keys:
+            path = f'{section}.{key}'
+            if _field_selected(path, fields):
+                columns[path] = [p[section].get(key) for p in proposals]
+
+    kit_fields = None
+    if fields is not None:
+        kit_fields = [f[len('kit_info.'):] for f in fields if f.startswith('kit_info.')]
+        if 'kit_info' in fields:
+            kit_fields = None
+
+    result = {
+        'format': 'compact',
+        'count': len(proposals),
+        'proposals': columns
+    }
+    if kit_fields is None:
+        result['kits'] = kits
+    elif kit_fields:
+        result['kits'] = [{k: kit.get(k) for k in kit_fields} for kit in kits]
+
+    if params is not None and _field_selected('parameters_used', fields):
+        result['parameters_used'] = params
+
+    return result
+
+
+def expand_compact(compact: Dict) -> List[Dict]:
+    """
+    Inverso de `to_compact` (para clientes/ferramentas que precisam do formato aninhado).
+    Só reconstrói os campos presentes no payload compacto.
+    """
+    columns = compact['proposals']
+    kits = compact.get('kits')
+    params = compact.get('parameters_used')
+    proposals = []
+    for i, kit_index in enumerate(columns['kit']):
+        proposal = {}
+        if kits is not None:
+            proposal['kit_info'] = kits[kit_index]
+        for path, values in columns.items():
+            if path == 'kit':
+                continue
+            if '.' in path:
+                section, key = path.split('.', 1)
+                proposal.setdefault(section, {})[key] = values[i]
+            else:
+                proposal[path] = values[i]
+        if params is not None:
+            proposal['parameters_used'] = params
+        proposals.append(proposal)
+    return proposals
@@ -0,0 +1,264 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, inspect, select, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.proposal import Client, Kit, Proposal
+from src.models.user import db
+from src.utils.analytics import sales_analytics
+from src.utils.data_extractor import DataExtractor
+from src.utils.storage import sqlite_storage, write_behind
+
+logger = logging.getLogger(__name__)
+
+# Ordenações do histórico: cada uma tem um índice (coluna, id) em proposals
+SORT_COLUMNS = {
+    'created_at': Proposal.created_at,
+    'power': Proposal.power_kwp,
+    'final_price': Proposal.final_price
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Colunas da listagem (o cálculo completo em `data` só no detalhe)
+LIST_COLUMNS = (Proposal.id, Proposal.proposal_set_id, Proposal.created_at, Proposal.seller, Proposal.client_id,
+                Client.name.label('client_name'), Proposal.kit_id, Kit.name.label('kit_name'),
+                Proposal.power_kwp, Proposal.final_price, Proposal.cash_price, Proposal.margin_percent,
+                Proposal.payback_months, Proposal.ranking, Proposal.is_recommended)
+
+
+def encode_cursor(value, row_id: int) -> str:
+    """Cursor opaco com a posição (valor da ordenação, id) do último item da página."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, kind: type) -> Tuple[object, int]:
+    """(valor, id) de um cursor de encode_cursor, com o valor convertido para `kind`."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if kind is datetime:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor inválido') from None
+
+
+def page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError('limit deve ser positivo')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+class ProposalHistory:
+    """
+    Histórico persistente das propostas calculadas (tabelas clients, kits e proposals).
+
+    Cada cálculo é gravado na própria requisição, numa única transação: o cliente, os
+    kits e as propostas de uma comparação com 200 kits são três INSERTs em lote e um
+    commit, então a proposta já aparece em /api/proposals quando a resposta sai. Só os
+    resumos de analytics (recalculáveis com rebuild-analytics) ficam para a fila de
+    write-behind. Falhas na gravação são registradas no log sem afetar a resposta do
+    cálculo.
+
+    As consultas paginam por cursor (keyset) sobre os índices (coluna, id): o custo
+    de uma página não depende de quantas já foram lidas nem do tamanho da tabela.
+    """
+
+    def __init__(self):
+        self.enabled = True
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROPOSAL_HISTORY_ENABLED', True)
+        app.extensions['proposal_history'] = self
+        with app.app_context():
+            self._migrate()
+
+    @staticmethod
+    def _migrate():
+        # Bancos criados antes das colunas kits.supplier e proposals.seller
+        inspector = inspect(db.engine)
+        for table, column, ddl in (('kits', 'supplier', 'VARCHAR(40)'), ('proposals', 'seller', 'VARCHAR(80)')):
+            if column not in {info['name'] for info in inspector.get_columns(table)}:
+                db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+        db.session.commit()
+
+    def record(self, proposal_set, seller: str = None) -> Optional[List[int]]:
+        """Grava as propostas de um conjunto; retorna os ids criados (None se desligado ou em erro)."""
+        if not self.enabled or not proposal_set.proposals:
+            return None
+        try:
+            now = datetime.now()
+            kit_rows, rows, summaries = self._prepare(proposal_set, seller, now)
+            # Tudo pronto antes da primeira escrita: o lock de escrita do SQLite (um escritor
+            # por vez entre todos os workers) fica retido só pelos INSERTs, até o commit
+            with sqlite_storage.write_lock():
+                ids = self._insert(proposal_set.client_data or {}, kit_rows, rows, now)
+                db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            logger.exception('Falha ao gravar o histórico de propostas',
+                             extra={'proposal_set_id': proposal_set.set_id})
+            return None
+        if summaries:
+            write_behind.submit(sales_analytics.apply, summaries)
+        return ids
+
+    @staticmethod
+    def _prepare(proposal_set, seller: Optional[str], now: datetime) -> Tuple[List[Dict], List[Dict], Dict]:
+        """Linhas de kits e propostas e os resumos de analytics, sem tocar no banco."""
+        kits = [proposal.get('kit_info') or {} for proposal in proposal_set.proposals]
+        suppliers = [kit.get('supplier') or DataExtractor.detect_supplier_from_text(str(kit.get('name') or ''))
+                     for kit in kits]
+        kit_rows = [{
+            'name': str(kit.get('name') or 'Kit'),
+            'supplier': supplier,
+            'power_kwp': float(kit.get('power') or 0),
+            'modules_count': kit.get('modules_count'),
+            'modules_desc': kit.get('modules_desc'),
+            'inverter_desc': kit.get('inverter_desc'),
+            'inverter_type': kit.get('inverter_type'),
+            'cost': float(kit.get('vcusto_raw') or 0),
+            'freight_included': bool(kit.get('freight_included', True)),
+            'freight_value': float(kit.get('freight_value') or 0)
+        } for kit, supplier in zip(kits, suppliers)]
+
+        rows = []
+        for proposal, kit in zip(proposal_set.proposals, kits):
+            calculations = proposal.get('calculations', {})
+            pricing = proposal.get('pricing', {})
+            rows.append({
+                'proposal_set_id': proposal_set.set_id,
+                'seller': seller,
+                'created_at': now,
+                'power_kwp': float(kit.get('power') or 0),
+                'final_price': pricing.get('final_price', 0),
+                'cash_price': pricing.get('cash_price'),
+                'total_cost': proposal.get('costs', {}).get('total_cost'),
+                'margin_percent': calculations.get('final_margin_percent'),
+                'payback_months': calculations.get('final_payback_months'),
+                'monthly_generation': calculations.get('monthly_generation'),
+                'ranking': proposal.get('ranking'),
+                'is_recommended': bool(proposal.get('is_recommended')),
+                'data': {key: proposal[key] for key in ('costs', 'calculations', 'pricing', 'parameters_used')
+                         if key in proposal}
+            })
+        summaries = sales_analytics.summarize([dict(row, supplier=supplier, kit_name=kit.get('name'))
+                                               for row, supplier, kit in zip(rows, suppliers, kits)])
+        return kit_rows, rows, summaries
+
+    def _insert(self, client_data: Dict, kit_rows: List[Dict], rows: List[Dict], now: datetime) -> List[int]:
+        client_id = self._client_id(client_data, now)
+        kit_ids = db.session.execute(
+            insert(Kit).returning(Kit.id, sort_by_parameter_order=True), kit_rows
+        ).scalars().all()
+        for row, kit_id in zip(rows, kit_ids):
+            row['client_id'] = client_id
+            row['kit_id'] = kit_id
+        return db.session.execute(
+            insert(Proposal).returning(Proposal.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+
+    @staticmethod
+    def _client_id(client_data: Dict, now: datetime) -> int:
+        """Cliente pelo e-mail (atualizando os contatos informados) ou um novo."""
+        fields = {key: client_data.get(key) or None for key in ('name', 'email', 'phone', 'address')}
+        fields['name'] = fields['name'] or 'Cliente'
+        if fields['email']:
+            client = db.session.execute(
+                select(Client).where(Client.email == fields['email']).order_by(Client.id).limit(1)
+            ).scalar_one_or_none()
+            if client is not None:
+                for key, value in fields.items():
+                    if value:
+                        setattr(client, key, value)
+                return client.id
+        return db.session.execute(insert(Client).values(created_at=now, **fields).returning(Client.id)).scalar_one()
+
+    def list_proposals(self, client_id: int = None, min_power: float = None, max_power: float = None,
+                       min_price: float = None, max_price: float = None, since: datetime = None,
+                       until: datetime = None, sort: str = 'created_at', order: str = 'desc',
+                       limit: int = None, cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """Uma página do histórico e o cursor da próxima (None na última)."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort deve ser um de: {', '.join(SORT_COLUMNS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError('order deve ser asc ou desc')
+        limit = page_size(limit)
+        column = SORT_COLUMNS[sort]
+
+        query = (select(*LIST_COLUMNS)
+                 .join(Client, Client.id == Proposal.client_id)
+                 .join(Kit, Kit.id == Proposal.kit_id))
+        if client_id is not None:
+            query = query.where(Proposal.client_id == client_id)
+        if min_power is not None:
+            query = query.where(Proposal.power_kwp >= min_power)
+        if max_power is not None:
+            query = query.where(Proposal.power_kwp <= max_power)
+        if min_price is not None:
+            query = query.where(Proposal.final_price >= min_price)
+        if max_price is not None:
+            query = query.where(Proposal.final_price <= max_price)
+        if since is not None:
+            query = query.where(Proposal.created_at >= since)
+        if until is not None:
+            query = query.where(Proposal.created_at < until)
+
+        position = tuple_(column, Proposal.id)
+        if cursor:
+            after = tuple_(*decode_cursor(cursor, datetime if sort == 'created_at' else (int, float)))
+            query = query.where(position < after if order == 'desc' else position > after)
+        if order == 'desc':
+            query = query.order_by(column.desc(), Proposal.id.desc())
+        else:
+            query = query.order_by(column.asc(), Proposal.id.asc())
+
+        # Um item a mais só para saber se há próxima página
+        rows = db.session.execute(query.limit(limit + 1)).mappings().all()
+        items = [self._list_item(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[column.key], last['id'])
+        return items, next_cursor
+
+    @staticmethod
+    def _list_item(row) -> Dict:
+        item = dict(row)
+        item['created_at'] = item['created_at'].isoformat()
+        return item
+
+    def get_proposal(self, proposal_id: int) -> Optional[Dict]:
+        proposal = db.session.get(Proposal, proposal_id)
+        return proposal.to_dict() if proposal is not None else None
+
+    def list_clients(self, name_prefix: str = None, limit: int = None,
+                     cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """Clientes em ordem de nome (índice em clients.name), opcionalmente por prefixo."""
+        limit = page_size(limit)
+        query = select(Client)
+        if name_prefix:
+            # Intervalo em vez de LIKE: usa o índice (LIKE no SQLite ignora maiúsculas e não usa)
+            query = query.where(Client.name >= name_prefix, Client.name < name_prefix + '\uffff')
+        if cursor:
+            query = query.where(tuple_(Client.name, Client.id) > tuple_(*decode_cursor(cursor, str)))
+        clients = db.session.execute(query.order_by(Client.name, Client.id).limit(limit + 1)).scalars().all()
+        next_cursor = encode_cursor(clients[limit - 1].name, clients[limit - 1].id) if len(clients) > limit else None
+        return [client.to_dict() for client in clients[:limit]], next_cursor
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+proposal_history = ProposalHistory()
@@ -0,0 +1,297 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.utils.storage import sqlite_storage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ProposalSetConflict(Exception):
+    """O conjunto foi alterado por outra requisição desde que foi lido."""
+    pass
+
+
+class ProposalSet:
+    """Conjunto de propostas calculado no servidor e referenciado por um id opaco."""
+
+    __slots__ = ('set_id', 'client_data', 'systems_data', 'parameters', 'proposals',
+                 'created_at', 'expires_at', 'size_bytes', 'revision')
+
+    def __init__(self, set_id: str, client_data: Dict, systems_data: List[Dict], parameters: Dict,
+                 proposals: List[Dict], created_at: float, expires_at: float, size_bytes: int = 0,
+                 revision: int = 0):
+        self.set_id = set_id
+        self.client_data = client_data
+        self.systems_data = systems_data
+        self.parameters = parameters
+        self.proposals = proposals
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.size_bytes = size_bytes
+        self.revision = revision
+
+    def to_dict(self) -> Dict:
+        return {
+            'client_data': self.client_data,
+            'systems_data': self.systems_data,
+            'parameters': self.parameters,
+            'proposals': self.proposals
+        }
+
+    def to_payload(self) -> Dict:
+        """
+        Formato gravado no SQLite: o kit_info de cada proposta vira o índice do kit
+        em systems_data (não duplica os kits e preserva a identidade ao recarregar).
+        """
+        index_by_id = {id(system): i for i, system in enumerate(self.systems_data)}
+        proposals = []
+        for proposal in self.proposals:
+            index = index_by_id.get(id(proposal.get('kit_info')))
+            if index is not None:
+                proposal = {k: v for k, v in proposal.items() if k != 'kit_info'}
+                proposal['kit'] = index
+            proposals.append(proposal)
+        return dict(self.to_dict(), proposals=proposals)
+
+    @staticmethod
+    def proposals_from_payload(data: Dict) -> List[Dict]:
+        systems_data = data['systems_data']
+        proposals = data['proposals']
+        for proposal in proposals:
+            if 'kit' in proposal:
+                proposal['kit_info'] = systems_data[proposal.pop('kit')]
+        return proposals
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class ProposalSessionStore:
+    """
+    Armazena conjuntos de propostas calculados, para que /api/generate-html
+    receba só o id (sem reenviar as propostas e sem permitir alterar preços).
+
+    Duas camadas:
+    - LRU em memória (por worker), limitado a `max_entries`;
+    - SQLite compartilhado entre workers (fonte da verdade), com expiração por TTL.
+
+    Cada gravação incrementa `revision`; um acerto no LRU confere a revisão no
+    SQLite, para não servir um conjunto alterado (PATCH) por outro worker.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS proposal_sets (
+            id TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            revision INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS ix_proposal_sets_expires_at ON proposal_sets (expires_at);
+    """
+
+    def __init__(self, db_path: str = 'src/database/proposal_sets.db', max_entries: int = 256,
+                 ttl_seconds: int = 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_purge = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def init_app(self, app):
+        self.db_path = app.config.get('PROPOSAL_SETS_DB', self.db_path)
+        self.max_entries = app.config.get('PROPOSAL_SETS_MAX_ENTRIES', self.max_entries)
+        self.ttl_seconds = app.config.get('PROPOSAL_SETS_TTL_SECONDS', self.ttl_seconds)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+        app.extensions['proposal_store'] = self
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo (workers do gunicorn após o fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            sqlite_storage.configure_connection(conn)
+            conn.executescript(self.SCHEMA)
+            self._migrate(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        # Bancos criados antes da coluna revision
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(proposal_sets)")}
+        if 'revision' not in columns:
+            conn.execute("ALTER TABLE proposal_sets ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+
+    def _remember(self, proposal_set: ProposalSet):
+        with self._lock:
+            self._memory[proposal_set.set_id] = proposal_set
+            self._memory.move_to_end(proposal_set.set_id)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def create(self, client_data: Dict, systems_data: List[Dict], parameters: Dict,
+               proposals: List[Dict]) -> ProposalSet:
+        """Guarda um conjunto recém-calculado e retorna-o com seu id."""
+        now = time.time()
+        proposal_set = ProposalSet(secrets.token_urlsafe(16), client_data, systems_data, parameters,
+                                   proposals, now, now + self.ttl_seconds)
+        self.save(proposal_set)
+        return proposal_set
+
+    def save(self, proposal_set: ProposalSet):
+        """Grava (ou regrava) um conjunto e renova sua expiração."""
+        payload = _dumps(proposal_set.to_payload())
+        proposal_set.size_bytes = len(payload)
+        proposal_set.expires_at = time.time() + self.ttl_seconds
+        proposal_set.revision += 1
+        self._connection().execute(
+            "INSERT OR REPLACE INTO proposal_sets (id, payload, created_at, expires_at, revision) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (proposal_set.set_id, payload, proposal_set.created_at, proposal_set.expires_at,
+             proposal_set.revision)
+        )
+        self._remember(proposal_set)
+        self._count_write()
+
+    def update(self, proposal_set: ProposalSet, expected_revision: int):
+        """
+        Regrava um conjunto existente só se ele ainda estiver na revisão
+        `expected_revision` (a que foi lida); senão levanta ProposalSetConflict.
+        """
+        payload = _dumps(proposal_set.to_payload())
+        expires_at = time.time() + self.ttl_seconds
+        cursor = self._connection().execute(
+            "UPDATE proposal_sets SET payload = ?, expires_at = ?, revision = ? "
+            "WHERE id = ? AND revision = ?",
+            (payload, expires_at, expected_revision + 1, proposal_set.set_id, expected_revision)
+        )
+        if cursor.rowcount == 0:
+            raise ProposalSetConflict(proposal_set.set_id)
+
+        proposal_set.size_bytes = len(payload)
+        proposal_set.expires_at = expires_at
+        proposal_set.revision = expected_revision + 1
+        self._remember(proposal_set)
+        self._count_write()
+
+    def _count_write(self):
+        self._writes_since_purge += 1
+        if self._writes_since_purge >= 100:
+            self.purge_expired()
+
+    def get(self, set_id: str) -> Optional[ProposalSet]:
+        """Busca um conjunto pelo id (memória, depois SQLite). Expirados retornam None."""
+        if not set_id:
+            return None
+
+        with self._lock:
+            cached = self._memory.get(set_id)
+
+        if cached is not None:
+            # Consulta barata (chave primária, sem o payload): revisão e expiração atuais
+            row = self._connection().execute(
+                "SELECT revision, expires_at FROM proposal_sets WHERE id = ?", (set_id,)
+            ).fetchone()
+            if row is not None and row[0] == cached.revision:
+                cached.expires_at = row[1]
+                if cached.expired:
+                    self.expired += 1
+                    self.delete(set_id)
+                    return None
+                with self._lock:
+                    if set_id in self._memory:
+                        self._memory.move_to_end(set_id)
+                self.memory_hits += 1
+                return cached
+            with self._lock:
+                self._memory.pop(set_id, None)
+
+        row = self._connection().execute(
+            "SELECT payload, created_at, expires_at, revision FROM proposal_sets WHERE id = ?", (set_id,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        payload, created_at, expires_at, revision = row
+        if expires_at <= time.time():
+            self.expired += 1
+            self.delete(set_id)
+            return None
+
+        data = _loads(payload)
+        proposal_set = ProposalSet(set_id, data['client_data'], data['systems_data'], data['parameters'],
+                                   ProposalSet.proposals_from_payload(data), created_at, expires_at,
+                                   len(payload), revision)
+        self.db_hits += 1
+        self._remember(proposal_set)
+        return proposal_set
+
+    def delete(self, set_id: str):
+        with self._lock:
+            self._memory.pop(set_id, None)
+        self._connection().execute("DELETE FROM proposal_sets WHERE id = ?", (set_id,))
+
+    def purge_expired(self) -> int:
+        """Remove conjuntos expirados da memória e do SQLite."""
+        now = time.time()
+        self._writes_since_purge = 0
+        with self._lock:
+            for set_id in [k for k, v in self._memory.items() if v.expires_at <= now]:
+                del self._memory[set_id]
+        cursor = self._connection().execute("DELETE FROM proposal_sets WHERE expires_at <= ?", (now,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Taxa de acerto e ocupação de memória do LRU."""
+        with self._lock:
+            entries = list(self._memory.values())
+        lookups = self.memory_hits + self.db_hits + self.misses + self.expired
+        return {
+            'memory_entries': len(entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            # Tamanho serializado: aproximação barata (o objeto Python ocupa algumas vezes mais)
+            'memory_payload_bytes': sum(e.size_bytes for e in entries),
+            'memory_hits': self.memory_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'hit_rate': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            'memory_hit_rate': self.memory_hits / lookups if lookups else 0.0
+        }
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+proposal_store = ProposalSessionStore()
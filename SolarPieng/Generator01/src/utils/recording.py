@@ -0,0 +1,225 @@
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from flask import request
+
+from src.utils.profiling import ADMIN_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Gravadas: rotas do blueprint /api, exceto diagnóstico, usuários e clientes (dados
+# pessoais, inclusive na query) e downloads (só servem arquivos já gerados, e o nome
+# do arquivo traz o nome do cliente)
+RECORD_PREFIX = '/api/'
+RECORD_EXCLUDED_PREFIXES = (ADMIN_PREFIX, '/api/user', '/api/clients', '/api/download/')
+
+# Cabeçalhos que influenciam a resposta; nenhum outro é gravado (cookies, tokens, IPs)
+RECORDED_HEADERS = ('Content-Type', 'Accept', 'X-Tenant-ID')
+
+# Em client_data todo texto é pseudonimizado; fora dele, só estas chaves
+SANITIZED_KEYS = frozenset({'email', 'phone', 'telefone', 'whatsapp', 'cpf', 'cnpj', 'document',
+                            'documento', 'address', 'endereco', 'endereço'})
+
+JSON_CONTENT_TYPES = ('application/json', 'application/x-ndjson')
+
+# Chave do environ WSGI com os dados da requisição sendo gravada
+ENVIRON_KEY = 'pieng.recording'
+
+INDEX_FILE = 'index.jsonl'
+BODIES_DIR = 'bodies'
+
+
+def pseudonymize(value: str, secret: bytes) -> str:
+    """
+    Troca o texto por um apelido estável: valores iguais continuam iguais com o mesmo
+    `secret`. HMAC, não hash puro: telefones, CPFs e e-mails têm poucas combinações e
+    um hash sem chave seria revertido por dicionário.
+    """
+    return 'anon-' + hmac.new(secret, value.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+
+def sanitize(value, secret: bytes, redact_all: bool = False):
+    """Cópia do JSON com os dados pessoais pseudonimizados (números e booleanos são mantidos)."""
+    if isinstance(value, dict):
+        return {key: sanitize(item, secret, redact_all or key == 'client_data' or key.lower() in SANITIZED_KEYS)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item, secret, redact_all) for item in value]
+    if redact_all and isinstance(value, str) and value:
+        return pseudonymize(value, secret)
+    return value
+
+
+def sanitize_body(body: bytes, content_type: str, secret: bytes) -> Optional[bytes]:
+    """Corpo JSON/NDJSON sanitizado; None se não for JSON válido (a requisição não é gravada)."""
+    try:
+        if content_type.startswith('application/x-ndjson'):
+            lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+            return b''.join(json.dumps(sanitize(line, secret), ensure_ascii=False).encode('utf-8') + b'\n'
+                            for line in lines)
+        return json.dumps(sanitize(json.loads(body), secret), ensure_ascii=False).encode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class RecorderMiddleware:
+    """
+    Middleware WSGI que guarda o corpo bruto das requisições gravadas antes do Flask
+    lê-lo, e devolve ao app um wsgi.input equivalente (rotas que leem o corpo em
+    streaming, como o lote NDJSON, continuam funcionando).
+    """
+
+    def __init__(self, wsgi_app, recorder: 'RequestRecorder'):
+        self.wsgi_app = wsgi_app
+        self.recorder = recorder
+
+    def __call__(self, environ, start_response):
+        if not self.recorder.should_record(environ):
+            return self.wsgi_app(environ, start_response)
+
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        environ['wsgi.input'] = io.BytesIO(body)
+        state = environ[ENVIRON_KEY] = {'body': body, 'started': time.perf_counter()}
+
+        def start_and_capture(status, headers, exc_info=None):
+            state['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        response = self.wsgi_app(environ, start_and_capture)
+        # Respostas em streaming: a duração conta só até o início do envio
+        self.recorder.save(environ, state)
+        return response
+
+
+class RequestRecorder:
+    """
+    Gravação opcional das requisições de /api para replay (benchmarks/replay.py).
+
+    Habilitada por RECORD_SAMPLE_RATE > 0 (fração das requisições gravadas). Cada
+    requisição vira uma linha em RECORD_DIR/index.jsonl (método, rota, query,
+    cabeçalhos relevantes, status e duração) e o corpo vai para RECORD_DIR/bodies/,
+    endereçado pelo SHA-256 (uploads repetidos são guardados uma vez só).
+
+    Corpos JSON/NDJSON são gravados com client_data e campos de contato
+    pseudonimizados por HMAC com RECORD_SECRET (fora do arquivo gravado). Sem ele,
+    a chave é aleatória, gerada na subida (no master, com preload_app, então vale
+    para todos os workers) e nunca gravada: os apelidos só batem entre requisições
+    da mesma execução do servidor. Arquivos enviados ao upload-ocr são gravados
+    como vieram (são justamente os orçamentos que queremos reproduzir): o
+    diretório é sensível.
+    Corpos acima de RECORD_MAX_BODY_BYTES não são gravados, e cada worker para de
+    gravar ao escrever RECORD_MAX_MB.
+    """
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.record_dir = os.path.join('logs', 'recordings')
+        self.max_body_bytes = 16 * 1024 * 1024
+        self.max_bytes = 500 * 1024 * 1024
+        self.written_bytes = 0
+        self.recorded = 0
+        self.secret = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.sample_rate = float(app.config.get('RECORD_SAMPLE_RATE') or 0)
+        self.record_dir = app.config.get('RECORD_DIR', self.record_dir)
+        self.max_body_bytes = int(app.config.get('RECORD_MAX_BODY_BYTES', self.max_body_bytes))
+        self.max_bytes = int(app.config.get('RECORD_MAX_MB', self.max_bytes // (1024 * 1024))) * 1024 * 1024
+        secret = app.config.get('RECORD_SECRET')
+        self.secret = secret.encode('utf-8') if secret else secrets.token_bytes(32)
+        app.extensions['request_recorder'] = self
+
+        if self.sample_rate <= 0:
+            return
+        os.makedirs(os.path.join(self.record_dir, BODIES_DIR), exist_ok=True)
+        app.wsgi_app = RecorderMiddleware(app.wsgi_app, self)
+        app.after_request(self._after_request)
+        logger.warning('Gravação de requisições ligada', extra={'sample_rate': self.sample_rate,
+                                                                'record_dir': self.record_dir})
+
+    def should_record(self, environ) -> bool:
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(RECORD_PREFIX) or path.startswith(RECORD_EXCLUDED_PREFIXES):
+            return False
+        if environ.get('REQUEST_METHOD') == 'OPTIONS' or self.written_bytes >= self.max_bytes:
+            return False
+        length = environ.get('CONTENT_LENGTH')
+        if not length and environ.get('HTTP_TRANSFER_ENCODING'):
+            return False  # corpo chunked, tamanho desconhecido
+        if int(length or 0) > self.max_body_bytes:
+            return False
+        return random.random() < self.sample_rate
+
+    def _after_request(self, response):
+        # Roda antes da compressão (after_request em ordem inversa de registro): o
+        # proposal_set_id criado permite ao replay ligar as requisições seguintes
+        state = request.environ.get(ENVIRON_KEY)
+        if state is not None and response.is_json and not response.is_streamed:
+            data = response.get_json(silent=True)
+            if isinstance(data, dict) and data.get('proposal_set_id'):
+                state['proposal_set_id'] = data['proposal_set_id']
+        return response
+
+    def save(self, environ, state: Dict):
+        duration_ms = (time.perf_counter() - state['started']) * 1000
+        body = state['body']
+        content_type = environ.get('CONTENT_TYPE', '')
+        if body and content_type.startswith(JSON_CONTENT_TYPES):
+            body = sanitize_body(body, content_type, self.secret)
+            if body is None:
+                return
+
+        headers = {}
+        for name in RECORDED_HEADERS:
+            value = environ.get('CONTENT_TYPE' if name == 'Content-Type' else
+                                'HTTP_' + name.upper().replace('-', '_'))
+            if value:
+                headers[name] = value
+
+        entry = {
+            'recorded_at': datetime.now().isoformat(timespec='milliseconds'),
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'query_string': environ.get('QUERY_STRING', ''),
+            'headers': headers,
+            'body': self._store_body(body) if body else None,
+            'body_bytes': len(body),
+            'status': state.get('status'),
+            'duration_ms': round(duration_ms, 2),
+            'proposal_set_id': state.get('proposal_set_id')
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(os.path.join(self.record_dir, INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.written_bytes += len(line)
+            self.recorded += 1
+
+    def _store_body(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self.record_dir, BODIES_DIR, digest)
+        if not os.path.exists(path):
+            # Escrita atômica: outro worker pode gravar o mesmo corpo ao mesmo tempo
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+            with self._lock:
+                self.written_bytes += len(body)
+        return digest
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+request_recorder = RequestRecorder()
@@ -0,0 +1,257 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local): sem lock entre processos
+    fcntl = None
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+WRITE_BEHIND_TASKS = metrics.counter(
+    'write_behind_tasks_total', 'Gravações não críticas adiadas para a fila do worker', ('outcome',))
+WRITE_BEHIND_DEPTH = metrics.gauge('write_behind_queue_depth', 'Gravações aguardando na fila do worker')
+
+
+def sqlite_file(uri: str) -> bool:
+    """True para um SQLite em arquivo (em memória não tem WAL nem pool de conexões)."""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+class SQLiteStorage:
+    """
+    Ajustes do SQLite para vários workers do gunicorn gravando no mesmo arquivo.
+
+    - WAL: leitores não bloqueiam o escritor nem o escritor bloqueia os leitores;
+      continua havendo um escritor por vez, então busy_timeout faz a gravação
+      esperar a vez (em vez de falhar na hora com "database is locked")
+    - synchronous=NORMAL: com WAL, um commit não faz fsync (só o checkpoint faz);
+      uma queda de energia pode perder os últimos commits, mas não corrompe o banco
+    - cache_size/mmap_size: páginas quentes em memória e leituras sem cópia (as
+      páginas mapeadas contam na RSS do worker, vigiada por MEMORY_RECYCLE_MB)
+    - journal_size_limit: o arquivo -wal volta a esse tamanho após o checkpoint
+    - write_lock(): fila entre processos (flock em <banco>-lock) para as transações de
+      escrita. Sem ela, quem encontra o banco ocupado dorme e tenta de novo (busy
+      handler), e com vários workers um escritor pode perder a vez seguidamente; com
+      o flock o kernel acorda o próximo assim que o lock é liberado
+
+    Os mesmos PRAGMAs valem para o engine do SQLAlchemy (evento connect) e para
+    as conexões sqlite3 próprias do proposal_store (configure_connection). O pool
+    do engine é por worker (post_fork do gunicorn descarta o herdado do master),
+    com uma conexão por thread do gthread e mais uma para a fila de write-behind.
+    """
+
+    def __init__(self):
+        self.pragmas: Dict[str, object] = {}
+        self.lock_path = None
+        self._lock_file = None
+        self._lock_pid = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configura PRAGMAs e o pool; chamar antes de db.init_app (que cria o engine)."""
+        self.pragmas = {
+            # Primeiro o busy_timeout: trocar o journal_mode também disputa o lock
+            'busy_timeout': int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            'journal_mode': app.config.get('SQLITE_JOURNAL_MODE', 'wal'),
+            'synchronous': app.config.get('SQLITE_SYNCHRONOUS', 'normal'),
+            # Negativo: em KiB (independe do tamanho da página)
+            'cache_size': -int(app.config.get('SQLITE_CACHE_MB', 16)) * 1024,
+            'mmap_size': int(app.config.get('SQLITE_MMAP_MB', 64)) * MB,
+            'journal_size_limit': 64 * MB,
+            'temp_store': 'memory'
+        }
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        if sqlite_file(uri):
+            if app.config.get('SQLITE_WRITE_LOCK', True) and fcntl is not None:
+                self.lock_path = make_url(uri).database + '-lock'
+            options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+            options.setdefault('pool_size', int(app.config.get('SQLITE_POOL_SIZE', 5)))
+            options.setdefault('max_overflow', 2)
+            options.setdefault('pool_timeout', self.pragmas['busy_timeout'] / 1000)
+        app.extensions['sqlite_storage'] = self
+
+    def attach(self, engine):
+        """Aplica os PRAGMAs a cada conexão nova do engine."""
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', lambda dbapi_conn, _record: self.configure_connection(dbapi_conn))
+
+    def configure_connection(self, conn):
+        cursor = conn.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    def write_lock(self):
+        """
+        Context manager para uma transação de escrita inteira (da primeira escrita ao
+        commit). Sem efeito em SQLite em memória, no Windows ou com SQLITE_WRITE_LOCK=False.
+        """
+        if self.lock_path is None:
+            return nullcontext()
+        return self._locked()
+
+    @contextmanager
+    def _locked(self):
+        # O flock é do arquivo aberto: threads do mesmo worker se revezam pelo lock local
+        with self._thread_lock:
+            lock_file = self._worker_lock_file()
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _worker_lock_file(self):
+        # Arquivo aberto depois do fork: herdado do master, o lock seria o mesmo em todos os workers
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self.lock_path, 'a')
+            self._lock_pid = os.getpid()
+        return self._lock_file
+
+    def stats(self, conn) -> Dict:
+        """Valores efetivos dos PRAGMAs numa conexão DB-API (para conferir WAL, mmap etc.)."""
+        cursor = conn.cursor()
+        try:
+            return {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in self.pragmas}
+        finally:
+            cursor.close()
+
+
+class WriteBehindQueue:
+    """
+    Fila de gravações não críticas, executadas fora da requisição por uma thread
+    do worker: só dados que podem ser recalculados, como os resumos de analytics
+    (flask rebuild-analytics). Registros de negócio, como o histórico de propostas,
+    são gravados na própria requisição: aqui uma tarefa pode ser descartada (fila
+    cheia) ou perdida (worker morto com SIGKILL).
+
+    - A resposta não espera o commit, e cada worker tem um único escritor para
+      essas tabelas em vez de uma thread do gthread por requisição disputando o lock
+    - Tarefas são agrupadas (até `batch_size`) num mesmo app context/sessão
+    - Fila cheia (`max_size`): a tarefa é descartada e contada, sem bloquear a rota
+    - Na saída do worker (reciclagem, deploy) a fila é esvaziada antes de terminar
+    - WRITE_BEHIND_ENABLED=False executa as tarefas na hora, na própria requisição
+    """
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 100):
+        self.enabled = False
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.app = None
+        self._queue: queue.Queue = queue.Queue(max_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('WRITE_BEHIND_ENABLED', True)
+        self.max_size = int(app.config.get('WRITE_BEHIND_MAX_SIZE', self.max_size))
+        self._queue = queue.Queue(self.max_size)
+        app.extensions['write_behind'] = self
+        atexit.register(self.close)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> bool:
+        """Agenda fn(*args, **kwargs); False se a fila estava cheia e a tarefa foi descartada."""
+        if not self.enabled:
+            self._execute(fn, args, kwargs)
+            return True
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+        except queue.Full:
+            self.dropped += 1
+            WRITE_BEHIND_TASKS.inc(outcome='dropped')
+            logger.warning('Fila de write-behind cheia; gravação descartada',
+                           extra={'task': getattr(fn, '__qualname__', repr(fn)), 'max_size': self.max_size})
+            return False
+        WRITE_BEHIND_DEPTH.set(self._queue.qsize())
+        return True
+
+    def _ensure_thread(self):
+        # Threads não sobrevivem ao fork: cada worker inicia a sua no primeiro uso
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self.app.app_context():
+                for fn, args, kwargs in batch:
+                    self._execute(fn, args, kwargs)
+            for _ in batch:
+                self._queue.task_done()
+            WRITE_BEHIND_DEPTH.set(self._queue.qsize())
+
+    def _execute(self, fn: Callable, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+            self.processed += 1
+            WRITE_BEHIND_TASKS.inc(outcome='done')
+        except Exception:
+            self.failed += 1
+            WRITE_BEHIND_TASKS.inc(outcome='failed')
+            logger.exception('Falha numa gravação adiada', extra={'task': getattr(fn, '__qualname__', repr(fn))})
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a fila esvaziar (até `timeout` s); True se esvaziou."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        if not self.flush():
+            logger.warning('Gravações adiadas perdidas na saída do worker',
+                           extra={'pending': self._queue.unfinished_tasks})
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'pending': self._queue.unfinished_tasks if self._pid == os.getpid() else 0,
+            'max_size': self.max_size,
+            'processed': self.processed,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
+
+
+# Instâncias compartilhadas (inicializadas em main.py com init_app)
+sqlite_storage = SQLiteStorage()
+write_behind = WriteBehindQueue()
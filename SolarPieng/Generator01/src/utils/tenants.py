@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from jinja2 import Environment
+
+from src.utils.html_generator import ProposalHTMLGenerator, build_environment
+
+
+DEFAULT_TENANT = 'default'
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# Contextos compilados em cache: precisa cobrir todos os tenants ativos, senão cada
+# renderização de um tenant que saiu do LRU recompila templates e branding
+DEFAULT_MAX_TENANTS = 256
+
+
+class TenantNotFoundError(ValueError):
+    """Tenant inexistente ou com identificador inválido."""
+
+
+class TenantContext:
+    """Branding e ambiente Jinja compilados de um tenant."""
+
+    def __init__(self, tenant_id: str, branding: Dict, environment: Environment, signature: Tuple):
+        self.tenant_id = tenant_id
+        self.branding = branding
+        self.environment = environment
+        self.signature = signature
+
+    def create_generator(self) -> ProposalHTMLGenerator:
+        return ProposalHTMLGenerator(branding=self.branding, environment=self.environment)
+
+
+class TenantRegistry:
+    """
+    Registro de tenants (white-label) para a geração de propostas.
+
+    Estrutura esperada:
+        data/tenants/<id>/branding.json      -> sobrescreve campos do branding base
+        data/tenants/<id>/templates/*.html   -> sobrescreve templates (ex.: standard.html)
+
+    Os contextos compilados ficam em um LRU limitado a `max_tenants` entradas
+    (TENANT_CACHE_SIZE; deve ser maior que o número de tenants ativos).
+    A cada resolução é feito apenas um stat nos arquivos do tenant; o contexto só é
+    recompilado quando algum mtime muda.
+    """
+
+    def __init__(self, tenants_path: str = 'data/tenants', base_branding_path: str = 'data/branding.json',
+                 max_tenants: int = DEFAULT_MAX_TENANTS, config_service=None):
+        self.tenants_path = tenants_path
+        self.base_branding_path = base_branding_path
+        # Se informado, o branding base vem do config_service (já em memória)
+        self.config_service = config_service
+        self.max_tenants = max_tenants
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.compiles = 0
+
+    def init_app(self, app):
+        self.max_tenants = int(app.config.get('TENANT_CACHE_SIZE', self.max_tenants))
+        with self._lock:
+            while len(self._contexts) > self.max_tenants:
+                self._contexts.popitem(last=False)
+        app.extensions['tenant_registry'] = self
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _tenant_dir(self, tenant_id: str) -> Optional[str]:
+        if tenant_id == DEFAULT_TENANT:
+            return None
+        return os.path.join(self.tenants_path, tenant_id)
+
+    def _signature(self, tenant_id: str) -> Tuple:
+        """mtimes que, se alterados, invalidam o contexto compilado do tenant."""
+        tenant_dir = self._tenant_dir(tenant_id)
+        base = self._base_signature()
+        if tenant_dir is None:
+            return (base,)
+        return (
+            base,
+            self._mtime(os.path.join(tenant_dir, 'branding.json')),
+            # mtime da pasta muda quando um override é criado ou removido;
+            # alterações no conteúdo são tratadas pelo auto_reload do Jinja
+            self._mtime(os.path.join(tenant_dir, 'templates'))
+        )
+
+    def _base_signature(self):
+        if self.config_service is not None:
+            return self.config_service.version
+        return self._mtime(self.base_branding_path)
+
+    def _base_branding(self) -> Dict:
+        if self.config_service is not None:
+            return self.config_service.get('branding') or {}
+        return self._load_json(self.base_branding_path)
+
+    def _load_json(self, path: str) -> Dict:
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _compile(self, tenant_id: str, signature: Tuple) -> TenantContext:
+        branding = ProposalHTMLGenerator._default_branding()
+        branding.update(self._base_branding())
+
+        tenant_dir = self._tenant_dir(tenant_id)
+        overrides_path = None
+        if tenant_dir is not None:
+            branding.update(self._load_json(os.path.join(tenant_dir, 'branding.json')))
+            overrides_path = os.path.join(tenant_dir, 'templates')
+
+        self.compiles += 1
+        return TenantContext(tenant_id, branding, build_environment(overrides_path), signature)
+
+    def resolve(self, tenant_id: str = None) -> TenantContext:
+        """
+        Retorna o contexto do tenant, recompilando apenas se os arquivos mudaram.
+        Sem tenant informado, usa o branding base (data/branding.json).
+        """
+        tenant_id = tenant_id or DEFAULT_TENANT
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise TenantNotFoundError(f"Identificador de tenant inválido: {tenant_id}")
+
+        tenant_dir = self._tenant_dir(tenant_id)
+        if tenant_dir is not None and not os.path.isdir(tenant_dir):
+            raise TenantNotFoundError(f"Tenant não encontrado: {tenant_id}")
+
+        signature = self._signature(tenant_id)
+        with self._lock:
+            context = self._contexts.get(tenant_id)
+            if context is not None and context.signature == signature:
+                self._contexts.move_to_end(tenant_id)
+                return context
+
+        context = self._compile(tenant_id, signature)
+        with self._lock:
+            self._contexts[tenant_id] = context
+            self._contexts.move_to_end(tenant_id)
+            while len(self._contexts) > self.max_tenants:
+                self._contexts.popitem(last=False)
+        return context
+
+    def get_generator(self, tenant_id: str = None) -> ProposalHTMLGenerator:
+        """Gerador HTML configurado com o branding e os templates do tenant."""
+        return self.resolve(tenant_id).create_generator()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'cached_tenants': len(self._contexts),
+                'max_tenants': self.max_tenants,
+                'compiles': self.compiles
+            }
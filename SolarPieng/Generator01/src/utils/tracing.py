@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+TRACE_HEADER = 'X-Trace-Id'
+
+# Ids recebidos do cliente (X-Trace-Id) só são aceitos neste formato
+TRACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+# Trace e span ativos no contexto atual (thread do gthread / contexto do asyncio)
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('pieng_trace', default=None)
+_current_span: ContextVar[Optional['Span']] = ContextVar('pieng_span', default=None)
+
+
+class Span:
+    """Uma etapa medida dentro de um trace (com etapa pai e atributos livres)."""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'attributes', 'started', 'duration', '_token')
+
+    def __init__(self, trace: 'Trace', name: str, attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = len(trace.spans) + 1
+        self.parent_id = None
+        self.attributes = attributes
+        self.started = 0.0
+        self.duration = None
+        self._token = None
+
+    def set(self, **attributes):
+        """Acrescenta atributos descobertos durante a etapa (ex.: fornecedor, caracteres lidos)."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace.spans.append(self)
+        self._token = _current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        _current_span.reset(self._token)
+        return False
+
+    def to_dict(self) -> Dict:
+        data = {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.started - self.trace.started) * 1000, 3),
+            'duration_ms': round((self.duration or 0.0) * 1000, 3)
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        return data
+
+
+class _NullSpan:
+    """Span usado fora de um trace: não mede nada (custo de uma leitura de ContextVar)."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Linha do tempo de uma requisição: id, atributos e as etapas (spans) na ordem de início."""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, **attributes):
+        self.name = name
+        self.trace_id = trace_id or secrets.token_hex(8)
+        self.attributes = attributes
+        self.spans: List[Span] = []
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Tempo total (ms) por nome de etapa, somando repetições (ex.: todas as páginas)."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + (span.duration or 0.0) * 1000
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+    def to_dict(self) -> Dict:
+        elapsed = self.duration if self.duration is not None else time.perf_counter() - self.started
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'duration_ms': round(elapsed * 1000, 3),
+            'attributes': self.attributes,
+            'stages': self.stage_totals(),
+            'spans': [span.to_dict() for span in self.spans]
+        }
+
+
+class Tracer:
+    """
+    Tracing leve em processo.
+
+        with tracer.trace('upload-ocr', file='kit.pdf') as trace:
+            with tracer.span('pdf_open'):
+                ...
+
+    `span()` fora de um trace ativo não faz nada, então o código instrumentado
+    (ex.: DataExtractor) roda igual em scripts e testes. Ao fim de cada trace,
+    uma linha JSON é acrescentada a TRACE_FILE (vazio desliga a gravação).
+    """
+
+    def __init__(self):
+        self.trace_file: Optional[str] = None
+        self.max_bytes = 50 * 1024 * 1024
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.trace_file = app.config.get('TRACE_FILE') or None
+        self.max_bytes = app.config.get('TRACE_FILE_MAX_BYTES', self.max_bytes)
+        app.extensions['tracer'] = self
+
+    @staticmethod
+    def current() -> Optional[Trace]:
+        return _current_trace.get()
+
+    @staticmethod
+    def accept_trace_id(value: Optional[str]) -> Optional[str]:
+        """Id enviado pelo cliente (X-Trace-Id), se válido; senão um novo é gerado."""
+        return value if value and TRACE_ID_PATTERN.match(value) else None
+
+    @staticmethod
+    def annotate(**attributes):
+        """Atributos do trace ativo (ex.: fornecedor detectado); sem trace, não faz nada."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.set(**attributes)
+
+    def span(self, name: str, **attributes):
+        trace = _current_trace.get()
+        if trace is None:
+            return _NULL_SPAN
+        return Span(trace, name, attributes)
+
+    def trace(self, name: str, trace_id: Optional[str] = None, **attributes) -> '_TraceContext':
+        return _TraceContext(self, Trace(name, trace_id, **attributes))
+
+    def _write(self, trace: Trace):
+        if not self.trace_file:
+            return
+        line = json.dumps(trace.to_dict(), default=str, ensure_ascii=False) + '\n'
+        with self._lock:
+            directory = os.path.dirname(self.trace_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                # Rotação simples: um arquivo anterior (.1) é mantido
+                if os.path.getsize(self.trace_file) > self.max_bytes:
+                    os.replace(self.trace_file, self.trace_file + '.1')
+            except FileNotFoundError:
+                pass
+            with open(self.trace_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class TraceIdFilter:
+    """Filtro de logging: inclui `trace_id` nos registros emitidos dentro de um trace."""
+
+    def filter(self, record) -> bool:
+        trace = _current_trace.get()
+        if trace is not None and not hasattr(record, 'trace_id'):
+            record.trace_id = trace.trace_id
+        return True
+
+
+class _TraceContext:
+    def __init__(self, tracer: Tracer, trace: Trace):
+        self.tracer = tracer
+        self.trace = trace
+        self._token = None
+
+    def __enter__(self) -> Trace:
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.duration = time.perf_counter() - self.trace.started
+        if exc_type is not None:
+            self.trace.attributes['error'] = exc_type.__name__
+        _current_trace.reset(self._token)
+        self.tracer._write(self.trace)
+        return False
+
+
+# Instância compartilhada (inicializada em main.py com init_app)
+tracer = Tracer()
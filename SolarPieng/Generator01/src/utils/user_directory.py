@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.user import User, db
+from src.utils.proposal_history import decode_cursor, encode_cursor, page_size
+from src.utils.storage import sqlite_storage
+
+# Ordenações da listagem: colunas únicas (índice próprio), então o cursor só precisa do valor
+SORT_COLUMNS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email
+}
+
+# Colunas que podem ser pedidas em `fields` (o id vem sempre)
+FIELDS = ('username', 'email')
+
+MAX_BULK_USERS = 10000
+CONFLICT_MODES = ('error', 'update')
+
+
+def projection(fields: Optional[str]) -> List:
+    """Colunas de `fields=username,email` (todas se vazio); o id sempre entra."""
+    names = [name.strip() for name in fields.split(',') if name.strip()] if fields else list(FIELDS)
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(unknown)} (use {', '.join(FIELDS)})")
+    return [User.id] + [getattr(User, name) for name in FIELDS if name in names]
+
+
+def _prefix_range(column, prefix: str):
+    # Intervalo em vez de LIKE: usa o índice único da coluna
+    return column >= prefix, column < prefix + '\uffff'
+
+
+def list_users(username: str = None, email: str = None, fields: str = None, sort: str = 'id',
+               order: str = 'asc', limit: int = None, cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+    """Uma página de usuários (filtros por prefixo de username/e-mail) e o cursor da próxima."""
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort deve ser um de: {', '.join(SORT_COLUMNS)}")
+    if order not in ('asc', 'desc'):
+        raise ValueError('order deve ser asc ou desc')
+    limit = page_size(limit)
+    column = SORT_COLUMNS[sort]
+
+    columns = projection(fields)
+    keys = [c.key for c in columns]
+    if column.key not in keys:
+        columns.append(column)
+    query = select(*columns)
+    if username:
+        query = query.where(*_prefix_range(User.username, username))
+    if email:
+        query = query.where(*_prefix_range(User.email, email))
+    if cursor:
+        after, _ = decode_cursor(cursor, int if sort == 'id' else str)
+        query = query.where(column > after if order == 'asc' else column < after)
+    query = query.order_by(column.asc() if order == 'asc' else column.desc())
+
+    # Um item a mais só para saber se há próxima página
+    rows = db.session.execute(query.limit(limit + 1)).mappings().all()
+    items = [{key: row[key] for key in keys} for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[column.key], last['id'])
+    return items, next_cursor
+
+
+def get_user(user_id: int, fields: str = None) -> Optional[Dict]:
+    row = db.session.execute(select(*projection(fields)).where(User.id == user_id)).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def validate_users(users) -> List[Dict]:
+    """Linhas {username, email} de um lote; ValueError com a posição do primeiro item inválido."""
+    if not isinstance(users, list) or not users:
+        raise ValueError('users deve ser uma lista não vazia')
+    if len(users) > MAX_BULK_USERS:
+        raise ValueError(f'No máximo {MAX_BULK_USERS} usuários por lote')
+    rows = []
+    for index, user in enumerate(users):
+        if not isinstance(user, dict):
+            raise ValueError(f'users[{index}] deve ser um objeto')
+        username = str(user.get('username') or '').strip()
+        email = str(user.get('email') or '').strip()
+        if not username or len(username) > User.username.type.length:
+            raise ValueError(f'users[{index}]: username obrigatório (até {User.username.type.length} caracteres)')
+        if '@' not in email or len(email) > User.email.type.length:
+            raise ValueError(f'users[{index}]: e-mail inválido')
+        rows.append({'username': username, 'email': email})
+    return rows
+
+
+def bulk_save(rows: Sequence[Dict], on_conflict: str = 'error') -> List[int]:
+    """
+    Grava um lote de usuários numa única transação (INSERT em lote) e retorna os ids
+    na ordem do lote. on_conflict='update' atualiza o e-mail de quem já existe com o
+    mesmo username (a última ocorrência no lote prevalece); com 'error', qualquer
+    duplicado desfaz o lote inteiro (IntegrityError).
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"on_conflict deve ser um de: {', '.join(CONFLICT_MODES)}")
+    stmt = insert(User)
+    if on_conflict == 'update':
+        # Username repetido no lote: fica a última ocorrência (um id por username no retorno)
+        rows = list({row['username']: row for row in rows}.values())
+        stmt = stmt.on_conflict_do_update(index_elements=[User.username], set_={'email': stmt.excluded.email})
+    try:
+        with sqlite_storage.write_lock():
+            ids = db.session.execute(
+                stmt.returning(User.id, sort_by_parameter_order=True), list(rows)
+            ).scalars().all()
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ids